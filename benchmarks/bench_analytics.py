@@ -0,0 +1,200 @@
+"""pandas_analysis on the ExpenseCube vs the per-summary groupbys it replaced, on synthetic rows.
+
+The legacy functions below are analyze_large_dataset_pandas, calculate_category_trends and
+analyze_merchant_trends as they were before the cube, kept as the reference. Both results are
+compared key by key: strings, counts and keys must be equal, floats equal up to summation order
+(np.isclose). Any difference is listed and the exit code is 1.
+
+Run from the project root:
+    python -m benchmarks.bench_analytics --rows 1000000
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import query_expense as qe
+
+CATEGORIES = ["GROCERY", "FOOD_DELIVERY", "SHOPPING", "RENT", "SALARY", "INTEREST_INCOME", "PERSONAL", "OTHER"]
+PAYMENT_METHODS = ["UPI", "CARD_PAYMENT", "ATM", "BANK_TRANSFER", "ONLINE_BANKING"]
+
+def synthetic_transactions(rows: int, merchants: int = 500, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365, rows), unit="D")
+    is_debit = rng.random(rows) < 0.85
+    amounts = rng.gamma(2.0, 600.0, rows).round(2)
+    debit = np.where(is_debit, amounts, 0.0)
+    credit = np.where(is_debit, 0.0, amounts)
+    debit[rng.random(rows) < 0.001] = np.nan # a few rows without an amount, so counts differ from sizes
+    kinds = rng.random(rows)
+    merchant_ids = rng.zipf(1.3, rows) % merchants
+    details = [
+        {"sendTo": "MERCHANT", "recipient_name": f"MERCHANT {merchant_id}"} if kind < 0.6
+        else {"sendTo": "PERSON", "recipient_name": f"PERSON {merchant_id}"} if kind < 0.95
+        else None
+        for kind, merchant_id in zip(kinds, merchant_ids)
+    ]
+    return pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "month_year": dates.strftime("%Y-%m"),
+        "day_of_week": dates.day_name(),
+        "is_weekend": dates.dayofweek >= 5,
+        "description": "UPI/P2M/123/SHOP",
+        "debit": debit,
+        "credit": credit,
+        "is_debit": is_debit,
+        "is_credit": ~is_debit,
+        "transaction_category": rng.choice(CATEGORIES, rows),
+        "payment_method": rng.choice(PAYMENT_METHODS, rows),
+        "recipient_bank_details": details,
+    })
+
+#region legacy reference
+def legacy_summary(df, key, statistics):
+    return df.groupby(key).agg({
+        'debit': statistics,
+        'credit': statistics,
+        'date': 'count'
+    }).rename(columns={'date': 'transaction_count'}).to_dict(orient='index')
+
+def legacy_totals(df, key):
+    return {
+        "debit": df.groupby(key)["debit"].sum().to_dict(),
+        "credit": df.groupby(key)["credit"].sum().to_dict(),
+        "net": df.groupby(key).apply(lambda x: x["credit"].sum() - x["debit"].sum()).to_dict()
+    }
+
+def legacy_pandas_analysis(df):
+    df['date'] = pd.to_datetime(df['date'])
+    return {
+        "time_period": {"start": (df['date'].min().date(),), "end": (df['date'].max().date(),)}, # tuples, as the trailing commas made them
+        "overview_stats": qe.overview_stats(df),
+        "temporal_analysis": {
+            "yearly_summary": legacy_summary(df, df['date'].dt.year, ['sum', 'mean', 'max']),
+            "monthly_summary": legacy_summary(df, 'month_year', ['sum', 'mean', 'max']),
+            "weekday_analysis": legacy_summary(df, 'day_of_week', ['sum', 'mean', 'count']),
+            "yearly_totals": legacy_totals(df, df["date"].dt.year),
+            "monthly_totals": legacy_totals(df, df["date"].dt.to_period("M")),
+            "quarterly_totals": legacy_totals(df, df["date"].dt.to_period("Q")),
+            "weekend_vs_weekday": legacy_summary(df, 'is_weekend', ['sum', 'mean', 'count']),
+        },
+        "categorical_analysis": {
+            "totals": df.groupby('transaction_category')["debit"].sum().sort_values(ascending=False).to_dict(),
+            "counts": df.groupby('transaction_category')['debit'].count().to_dict(),
+            "averages": df.groupby('transaction_category')["debit"].mean().to_dict(),
+            "top_expenses": df[df['transaction_category'] != "PERSONAL"].sort_values(by='debit', ascending=False).head(10)[['date', 'description', 'debit', 'transaction_category']].to_dict(orient='records'),
+            "category_trends": legacy_category_trends(df),
+            "merchant_trends": legacy_merchant_trends(df),
+        }
+    }
+
+def legacy_category_trends(df):
+    debit_df = df[(df['is_debit'] == True) & (df['transaction_category'] != "PERSONAL")].copy()
+    credit_df = df[(df['is_credit'] == True) & (df['transaction_category'] != "PERSONAL")].copy()
+    monthly_debit = df.groupby(['month_year', 'transaction_category'])['debit'].sum().unstack(fill_value=0) if not debit_df.empty else None
+    monthly_credit = df.groupby(['month_year', 'transaction_category'])['credit'].sum().unstack(fill_value=0) if not credit_df.empty else None
+    expense_counts = debit_df['transaction_category'].value_counts().to_dict()
+    income_counts = credit_df['transaction_category'].value_counts().to_dict()
+    return qe.build_category_trends(monthly_debit, monthly_credit, expense_counts, income_counts)
+
+def legacy_merchant_trends(df):
+    df_merchants = df[df['recipient_bank_details'].apply(lambda bd: isinstance(bd, dict) and bd.get('sendTo', '').lower() == 'merchant')].copy()
+    df_merchants.loc[:, 'merchant_name'] = df_merchants['recipient_bank_details'].apply(qe.extract_merchant_name)
+    merchant_stats = df_merchants.groupby("merchant_name")["debit"].agg([
+        'sum', 'mean', 'count', 'max', 'min', 'std', 'median'
+    ]).round(2).rename(columns={
+        'sum': 'total_spent', 'mean': 'average_transaction', 'count': 'transaction_count', 'max': 'largest_transaction',
+        'min': 'smallest_transaction', 'std': 'transaction_volatility', 'median': 'median_transaction'
+    })
+    merchant_stats = merchant_stats.sort_values(by='total_spent', ascending=False)
+
+    merchant_trends = {}
+    monthly_merchant = df_merchants.groupby(['month_year', 'merchant_name'])['debit'].sum().unstack(fill_value=0)
+    for merchant in merchant_stats.head(10).index.tolist():
+        merchant_data = monthly_merchant[merchant]
+        merchant_transactions = df_merchants[df_merchants['merchant_name'] == merchant]
+        transaction_dates = merchant_transactions['date'].sort_values()
+        if len(transaction_dates) > 1:
+            date_diffs = transaction_dates.diff().dt.days.dropna()
+            avg_days_between = float(date_diffs.mean()) if len(date_diffs) > 0 else 0
+        else:
+            avg_days_between = 0
+        merchant_trends[merchant] = {
+            'total_spent': float(merchant_stats.loc[merchant, 'total_spent']),
+            'transaction_count': int(merchant_stats.loc[merchant, 'transaction_count']),
+            'average_transaction': float(merchant_stats.loc[merchant, 'average_transaction']),
+            'median_transaction': float(merchant_stats.loc[merchant, 'median_transaction']),
+            'spending_consistency': float(1 / (merchant_stats.loc[merchant, 'transaction_volatility'] + 1)),
+            'monthly_spending': merchant_data.astype(float).to_dict(),
+            'most_active_month': str(merchant_data.idxmax()) if len(merchant_data) > 0 else None,
+            'least_active_month': str(merchant_data.idxmin()) if len(merchant_data) > 0 else None,
+            'avg_days_between_visits': avg_days_between,
+            'visit_frequency': 'regular' if avg_days_between < 14 else 'occasional' if avg_days_between < 30 else 'rare',
+            'first_transaction': str(transaction_dates.min().date()) if len(transaction_dates) > 0 else None,
+            'last_transaction': str(transaction_dates.max().date()) if len(transaction_dates) > 0 else None,
+            'categories_used': merchant_transactions['transaction_category'].unique().tolist(),
+            'payment_methods_used': merchant_transactions['payment_method'].unique().tolist()
+        }
+    return {
+        'top_merchants': merchant_trends,
+        'total_unique_merchants': int(df_merchants['merchant_name'].nunique()),
+        'merchant_concentration': {
+            'top_5_share': float(merchant_stats.head(5)['total_spent'].sum() / merchant_stats['total_spent'].sum() * 100),
+            'top_10_share': float(merchant_stats.head(10)['total_spent'].sum() / merchant_stats['total_spent'].sum() * 100),
+        },
+        'merchant_diversity_score': float(1 - (merchant_stats['total_spent'].max() / merchant_stats['total_spent'].sum())),
+    }
+#endregion
+
+def differences(expected, got, path="", found=None):
+    """Paths where got differs from expected; dict keys must match exactly, floats up to rounding."""
+    found = [] if found is None else found
+    if isinstance(expected, dict) and isinstance(got, dict):
+        if set(expected) != set(got):
+            found.append(f"{path}: keys {sorted(map(str, set(expected) ^ set(got)))[:5]}")
+        for key in expected.keys() & got.keys():
+            differences(expected[key], got[key], f"{path}/{key}", found)
+    elif isinstance(expected, (list, tuple)) and isinstance(got, (list, tuple)):
+        if len(expected) != len(got):
+            found.append(f"{path}: {len(expected)} items vs {len(got)}")
+        for index, (left, right) in enumerate(zip(expected, got)):
+            differences(left, right, f"{path}/{index}", found)
+    elif isinstance(expected, (float, np.floating)) and isinstance(got, (int, float, np.number)):
+        if not np.isclose(expected, got, rtol=1e-9, atol=1e-6, equal_nan=True):
+            found.append(f"{path}: {expected!r} vs {got!r}")
+    elif expected != got and not (pd.isna(expected) and pd.isna(got)):
+        found.append(f"{path}: {expected!r} vs {got!r}")
+    return found
+
+def timed(func, df):
+    started = time.perf_counter()
+    result = func(df.copy())
+    return result, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--merchants", type=int, default=500)
+    args = parser.parse_args()
+
+    df = synthetic_transactions(args.rows, args.merchants)
+    expected, legacy_seconds = timed(legacy_pandas_analysis, df)
+    got, cube_seconds = timed(qe.pandas_analysis, df)
+    del got["analysis_id"]
+    mismatches = differences(expected, got)
+
+    print(json.dumps({
+        "rows": args.rows,
+        "legacy_seconds": round(legacy_seconds, 3),
+        "cube_seconds": round(cube_seconds, 3),
+        "speedup": round(legacy_seconds / cube_seconds, 2),
+        "mismatches": mismatches[:50],
+    }, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Throughput of categorize_transaction: compiled CategoryMatcher vs the old any(...) chain.
+
+Run from the project root:
+    python -m benchmarks.bench_categorize --rows 1000000
+"""
+import argparse
+import random
+import string
+import time
+
+from src import env
+from src import pdfDataOrchestrator as orch
+
+CATEGORY_LISTS = [
+    "FOOD_DELIVERY_LIST", "GROCERY_LIST", "SHOPPING_LIST", "TRANSPORT_LIST", "HEALTHCARE_LIST",
+    "RESTAURANTS_LIST", "FRUITS_VEGETABLES_FISH_LIST", "INTEREST_INCOME_LIST", "RENT_LIST",
+    "CARRIER_LIST", "EMI_LIST", "SPECIAL_EMI_LIST", "CREDIT_CARD_PAYMENT_LIST",
+    "SUBSCRIPTION_SERVICES_LIST", "UTILITY_BILLS_LIST", "FOODS_DRINKS_LIST", "ENTERTAINMENT_LIST",
+    "EDUCATION_LIST", "PERSONAL_TYPE_LIST",
+]
+
+def legacy_categorize_transaction(description: str) -> str:
+    # categorize_transaction as it was before the compiled matcher, kept as the reference
+    description = description.upper()
+    if any(x in description for x in env.FOOD_DELIVERY_LIST):
+        return "FOOD_DELIVERY"
+    elif any(x in description for x in env.GROCERY_LIST):
+        return "GROCERY"
+    elif any(x in description for x in env.SHOPPING_LIST):
+        return "SHOPPING"
+    elif any(x in description for x in env.TRANSPORT_LIST):
+        return "TRANSPORT"
+    elif any(x in description for x in env.HEALTHCARE_LIST):
+        return "HEALTHCARE"
+    elif any(x in description for x in env.RESTAURANTS_LIST):
+        return "RESTAURANTS"
+    elif any(x in description for x in env.FRUITS_VEGETABLES_FISH_LIST):
+        return "FRUITS_VEGETABLES"
+    elif any(x in description for x in env.INTEREST_INCOME_LIST):
+        return "INTEREST_INCOME"
+    elif any(x in description for x in env.RENT_LIST):
+        return "RENT"
+    elif any(x in description for x in ['SALARY']):
+        return "SALARY"
+    elif any(x in description for x in env.CARRIER_LIST):
+        return "RECHARGE"
+    elif any(description.startswith(x) for x in env.EMI_LIST) or any(x in description for x in env.SPECIAL_EMI_LIST):
+        return "LOAN_PAYMENT"
+    elif any(x in description for x in env.CREDIT_CARD_PAYMENT_LIST):
+        return "CREDIT_CARD_PAYMENT"
+    elif any(x in description for x in env.SUBSCRIPTION_SERVICES_LIST):
+        return "SUBSCRIPTION_SERVICES"
+    elif any(x in description for x in env.UTILITY_BILLS_LIST):
+        return "UTILITY_BILLS"
+    elif any(x in description for x in env.FOODS_DRINKS_LIST):
+        return "FOODS_DRINKS"
+    elif any(x in description for x in env.ENTERTAINMENT_LIST):
+        return "ENTERTAINMENT"
+    elif any(x in description for x in env.EDUCATION_LIST):
+        return "EDUCATION"
+    if any(x in description for x in env.PERSONAL_TYPE_LIST):
+        return "PERSONAL"
+    else:
+        return "OTHER"
+
+def random_word(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(string.ascii_uppercase) for _ in range(length))
+
+def install_synthetic_keywords(rng: random.Random, keywords_per_list: int):
+    """Replace the .env keyword lists with synthetic ones and rebuild the compiled matcher."""
+    env.configure(**{name: tuple(random_word(rng, rng.randint(4, 10)) for _ in range(keywords_per_list)) for name in CATEGORY_LISTS})
+    orch._matchers = None # recompiled from the new lists on next use
+
+def synthetic_descriptions(rng: random.Random, rows: int):
+    keywords = [keyword for name in CATEGORY_LISTS for keyword in getattr(env, name)]
+    templates = ["UPI/P2M/{ref}/{kw}/{noise}/HDFC BANK", "POS {kw} {noise}", "NEFT/MB/{ref}/{noise}/SBI", "{kw}/{ref}"]
+    descriptions = []
+    for _ in range(rows):
+        keyword = rng.choice(keywords) if rng.random() < 0.7 else random_word(rng, 8)  # ~30% fall through to OTHER
+        template = rng.choice(templates)
+        descriptions.append(template.format(ref=rng.randint(10**9, 10**10), kw=keyword, noise=random_word(rng, 6)))
+    return descriptions
+
+def run(func, descriptions):
+    started = time.perf_counter()
+    results = [func(description) for description in descriptions]
+    return results, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--keywords-per-list", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    install_synthetic_keywords(rng, args.keywords_per_list)
+    descriptions = synthetic_descriptions(rng, args.rows)
+
+    legacy_results, legacy_seconds = run(legacy_categorize_transaction, descriptions)
+    compiled_results, compiled_seconds = run(orch.categorize_transaction, descriptions)
+    mismatches = sum(1 for old, new in zip(legacy_results, compiled_results) if old != new)
+
+    print(f"rows: {args.rows:,}  keywords: {len(CATEGORY_LISTS) * args.keywords_per_list}")
+    print(f"legacy any() chain : {legacy_seconds:8.2f}s  {args.rows / legacy_seconds:12,.0f} rows/s")
+    print(f"compiled matcher   : {compiled_seconds:8.2f}s  {args.rows / compiled_seconds:12,.0f} rows/s")
+    print(f"speedup: {legacy_seconds / compiled_seconds:.1f}x  mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit("compiled matcher disagrees with the legacy implementation")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Row enrichment throughput: process_transaction_row one row at a time vs batch_enrichment.enrich_rows.
+
+Run from the project root:
+    python -m benchmarks.bench_enrichment --rows 200000
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from src import env
+from src import batch_enrichment
+from src import pdfDataOrchestrator as orch
+
+COLUMN_MAP = {"date": 0, "description": 1, "debit": 2, "credit": 3, "balance": 4}
+
+def synthetic_rows(rng: random.Random, rows: int, distinct_descriptions: int):
+    table = []
+    for _ in range(rows):
+        amount = f"{rng.uniform(10, 50000):,.2f}"
+        is_debit = rng.random() < 0.8
+        table.append([
+            f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-{rng.randint(2019, 2025)}",
+            f"UPI/P2M/{rng.randint(1, distinct_descriptions)}/MERCHANT/UPI/HDFC BANK",
+            amount if is_debit else "",
+            "" if is_debit else amount,
+            f"{rng.uniform(0, 10**6):,.2f}",
+        ])
+    return table
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--distinct-descriptions", type=int, default=5000, help="descriptions repeat like recurring merchants do; set to --rows for all-unique")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not env.DATE_FORMAT_LIST:
+        env.configure(DATE_FORMAT_LIST=("%d-%m-%Y", "%d/%m/%Y"))
+    rows = synthetic_rows(random.Random(args.seed), args.rows, args.distinct_descriptions)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        per_row = [t for t in (orch.process_transaction_row(row, "bench", COLUMN_MAP) for row in rows) if t]
+        per_row_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batched = []
+        for batch in orch._batched(rows, env.ENRICHMENT_BATCH_ROWS):
+            batched.extend(batch_enrichment.enrich_rows(batch, "bench", COLUMN_MAP, env.DATE_FORMAT_LIST, orch.derive_description_metadata))
+        batch_seconds = time.perf_counter() - started
+
+    print(f"rows: {args.rows:,}  batch size: {env.ENRICHMENT_BATCH_ROWS:,}")
+    print(f"per-row    : {per_row_seconds:8.2f}s  {args.rows / per_row_seconds:12,.0f} rows/s")
+    print(f"vectorized : {batch_seconds:8.2f}s  {args.rows / batch_seconds:12,.0f} rows/s")
+    print(f"speedup: {per_row_seconds / batch_seconds:.1f}x  identical output: {per_row == batched}")
+    if per_row != batched:
+        raise SystemExit("vectorized enrichment disagrees with process_transaction_row")
+
+if __name__ == "__main__":
+    main()
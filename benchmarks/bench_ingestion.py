@@ -0,0 +1,204 @@
+"""Ingestion benchmark: time each stage of process_single_statement on synthetic statements.
+
+Statements are generated with benchmarks.synthetic_statements, then every statement goes through
+the same stages as pdfDataOrchestrator: table extraction, header detection, row enrichment (with
+categorization timed on its own) and the DB write. The report is JSON with rows/s, peak RSS and
+the per-stage breakdown, so runs can be compared over time.
+
+Run from the project root:
+    python -m benchmarks.bench_ingestion --statements 3 --pages 10 --rows-per-page 40 --output bench.json
+"""
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synthetic_statements
+from src import env
+from src import bank_structure
+from src import header_detection
+from src import metadata_cache
+from src import mongo as db
+from src import pdfDataOrchestrator as orch
+
+STAGES = ["extraction", "template_learning", "header_detection", "enrichment", "categorization", "db_write"]
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError: # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1) # bytes on macOS, KiB on Linux
+
+def open_collection(kind: str):
+    if kind == "none":
+        return None
+    if kind == "mongomock":
+        import mongomock
+        return mongomock.MongoClient()["bench"]["transactions"]
+    collection = db.get_client()[env.DB_NAME]["bench_transactions"]
+    collection.drop()
+    return collection
+
+def default_db() -> str:
+    return "mongomock" if importlib.util.find_spec("mongomock") is not None else "none"
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = {stage: 0.0 for stage in STAGES}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - started
+
+    def timed(self, name: str, function):
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+
+def run_statement(pdf_path: Path, bank: str, timer: StageTimer, page_workers: int, writer) -> dict:
+    doc_id = pdf_path.stem
+    header_index = bank_structure.get_header_index(bank)
+    template = bank_structure.get_bank_template(bank) if env.BANK_TEMPLATES else None
+
+    with timer.stage("extraction"):
+        pages = [page or [] for page in orch._extract_statement_pages(pdf_path, page_workers, template, bank)]
+    rows = iter([row for page in pages for row in page])
+
+    column_map = None
+    with timer.stage("header_detection"):
+        for row in rows:
+            candidate = header_detection.detect_column_map(row, None, header_index)
+            if "date" in candidate and "description" in candidate:
+                column_map = candidate
+                break
+    if column_map is None:
+        raise SystemExit(f"No header row found in {pdf_path.name}")
+    if env.BANK_TEMPLATES and bank_structure.get_bank_template(bank) is None:
+        with timer.stage("template_learning"):
+            orch._learn_bank_template(pdf_path, bank, column_map)
+
+    with timer.stage("enrichment"):
+        transactions = list(orch._enrich_rows(rows, doc_id, column_map))
+    for row_index, transaction in enumerate(transactions):
+        transaction.row_index = row_index
+
+    if writer is not None:
+        with timer.stage("db_write"):
+            writer.write_many(transactions)
+            writer.flush()
+    return {"pages": len(pages), "rows": len(transactions)}
+
+def run(args, pdf_paths) -> dict:
+    timer = StageTimer()
+    # categorization runs inside enrichment; time it on its own and take it out of enrichment below
+    original_categorize = orch.categorize_transaction
+    orch.categorize_transaction = timer.timed("categorization", original_categorize)
+    orch._metadata_cache = metadata_cache.MetadataCache(env.METADATA_CACHE_SIZE) # cold, not persisted
+    collection = open_collection(args.db)
+    writer = db.TransactionWriter(collection=collection) if collection is not None else None
+
+    totals = {"statements": 0, "pages": 0, "rows": 0}
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): # the pipeline prints per statement
+            for pdf_path in pdf_paths:
+                bank = pdf_path.name.split("_")[0].upper()
+                counts = run_statement(pdf_path, bank, timer, args.page_workers, writer)
+                totals["statements"] += 1
+                totals["pages"] += counts["pages"]
+                totals["rows"] += counts["rows"]
+    finally:
+        orch.categorize_transaction = original_categorize
+    total_seconds = time.perf_counter() - started
+
+    seconds = dict(timer.seconds)
+    seconds["enrichment"] -= seconds["categorization"]
+    stages = {
+        name: {
+            "seconds": round(value, 4),
+            "share": round(value / total_seconds, 4) if total_seconds else 0.0,
+            "rows_per_sec": round(totals["rows"] / value) if value else None,
+        }
+        for name, value in seconds.items()
+    }
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "banks": args.banks,
+            "statements_per_bank": args.statements,
+            "pages": args.pages,
+            "rows_per_page": args.rows_per_page,
+            "days": args.days,
+            "page_workers": args.page_workers,
+            "db": args.db,
+            "vectorized_enrichment": env.VECTORIZED_ENRICHMENT,
+            "bank_templates": env.BANK_TEMPLATES,
+        },
+        **totals,
+        "total_seconds": round(total_seconds, 4),
+        "rows_per_sec": round(totals["rows"] / total_seconds) if total_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+        "db_stats": writer.stats if writer is not None else None,
+        "metadata_cache": orch.get_metadata_cache().stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    synthetic_statements.add_arguments(parser)
+    parser.add_argument("--page-workers", type=int, default=1)
+    parser.add_argument("--db", choices=["mongomock", "mongo", "none"], default=default_db(),
+                        help="mongo writes to bench_transactions in DB_NAME and drops it first")
+    parser.add_argument("--pdf-dir", type=Path, help="reuse statements from an earlier run instead of generating them")
+    parser.add_argument("--keep-pdfs", action="store_true")
+    parser.add_argument("--output", type=Path, help="write the report here; a .jsonl file gets one line appended per run")
+    args = parser.parse_args()
+    args.banks = synthetic_statements.parse_banks(args.banks)
+
+    if not env.DATE_FORMAT_LIST:
+        env.configure(DATE_FORMAT_LIST=("%d-%m-%Y", "%d/%m/%Y")) # the synthetic layouts use these
+    workdir = Path(tempfile.mkdtemp(prefix="bench_ingestion_"))
+    env.configure(BANK_TEMPLATE_FILE=str(workdir / "bank_templates.json")) # learn from scratch, keep the real file untouched
+    bank_structure.bankTemplates = None
+    try:
+        if args.pdf_dir:
+            pdf_paths = sorted(args.pdf_dir.glob("*.pdf"))
+        else:
+            pdf_dir = workdir / "pdfs"
+            started = time.perf_counter()
+            pdf_paths = synthetic_statements.generate(
+                pdf_dir, args.banks, args.statements, args.pages, args.rows_per_page, args.start_date, args.days, args.seed)
+            print(f"Generated {len(pdf_paths)} statements in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+        report = run(args, pdf_paths)
+    finally:
+        if args.keep_pdfs and not args.pdf_dir:
+            print(f"Statements kept in {workdir / 'pdfs'}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        if args.output.suffix == ".jsonl":
+            with open(args.output, "a") as file:
+                file.write(json.dumps(report) + "\n")
+        else:
+            args.output.write_text(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Intent parser corpus check and latency of the rule-based path vs the LLM path of generate_mongo_query.
+
+Every question in benchmarks/intent_corpus.json has the query the parser must build, or "intent":
+null when it must be left to the LLM; any difference is listed and the exit code is 1. The parser
+is timed over the whole corpus; with --llm each question is also sent through llm_mongo_query
+(needs a running Ollama with the model in query_expense.QUERY_MODEL).
+
+Run from the project root:
+    python -m benchmarks.bench_intent_parser --repeat 200 --llm
+"""
+import argparse
+import datetime
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from src.intent_parser import IntentParser
+
+CORPUS_FILE = Path(__file__).resolve().parent / "intent_corpus.json"
+
+def latency_summary(seconds):
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    return {
+        "calls": len(ordered),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 4),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+def check_corpus(parser: IntentParser, corpus: dict, today: datetime.date):
+    mismatches = []
+    for case in corpus["questions"]:
+        parsed = parser.parse(case["question"], today)
+        intent = parsed and parsed["intent"]
+        query = parsed and parsed["query"]
+        if intent != case["intent"] or query != case["query"]:
+            mismatches.append({"question": case["question"], "expected": case["query"], "got": query})
+    return mismatches
+
+def time_parser(parser: IntentParser, questions, today: datetime.date, repeat: int):
+    seconds = []
+    for _ in range(repeat):
+        for question in questions:
+            started = time.perf_counter()
+            parser.parse(question, today)
+            seconds.append(time.perf_counter() - started)
+    return seconds
+
+def time_llm(questions):
+    import query_expense
+    seconds, failed = [], 0
+    for question in questions:
+        started = time.perf_counter()
+        if query_expense.llm_mongo_query(question) is None:
+            failed += 1
+        seconds.append(time.perf_counter() - started)
+    return seconds, failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS_FILE)
+    parser.add_argument("--repeat", type=int, default=100, help="passes over the corpus when timing the parser")
+    parser.add_argument("--llm", action="store_true", help="also time the LLM path (needs Ollama)")
+    args = parser.parse_args()
+
+    corpus = json.loads(args.corpus.read_text())
+    today = datetime.date.fromisoformat(corpus["today"])
+    intent_parser = IntentParser(corpus["banks"], corpus["keywords"])
+    questions = [case["question"] for case in corpus["questions"]]
+    matched = [case["question"] for case in corpus["questions"] if case["intent"]]
+
+    mismatches = check_corpus(intent_parser, corpus, today)
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "questions": len(questions),
+        "answered_by_parser": len(matched),
+        "left_to_llm": len(questions) - len(matched),
+        "mismatches": mismatches,
+        "parser_latency": latency_summary(time_parser(intent_parser, questions, today, args.repeat)),
+        "llm_latency": None,
+    }
+    if args.llm:
+        seconds, failed = time_llm(matched)
+        report["llm_latency"] = {**latency_summary(seconds), "unparseable_answers": failed}
+        report["speedup_p50"] = round(report["llm_latency"]["p50_ms"] / report["parser_latency"]["p50_ms"])
+
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Offline analysis on the Parquet export vs DataFrames built from MongoDB-style documents.
+
+Synthetic transactions are split into statements (one per bank and month), written with
+src.parquet_store and then loaded both ways for the same find filter: pd.DataFrame over the list
+of nested documents, as query_expense does with MongoDB results, and parquet_dataframe over the
+memory-mapped dataset. pandas_analysis must give the same result on both (see
+bench_analytics.differences); any difference is listed and the exit code is 1.
+
+Run from the project root:
+    python -m benchmarks.bench_parquet --rows 1000000
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import query_expense as qe
+from benchmarks.bench_analytics import differences, synthetic_transactions
+from src import parquet_store
+
+BANKS = ["AXIS BANK", "CANARA BANK", "KOTAK BANK"]
+QUERY = {"operation": "find", "filter": {"date": {"$gte": "2022-07-01", "$lte": "2024-06-31"}, "is_debit": True}}
+
+def synthetic_documents(rows: int, seed: int = 7):
+    """Transactions as the orchestrator yields them, grouped into statements by bank and month."""
+    df = synthetic_transactions(rows)
+    rng = np.random.default_rng(seed)
+    df.insert(0, "bank_name", rng.choice(BANKS, rows))
+    df["quarter"] = "Q" + ((df["month_year"].str[5:7].astype(int) - 1) // 3 + 1).astype(str)
+    df["balance"] = 0.0
+    df["amount_range"] = "MEDIUM"
+    df["is_recurring"] = False
+    df["document_id"] = df["bank_name"].str.split(" ").str[0] + "_" + df["month_year"]
+    statements = {}
+    for document in df.to_dict(orient="records"):
+        rows_so_far = statements.setdefault(document["document_id"], [])
+        document["row_index"] = len(rows_so_far)
+        rows_so_far.append(document)
+    return statements
+
+def matches(document, date_from, date_to) -> bool:
+    return date_from <= document["date"] <= date_to and document["is_debit"] is True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    statements = synthetic_documents(args.rows)
+    date_filter = QUERY["filter"]["date"]
+    with tempfile.TemporaryDirectory() as root:
+        started = time.perf_counter()
+        for document_id, documents in statements.items():
+            parquet_store.write_statement(document_id, documents, root)
+        write_seconds = time.perf_counter() - started
+        size_mb = sum(path.stat().st_size for path in Path(root).rglob("*.parquet")) / 1e6
+
+        # what a MongoDB find returns: the matching nested documents, unprojected like parquet_dataframe's
+        results = [dict(document) for documents in statements.values() for document in documents
+                   if matches(document, date_filter["$gte"], date_filter["$lte"])]
+        started = time.perf_counter()
+        documents_df = pd.DataFrame(results)
+        documents_load = time.perf_counter() - started
+        started = time.perf_counter()
+        expected = qe.pandas_analysis(documents_df)
+        documents_analysis = time.perf_counter() - started
+
+        started = time.perf_counter()
+        parquet_df = qe.parquet_dataframe(QUERY, root=root)
+        parquet_load = time.perf_counter() - started
+        started = time.perf_counter()
+        got = qe.pandas_analysis(parquet_df)
+        parquet_analysis = time.perf_counter() - started
+
+    for result in (expected, got):
+        del result["analysis_id"]
+        # listed in order of first appearance, and neither MongoDB nor the dataset scan guarantees row order
+        for merchant in result["categorical_analysis"]["merchant_trends"]["top_merchants"].values():
+            merchant["categories_used"] = sorted(merchant["categories_used"])
+            merchant["payment_methods_used"] = sorted(merchant["payment_methods_used"])
+    mismatches = differences(expected, got)
+    print(json.dumps({
+        "rows": args.rows,
+        "statements": len(statements),
+        "matched_rows": len(results),
+        "parquet_write_seconds": round(write_seconds, 3),
+        "parquet_size_mb": round(size_mb, 1),
+        "documents": {"load_seconds": round(documents_load, 3), "analysis_seconds": round(documents_analysis, 3),
+                      "memory_mb": round(documents_df.memory_usage(deep=True).sum() / 1e6, 1)},
+        "parquet": {"load_seconds": round(parquet_load, 3), "analysis_seconds": round(parquet_analysis, 3),
+                    "memory_mb": round(parquet_df.memory_usage(deep=True).sum() / 1e6, 1)},
+        "mismatches": mismatches[:50],
+    }, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
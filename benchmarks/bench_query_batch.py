@@ -0,0 +1,95 @@
+"""Batch question answering: query_batch concurrently vs one question at a time.
+
+Runs the standard report questions below against benchmarks.fake_ollama (fixed delay per LLM
+call) and a mongomock collection of synthetic transactions, first with concurrency 1 and then
+with the given limits. The intent parser and the query cache are off unless --intent-parser is
+given, so every question pays for query generation and summarization.
+
+Run from the project root:
+    python -m benchmarks.bench_query_batch --delay 0.3 --concurrency 8 --llm-concurrency 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+
+import ollama
+
+import query_batch
+import query_expense as qe
+from benchmarks import fake_ollama
+from src import env
+
+REPORT_QUESTIONS = [
+    "Total grocery spend last month",
+    "How much did I spend on food delivery last month",
+    "Total spent via upi last month",
+    "Total atm withdrawals last month",
+    "Top 5 merchants last month",
+    "Total income last month",
+    "How much did I spend on weekends last month",
+    "Which category grew the most compared to the previous month",
+    "List transactions above 5000 last month",
+    "Show recurring payments last month",
+    "Average daily spend last month",
+    "How much did I spend on subscriptions last month",
+    "Total spend on shopping last month",
+    "List all rent payments this year",
+    "Where did my money go last month",
+]
+
+def seed_collection(rows: int, seed: int = 42):
+    import mongomock
+    client = mongomock.MongoClient()
+    qe.MongoClient = lambda *args, **kwargs: client # the sync fallback goes through qe.get_client
+    env.configure(DB_NAME="bench", COLLECTION_NAME="transactions")
+    rng = random.Random(seed)
+    categories = ["GROCERY", "FOOD_DELIVERY", "SHOPPING", "RENT", "OTHER"]
+    qe.get_collection().insert_many([{
+        "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "description": "UPI/P2M/123/SHOP",
+        "debit": round(rng.uniform(10, 3000), 2),
+        "credit": 0.0,
+        "is_debit": True,
+        "is_credit": False,
+        "transaction_category": rng.choice(categories),
+        "payment_method": "UPI",
+    } for _ in range(rows)])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.3, help="seconds per fake LLM call")
+    parser.add_argument("--server-parallel", type=int, default=4, help="LLM calls the fake server serves at once")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--intent-parser", action="store_true", help="keep the intent parser and query cache on")
+    args = parser.parse_args()
+
+    env.configure(INTENT_PARSER=args.intent_parser, QUERY_CACHE=args.intent_parser, EXPLAIN_QUERIES=False)
+    seed_collection(args.rows)
+    server = fake_ollama.start(delay=args.delay, parallel=args.server_parallel)
+
+    def run(concurrency, llm_concurrency):
+        options = dict(llm_client=ollama.AsyncClient(host=server.url), async_driver=False,
+                       concurrency=concurrency, llm_concurrency=llm_concurrency)
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = query_batch.run_batch(REPORT_QUESTIONS, **options)
+        return {key: report[key] for key in ("questions", "failed", "seconds", "sequential_seconds")}
+
+    try:
+        sequential = run(1, 1)
+        concurrent = run(args.concurrency, args.llm_concurrency)
+    finally:
+        server.shutdown()
+    print(json.dumps({
+        "config": vars(args),
+        "llm_calls": server.requests,
+        "sequential": sequential,
+        "concurrent": concurrent,
+        "speedup": round(sequential["seconds"] / concurrent["seconds"], 2) if concurrent["seconds"] else None,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Import time of the CLI entry points, checked against a budget.
+
+Each entry point is imported in a fresh interpreter under python -X importtime, --runs times; the
+fastest run's time (the cumulative time of every module the import loaded) is compared with its
+budget. The heavy packages below are loaded by the functions that use them, so none of them may
+show up at import. Exit code 1 when an entry point is over budget or imports one of them; an
+entry point whose own dependencies are not installed is reported and skipped.
+
+Run from the project root:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# entry point -> import time budget in ms, with headroom for a slower machine
+BUDGETS_MS = {
+    "src.env": 15,
+    "main": 300,
+    "query_expense": 300,
+    "query_batch": 300,
+    "src.saveMailAttachment": 300,
+}
+HEAVY_MODULES = ("pandas", "numpy", "ollama", "pdfplumber", "pyarrow", "duckdb", "msal", "googleapiclient", "google_auth_oauthlib")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def importtime(code: str):
+    """(stdout, {top-level module: cumulative microseconds}, error) of python -X importtime -c code."""
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=environment,
+                             capture_output=True, text=True)
+    modules, other = {}, []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            other.append(line)
+            continue
+        if "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "): # nested imports are indented below the module that made them
+            modules[name.strip()] = int(cumulative)
+    error = (other or ["exit code %d" % process.returncode])[-1] if process.returncode else None
+    return process.stdout, modules, error
+
+def measure(entry_point: str, runs: int, startup_modules) -> dict:
+    code = f"import sys, {entry_point}; print(','.join(sorted(sys.modules)))"
+    best = None
+    for _ in range(runs):
+        stdout, modules, error = importtime(code)
+        if error:
+            return {"skipped": error}
+        micros = sum(cumulative for name, cumulative in modules.items() if name not in startup_modules)
+        best = micros if best is None else min(best, micros)
+    loaded = set(stdout.strip().split(","))
+    heavy = [name for name in HEAVY_MODULES if name in loaded]
+    budget = BUDGETS_MS[entry_point]
+    return {"import_ms": round(best / 1000, 1), "budget_ms": budget, "modules": len(loaded),
+            "heavy_imports": heavy, "ok": best / 1000 <= budget and not heavy}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("entry_points", nargs="*", default=list(BUDGETS_MS))
+    args = parser.parse_args()
+
+    _, startup_modules, _ = importtime("pass") # site, encodings, ...: loaded before any entry point
+    report = {entry_point: measure(entry_point, args.runs, startup_modules) for entry_point in args.entry_points}
+    print(json.dumps(report, indent=2))
+    if any(result.get("ok") is False for result in report.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Embedded DuckDB/SQLite store vs pandas over MongoDB-style documents.
+
+The synthetic statements of bench_parquet are bulk-inserted into each embedded backend with
+SqlTransactionWriter (then inserted again, which must match every row and insert none), and
+sql_analysis runs the date-range report inside the database. The reference is pandas_analysis
+over the nested documents a MongoDB find returns for the same range; any difference is listed
+(see bench_analytics.differences) and the exit code is 1.
+
+Run from the project root:
+    python -m benchmarks.bench_store --rows 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import query_expense as qe
+from benchmarks.bench_analytics import differences
+from benchmarks.bench_parquet import QUERY, matches, synthetic_documents
+from src import sql_store
+
+def normalized(result):
+    del result["analysis_id"]
+    # listed in order of first appearance, and neither MongoDB nor a SQL scan guarantees row order
+    for merchant in result["categorical_analysis"]["merchant_trends"]["top_merchants"].values():
+        merchant["categories_used"] = sorted(merchant["categories_used"])
+        merchant["payment_methods_used"] = sorted(merchant["payment_methods_used"])
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    statements = synthetic_documents(args.rows)
+    date_from, date_to = QUERY["filter"]["date"]["$gte"], QUERY["filter"]["date"]["$lte"]
+    results = [dict(document) for documents in statements.values() for document in documents
+               if matches(document, date_from, date_to)]
+    started = time.perf_counter()
+    expected = normalized(qe.pandas_analysis(pd.DataFrame(results)))
+    report = {"rows": args.rows, "matched_rows": len(results),
+              "documents": {"load_and_analysis_seconds": round(time.perf_counter() - started, 3)}}
+
+    mismatches = []
+    dialects = ["duckdb", "sqlite"] if sql_store.duckdb is not None else ["sqlite"]
+    with tempfile.TemporaryDirectory() as root:
+        for dialect in dialects:
+            store = sql_store.SqlStore(os.path.join(root, f"transactions.{dialect}"), dialect)
+            timings = {}
+            for run in ("insert", "reinsert"):
+                started = time.perf_counter()
+                with store.writer(batch_size=args.batch_size, flush_interval=float("inf")) as writer:
+                    for documents in statements.values():
+                        writer.write_many(documents)
+                timings[f"{run}_seconds"] = round(time.perf_counter() - started, 3)
+                timings[f"{run}_stats"] = {key: writer.stats[key] for key in ("inserted", "matched", "batches")}
+            if timings["reinsert_stats"]["inserted"]:
+                mismatches.append(f"{dialect}: reinsert added {timings['reinsert_stats']['inserted']} rows")
+
+            started = time.perf_counter()
+            got = qe.sql_analysis(store, date_from, date_to, "is_debit") # the reference find filter
+            timings["analysis_seconds"] = round(time.perf_counter() - started, 3)
+            store.close()
+            timings["file_size_mb"] = round(os.path.getsize(store.path) / 1e6, 1)
+            report[dialect] = timings
+            mismatches += [f"{dialect}: {difference}" for difference in differences(expected, normalized(got))]
+
+    report["mismatches"] = mismatches[:50]
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Memory held by enriched transactions: retained bytes and live allocations per row.
+
+The synthetic rows of bench_enrichment go through pdfDataOrchestrator._enrich_rows, per row or
+vectorized, and the resulting list is kept alive like the process pool's result list or the
+Parquet tee keep a statement. tracemalloc measures the bytes the list retains and the peak while
+it was built, sys.getallocatedblocks the objects it keeps. to_dict runs once over the rows
+afterwards, as the writers do, to time the conversion at the DB boundary. Enrichment runs
+several times slower than usual while tracemalloc traces it.
+
+Run from the project root:
+    python -m benchmarks.bench_transactions --rows 200000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_enrichment import COLUMN_MAP, synthetic_rows
+from src import env, metadata_cache
+from src import pdfDataOrchestrator as orch
+
+def measure(rows, vectorized: bool) -> dict:
+    env.configure(VECTORIZED_ENRICHMENT=vectorized)
+    orch._metadata_cache = metadata_cache.MetadataCache(env.METADATA_CACHE_SIZE) # cold, not persisted
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        transactions = list(orch._enrich_rows(iter(rows), "bench", COLUMN_MAP))
+    seconds = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    live_blocks = sys.getallocatedblocks() - blocks
+
+    result = {
+        "transactions": len(transactions),
+        "enrich_seconds": round(seconds, 3),
+        "retained_mb": round(retained / 1e6, 1),
+        "peak_mb": round(peak / 1e6, 1),
+        "bytes_per_row": round(retained / len(transactions)),
+        "live_blocks_per_row": round(live_blocks / len(transactions), 1),
+    }
+    if hasattr(transactions[0], "to_dict"):
+        started = time.perf_counter()
+        for transaction in transactions:
+            transaction.to_dict()
+        result["to_dict_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--distinct-descriptions", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if not env.DATE_FORMAT_LIST:
+        env.configure(DATE_FORMAT_LIST=("%d-%m-%Y", "%d/%m/%Y"))
+    rows = synthetic_rows(random.Random(args.seed), args.rows, args.distinct_descriptions)
+    print(json.dumps({
+        "rows": args.rows,
+        "vectorized": measure(rows, True),
+        "per_row": measure(rows, False),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
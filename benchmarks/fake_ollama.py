@@ -0,0 +1,109 @@
+"""Stand-in for the Ollama HTTP API (POST /api/chat) with a fixed response delay.
+
+Query prompts get a small find query back, summary prompts a line of text, so query_expense and
+query_batch can be run and timed without a model. Requests beyond --parallel wait for a free
+slot, like Ollama does with OLLAMA_NUM_PARALLEL. Streamed requests get their first word after a
+quarter of the delay and the rest spread over the remainder, one JSON line per word.
+
+Run from the project root, then point the clients at it:
+    python -m benchmarks.fake_ollama --port 11435 --delay 0.5
+    OLLAMA_HOST=http://127.0.0.1:11435 python query_batch.py questions.txt
+"""
+import argparse
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_QUERY = {"operation": "find", "filter": {"is_debit": True}}
+
+def fake_reply(prompt: str) -> str:
+    if "MongoDB query translator" in prompt:
+        return json.dumps(FAKE_QUERY)
+    return f"Fake summary of a {len(prompt)} character prompt."
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, delay: float, parallel: int):
+        super().__init__(address, FakeOllamaHandler)
+        self.delay = delay
+        self.slots = threading.Semaphore(parallel)
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+        reply = fake_reply(prompt)
+        started = time.perf_counter()
+        with self.server.slots:
+            self.server.requests += 1
+            if body.get("stream", True): # Ollama streams unless told not to
+                self._stream(body, reply, started)
+                return
+            time.sleep(self.server.delay)
+        payload = self._message(body, reply, started, done=True)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _message(self, body, content: str, started: float, done: bool) -> bytes:
+        message = {
+            "model": body.get("model", "fake"),
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": done,
+        }
+        if done:
+            message.update(done_reason="stop", total_duration=int((time.perf_counter() - started) * 1e9))
+        return json.dumps(message).encode()
+
+    def _stream(self, body, reply: str, started: float):
+        words = reply.split(" ")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers() # no Content-Length: the body ends when the connection closes
+        time.sleep(self.server.delay / 4)
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(self.server.delay * 3 / 4 / max(len(words) - 1, 1))
+            self.wfile.write(self._message(body, word if index == 0 else " " + word, started, done=False) + b"\n")
+            self.wfile.flush()
+        self.wfile.write(self._message(body, "", started, done=True) + b"\n")
+
+    def log_message(self, format, *args):
+        pass
+
+def start(port: int = 0, delay: float = 0.5, parallel: int = 4) -> FakeOllamaServer:
+    """Serve in a background thread; port 0 picks a free port (see server.url)."""
+    server = FakeOllamaServer(("127.0.0.1", port), delay, parallel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds per chat request")
+    parser.add_argument("--parallel", type=int, default=4, help="requests served at once")
+    args = parser.parse_args()
+    server = FakeOllamaServer(("127.0.0.1", args.port), args.delay, args.parallel)
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Synthetic bank statement PDFs in the AXIS, CANARA and KOTAK layouts.
+
+Header labels come from src/bankColumnStructure.json, so the generated statements go through the
+same header detection as real ones. Every page has a ruled transaction table, a bank letterhead
+(with the account block on the first page) and a footer, like the statements the parser was written for.
+
+Run from the project root:
+    python -m benchmarks.synthetic_statements --out bench_pdfs --pages 5 --rows-per-page 40
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+STRUCTURE_FILE = Path(__file__).resolve().parent.parent / "src" / "bankColumnStructure.json"
+
+# column order, which alias of each header is printed, and how dates are written
+LAYOUTS = {
+    "AXIS": {"columns": ["date", "cheque_number", "description", "debit", "credit", "balance"], "alias": 1, "date_format": "%d-%m-%Y"},
+    "CANARA": {"columns": ["date", "description", "debit", "credit", "balance"], "alias": 0, "date_format": "%d/%m/%Y"},
+    "KOTAK": {"columns": ["date", "description", "cheque_number", "debit", "credit", "balance"], "alias": 2, "date_format": "%d/%m/%Y"},
+}
+COLUMN_WIDTHS = {"date": 58, "cheque_number": 50, "description": 230, "debit": 70, "credit": 70, "balance": 75}
+
+MERCHANTS = ["SWIGGY", "ZOMATO", "BIGBASKET", "AMAZON", "FLIPKART", "NETFLIX", "UBER", "IRCTC", "APOLLO PHARMACY", "BESCOM"]
+PEOPLE = ["RAMESH KUMAR", "ANITHA S", "JOHN MATHEW", "PRIYA NAIR", "ARUN V"]
+BANKS = ["HDFC BANK", "ICICI BANK", "STATE BANK OF INDIA", "AXIS BANK", "KOTAK MAHINDRA"]
+
+PAGE_WIDTH = 595
+MIN_PAGE_HEIGHT = 842
+ROW_HEIGHT = 14
+FONT_SIZE = 7
+
+def load_bank_structure(path: Path = STRUCTURE_FILE) -> Dict[str, dict]:
+    with open(path, "r") as file:
+        return json.load(file)
+
+def header_labels(bank: str, structure: Dict[str, dict]) -> List[str]:
+    """Printed header of the transaction table for a bank, taken from its configured aliases."""
+    config = structure[bank]
+    aliases = {**config.get("optional_headers", {}), **config["header"]}
+    layout = LAYOUTS[bank]
+    return [aliases[key][min(layout["alias"], len(aliases[key]) - 1)] for key in layout["columns"]]
+
+def _description(rng: random.Random, reference: int) -> str:
+    kind = rng.random()
+    if kind < 0.55:
+        return f"UPI/P2M/{reference}/{rng.choice(MERCHANTS)}/UPI/{rng.choice(BANKS)}"
+    if kind < 0.75:
+        return f"UPI/P2A/{reference}/{rng.choice(PEOPLE)}/UPI/{rng.choice(BANKS)}"
+    if kind < 0.85:
+        return f"NEFT/{reference}/{rng.choice(PEOPLE)}/{rng.choice(BANKS)}"
+    if kind < 0.92:
+        return f"ATM-CASH/{reference}/KOCHI"
+    if kind < 0.97:
+        return f"POS {rng.choice(MERCHANTS)} IN"
+    return "SALARY CREDIT"
+
+def transaction_rows(
+    bank: str,
+    row_count: int,
+    start_date: datetime.date,
+    days: int,
+    rng: random.Random,
+) -> List[Dict[str, str]]:
+    """row_count transactions spread evenly over days days, with a running balance."""
+    date_format = LAYOUTS[bank]["date_format"]
+    balance = rng.uniform(10_000, 200_000)
+    rows = []
+    for i in range(row_count):
+        date = start_date + datetime.timedelta(days=(i * days) // max(row_count, 1))
+        is_debit = rng.random() < 0.85
+        amount = round(rng.uniform(10, 3_000) if is_debit else rng.uniform(1_000, 20_000), 2)
+        balance += -amount if is_debit else amount
+        rows.append({
+            "date": date.strftime(date_format),
+            "cheque_number": str(rng.randint(100000, 999999)) if rng.random() < 0.05 else "",
+            "description": _description(rng, rng.randint(10**8, 10**9)),
+            "debit": f"{amount:,.2f}" if is_debit else "",
+            "credit": "" if is_debit else f"{amount:,.2f}",
+            "balance": f"{balance:,.2f}",
+        })
+    return rows
+
+#region pdf writer
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _text(x: float, y: float, text: str, size: int = FONT_SIZE) -> str:
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET"
+
+def _table_ops(rows: Sequence[Sequence[str]], widths: Sequence[int], x0: float, top: float) -> List[str]:
+    ops = ["0.5 w"]
+    right = x0 + sum(widths)
+    bottom = top - len(rows) * ROW_HEIGHT
+    for r in range(len(rows) + 1):
+        y = top - r * ROW_HEIGHT
+        ops.append(f"{x0} {y} m {right} {y} l S")
+    x = x0
+    for width in list(widths) + [0]:
+        ops.append(f"{x} {top} m {x} {bottom} l S")
+        x += width
+    for r, row in enumerate(rows):
+        x = x0
+        for width, cell in zip(widths, row):
+            if cell:
+                ops.append(_text(x + 2, top - (r + 1) * ROW_HEIGHT + 4, cell))
+            x += width
+    return ops
+
+def _build_pdf(pages: Sequence[Sequence[str]], heights: Sequence[int]) -> bytes:
+    """Minimal PDF 1.4: one Helvetica font, one content stream per page."""
+    objects: List[Optional[bytes]] = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for ops, height in zip(pages, heights):
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {height}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        ).encode())
+        kids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+#endregion
+
+def write_statement(
+    path: Path,
+    bank: str,
+    pages: int,
+    rows_per_page: int,
+    start_date: datetime.date,
+    days: int,
+    seed: int = 0,
+    structure: Optional[Dict[str, dict]] = None,
+) -> int:
+    """Write one statement PDF and return the number of transactions in it."""
+    structure = structure or load_bank_structure()
+    rng = random.Random(seed)
+    layout = LAYOUTS[bank]
+    widths = [COLUMN_WIDTHS[key] for key in layout["columns"]]
+    transactions = transaction_rows(bank, pages * rows_per_page, start_date, days, rng)
+    account = f"{rng.randint(10**11, 10**12 - 1)}"
+
+    page_ops, heights = [], []
+    for page_index in range(pages):
+        chunk = transactions[page_index * rows_per_page:(page_index + 1) * rows_per_page]
+        table = [[row[key] for key in layout["columns"]] for row in chunk]
+        letterhead = 60 if page_index == 0 else 30
+        height = max(MIN_PAGE_HEIGHT, letterhead + (len(table) + 1) * ROW_HEIGHT + 80)
+        top = height - 30
+        ops = [_text(30, top, f"{bank} BANK LTD - STATEMENT OF ACCOUNT", 10)]
+        if page_index == 0:
+            ops.append(_text(30, top - 16, f"Account No: {account}   Customer: SYNTHETIC CUSTOMER"))
+            ops.append(_text(30, top - 28, f"Period: {transactions[0]['date']} to {transactions[-1]['date']}"))
+            table = [header_labels(bank, structure)] + table
+        ops += _table_ops(table, widths, 30, top - letterhead + 10)
+        ops.append(_text(30, 30, f"Page {page_index + 1} of {pages}. This is a computer generated statement and does not require a signature."))
+        page_ops.append(ops)
+        heights.append(height)
+
+    path.write_bytes(_build_pdf(page_ops, heights))
+    return len(transactions)
+
+def generate(
+    out_dir: Path,
+    banks: Sequence[str],
+    statements: int,
+    pages: int,
+    rows_per_page: int,
+    start_date: datetime.date,
+    days: int,
+    seed: int = 0,
+) -> List[Path]:
+    """Write statements per bank, named like real statements (<bank>_statement_<n>.pdf)."""
+    structure = load_bank_structure()
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for bank in banks:
+        for number in range(statements):
+            path = Path(out_dir) / f"{bank.lower()}_statement_{number + 1:03d}.pdf"
+            statement_start = start_date + datetime.timedelta(days=number * days)
+            write_statement(path, bank, pages, rows_per_page, statement_start, days, seed + number, structure)
+            paths.append(path)
+    return paths
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--banks", default=",".join(LAYOUTS), help="comma separated, any of " + ", ".join(LAYOUTS))
+    parser.add_argument("--statements", type=int, default=1, help="statements per bank")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--rows-per-page", type=int, default=40)
+    parser.add_argument("--start-date", type=datetime.date.fromisoformat, default=datetime.date(2024, 1, 1))
+    parser.add_argument("--days", type=int, default=30, help="date span of each statement")
+    parser.add_argument("--seed", type=int, default=42)
+
+def parse_banks(value: str) -> List[str]:
+    banks = [bank.strip().upper() for bank in value.split(",") if bank.strip()]
+    unknown = [bank for bank in banks if bank not in LAYOUTS]
+    if unknown:
+        raise SystemExit(f"No synthetic layout for {', '.join(unknown)}")
+    return banks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", type=Path, required=True)
+    add_arguments(parser)
+    args = parser.parse_args()
+    paths = generate(args.out, parse_banks(args.banks), args.statements, args.pages, args.rows_per_page, args.start_date, args.days, args.seed)
+    print(f"Wrote {len(paths)} statements to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,32 @@
+import argparse
+import json
+import sys
+
+from src import log
+from src import mongo as db
 from src import pdfDataOrchestrator as pdfOrch
 
 if __name__ == "__main__":
-    result = pdfOrch.startorchestrator()
-    print(result)
+    parser = argparse.ArgumentParser(description="Parse unlocked bank statements and load them into MongoDB.")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes used to parse PDFs (default: INGEST_WORKERS or 1)")
+    parser.add_argument("--force", action="append", default=[], metavar="DOCUMENT_ID", help="re-ingest this statement even if it is unchanged (repeatable)")
+    parser.add_argument("--reenrich", action="store_true", help="rebuild transactions from the cached page tables only (no PDF parsing), e.g. after changing categorization rules")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="recompute the monthly rollup collection from the stored transactions and exit")
+    parser.add_argument("--ensure-indexes", action="store_true", help="create the MongoDB indexes and exit (ingestion also creates them)")
+    args = parser.parse_args()
+
+    log.setup_logging()
+    if args.ensure_indexes:
+        indexes = db.ensure_indexes()
+        print(f"Indexes created: {indexes['created']}")
+        for name, error in indexes["failed"].items():
+            print(f"Index not created: {name}: {error}")
+        db.close_client()
+        if indexes["failed"]:
+            sys.exit(1)
+    elif args.rebuild_rollups:
+        print(f"Rebuilt {db.rebuild_rollups()} rollup documents")
+        db.close_client()
+    else:
+        result = pdfOrch.startorchestrator(workers=args.workers, force_document_ids=args.force, reenrich=args.reenrich)
+        print(json.dumps(result, indent=2, default=str))
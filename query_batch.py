@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import inspect
+import json
+import time
+from datetime import datetime
+
+import query_expense as qe
+from src import env
+
+# Batch runner for query_expense: answers a list of questions (e.g. the standard questions of a
+# monthly report) concurrently. Each question still goes generate query -> fetch -> summarize, but
+# while one question waits on the LLM another can be fetching from MongoDB or building its summary
+# context in a worker thread. LLM requests and questions in flight are each capped by a semaphore.
+
+def async_mongo_client():
+    """An asyncio MongoDB client: pymongo's AsyncMongoClient (pymongo 4.9+), else motor, else None."""
+    try:
+        from pymongo import AsyncMongoClient
+        return AsyncMongoClient(env.MONGODB_URI, maxPoolSize=env.MONGO_MAX_POOL_SIZE)
+    except ImportError:
+        pass
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(env.MONGODB_URI, maxPoolSize=env.MONGO_MAX_POOL_SIZE)
+    except ImportError:
+        return None
+
+class QueryBatchRunner:
+    """Runs questions through the query -> fetch -> summarize flow with bounded concurrency.
+
+    collection is an asyncio collection (AsyncMongoClient or motor). Without one, and when no async
+    driver is installed, fetches run the blocking query_expenses in worker threads on the shared
+    pymongo client, which still overlaps them with the LLM calls of other questions.
+    """
+
+    def __init__(self, llm_client=None, collection=None, concurrency=None, llm_concurrency=None, async_driver=True, summarize=True):
+        if llm_client is None:
+            import ollama # only the default client needs it
+            llm_client = ollama.AsyncClient()
+        self.llm = llm_client
+        self.client = None
+        if collection is None and async_driver and qe.expense_source() == "mongo": # other sources are read in worker threads
+            self.client = async_mongo_client()
+            if self.client is not None:
+                collection = self.client[env.DB_NAME][env.COLLECTION_NAME]
+        self.collection = collection
+        self.questions = asyncio.Semaphore(concurrency or env.QUERY_CONCURRENCY)
+        self.llm_slots = asyncio.Semaphore(llm_concurrency or env.LLM_CONCURRENCY)
+        self.summarize = summarize
+
+    async def chat(self, prompt: str) -> str:
+        async with self.llm_slots:
+            response = await self.llm.chat(model=qe.QUERY_MODEL, messages=[{"role": "user", "content": prompt}])
+        return response["message"]["content"]
+
+    async def stream_chat(self, prompt: str, result):
+        """chat, streamed; records the time to the first token in result["stages"]."""
+        started = time.perf_counter()
+        parts = []
+        async with self.llm_slots:
+            async for chunk in await self.llm.chat(model=qe.QUERY_MODEL, messages=[{"role": "user", "content": prompt}], stream=True):
+                if not parts:
+                    result["stages"]["first_token"] = round(time.perf_counter() - started, 3)
+                parts.append(chunk["message"]["content"])
+        return "".join(parts)
+
+    async def generate_query(self, question: str):
+        mongo_query = qe.local_mongo_query(question)
+        if mongo_query is not None:
+            return mongo_query
+        print(f"Generating {'SQL' if qe.expense_source() == 'sql' else 'MongoDB'} query for user input: {question}")
+        mongo_query = qe.parse_llm_query(await self.chat(qe.build_query_prompt(question)))
+        await asyncio.to_thread(qe.remember_mongo_query, question, mongo_query) # the query cache writes its file
+        return mongo_query
+
+    async def fetch(self, mongo_query, fields=None):
+        if self.collection is None:
+            return await asyncio.to_thread(qe.query_expenses, mongo_query, fields)
+        operation, query = qe.parse_query(mongo_query)
+        if operation == "find":
+            projection = {"_id": 0, **{field: 1 for field in fields}} if fields else None
+            cursor = self.collection.find(query, projection, batch_size=env.QUERY_BATCH_SIZE)
+        elif operation == "aggregate":
+            cursor = self.collection.aggregate(query, batchSize=env.QUERY_BATCH_SIZE)
+            if inspect.isawaitable(cursor): # AsyncMongoClient returns the cursor from a coroutine, motor directly
+                cursor = await cursor
+        else:
+            print("Unsupported query type.", mongo_query)
+            return []
+        results = []
+        async for doc in cursor:
+            if "_id" in doc:
+                doc["_id"] = str(doc["_id"])
+            results.append(doc)
+        print("Results Fetched:", len(results))
+        return results
+
+    async def answer(self, question: str):
+        result = {"question": question, "query": None, "results": 0, "answer": None, "error": None, "stages": {}}
+        async with self.questions:
+            started = time.perf_counter()
+            try:
+                stage_started = time.perf_counter()
+                result["query"] = await self.generate_query(question)
+                result["stages"]["generate"] = round(time.perf_counter() - stage_started, 3)
+                if not qe.validate_mongo_query(result["query"]):
+                    kind = "read-only SQL" if qe.expense_source() == "sql" else "MongoDB find or aggregate"
+                    raise ValueError(f"the generated query is not a valid {kind} query")
+
+                stage_started = time.perf_counter()
+                expenses = await self.fetch(result["query"])
+                result["results"] = len(expenses)
+                result["stages"]["fetch"] = round(time.perf_counter() - stage_started, 3)
+
+                if self.summarize:
+                    stage_started = time.perf_counter()
+                    # the summary context is built with pandas (and the cube for large results): run it in a
+                    # worker thread so the event loop keeps serving the other questions meanwhile
+                    prompt = await asyncio.to_thread(qe.build_summary_prompt, expenses, question)
+                    result["answer"] = await self.stream_chat(prompt, result)
+                    result["stages"]["summarize"] = round(time.perf_counter() - stage_started, 3)
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            result["seconds"] = round(time.perf_counter() - started, 3)
+        return result
+
+    async def run(self, questions):
+        """Answers in question order, plus the wall time against the sum of the per-question times."""
+        started = time.perf_counter()
+        try:
+            answers = await asyncio.gather(*(self.answer(question) for question in questions))
+        finally:
+            if self.client is not None:
+                closed = self.client.close() # a coroutine with AsyncMongoClient
+                if inspect.isawaitable(closed):
+                    await closed
+        seconds = time.perf_counter() - started
+        return {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "questions": len(answers),
+            "failed": sum(1 for answer in answers if answer["error"]),
+            "seconds": round(seconds, 3),
+            "sequential_seconds": round(sum(answer["seconds"] for answer in answers), 3),
+            "answers": answers,
+        }
+
+def run_batch(questions, **options):
+    return asyncio.run(QueryBatchRunner(**options).run(questions))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of questions (one per line) concurrently.")
+    parser.add_argument("questions", help="text file with one question per line")
+    parser.add_argument("--concurrency", type=int, help=f"questions in flight (default QUERY_CONCURRENCY={env.QUERY_CONCURRENCY})")
+    parser.add_argument("--llm-concurrency", type=int, help=f"simultaneous Ollama requests (default LLM_CONCURRENCY={env.LLM_CONCURRENCY})")
+    parser.add_argument("--no-summary", action="store_true", help="only generate and run the queries")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    with open(args.questions, "r") as file:
+        questions = [line.strip() for line in file if line.strip() and not line.startswith("#")]
+    report = run_batch(questions, concurrency=args.concurrency, llm_concurrency=args.llm_concurrency, summarize=not args.no_summary)
+    qe.close_client()
+    print(json.dumps(report, indent=2, default=str))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2, default=str)
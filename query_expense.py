@@ -1,22 +1,25 @@
 from pymongo import MongoClient
-from dotenv import load_dotenv
-import os
+import calendar
 import json
-import ollama
-import pandas as pd
+import time
 from datetime import datetime
+from src import env, intent_parser, mongo, parquet_store, query_cache, store
+# ollama, pandas (with src.expense_analytics) and src.sql_store (with duckdb) are imported by the
+# functions that use them: a cached or rule-parsed question, or query_batch's startup, never loads them
+# Settings (MONGODB_URI, EXPENSE_SOURCE, QUERY_BATCH_SIZE, ...) are read from src.env when used.
 
+QUERY_MODEL = "llama3"
 
-load_dotenv()
-MONGODB_URI = os.getenv("MONGODB_URI")
-DB_NAME = os.getenv("DB_NAME")
-COLLECTION_NAME = os.getenv("COLLECTION_NAME")
+def expense_source() -> str:
+    """EXPENSE_SOURCE: "mongo", "sql" for the embedded DuckDB/SQLite store, or "parquet" to analyse the Parquet export offline."""
+    return env.EXPENSE_SOURCE or ("mongo" if env.STORE_BACKEND == "mongo" else "sql")
 
 ALLOWED_FIELDS = {
+    "bank_name", "document_id",
     "date", "month_year", "quarter", "day_of_week", "is_weekend",
     "description", "debit", "credit", "balance", "payment_method",
     "transaction_category", "is_debit", "is_credit", "amount_range",
-    "is_recurrring", "recipient_bank_details.source", "recipient_bank_details.sendTo",
+    "is_recurring", "recipient_bank_details.source", "recipient_bank_details.sendTo",
     "recipient_bank_details.transaction_id", "recipient_bank_details.recipient_name",
     "recipient_bank_details.bank_name"
 }
@@ -92,7 +95,7 @@ SCHEMA_FIELDS = {
       "type": "string",
       "enum": ["SMALL", "MEDIUM", "LARGE", "VERY_LARGE"]
     },
-    "is_recurrring": {
+    "is_recurring": {
       "type": "boolean",
     },
     "recipient_bank_details": {
@@ -104,7 +107,7 @@ SCHEMA_FIELDS = {
         },
         "sendTo": {
           "type": "string",
-          "enum": ["merchant", "individual", "bank", "government", "organization"]
+          "enum": ["MERCHANT", "PERSONAL", ""]
         },
         "transaction_id": {
           "type": "string",
@@ -121,12 +124,93 @@ SCHEMA_FIELDS = {
   }
 }
 
+_client = None
+_sql_store = None
+
+def get_client():
+    """Shared MongoClient; its connection pool is reused by every query instead of reconnecting per call."""
+    global _client
+    if _client is None:
+        _client = MongoClient(env.MONGODB_URI, maxPoolSize=env.MONGO_MAX_POOL_SIZE)
+    return _client
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+    global _sql_store
+    if _sql_store is not None:
+        _sql_store.close()
+        _sql_store = None
+
+def get_sql_store():
+    """Shared read-only connection to the embedded transactions store."""
+    global _sql_store
+    if _sql_store is None:
+        _sql_store = store.open_store(env.STORE_BACKEND if env.STORE_BACKEND != "mongo" else "embedded", read_only=True)
+    return _sql_store
+
+def get_collection(name=None):
+    return get_client()[env.DB_NAME][name or env.COLLECTION_NAME]
+
 # {{"operation": "find", "filter": {{"field": "value"}}}}
 # {{"operation": "aggregate", "pipeline": [{{"$match": {{"field": "value"}}}}, {{"$group": {{"_id": "$field", "total": {{"$sum": "$amount"}}}}}}]}}
 
 def generate_mongo_query(user_query: str):
-    print(f"Generating MongoDB query for user input: {user_query}")
-    prompt = f"""You are a MongoDB query translator. Convert user requests into valid MongoDB operations.
+    mongo_query = local_mongo_query(user_query)
+    if mongo_query is not None:
+        return mongo_query
+    mongo_query = llm_mongo_query(user_query)
+    remember_mongo_query(user_query, mongo_query)
+    return mongo_query
+
+def query_model_key() -> str:
+    # SQL and MongoDB queries for the same question are cached apart
+    return f"{QUERY_MODEL}|sql" if expense_source() == "sql" else QUERY_MODEL
+
+def local_mongo_query(user_query: str):
+    """The query for a question from the intent parser or the query cache, None when the LLM is needed."""
+    if env.INTENT_PARSER and expense_source() != "sql": # the intent parser builds MongoDB filters
+        parsed = intent_parser.parse_question(user_query)
+        if parsed is not None:
+            print(f"Intent parser matched {parsed['intent']} for: {user_query}")
+            return parsed["query"]
+
+    cache = query_cache.get_query_cache()
+    if cache is not None:
+        mongo_query = cache.get(user_query, query_model_key())
+        if mongo_query is not None:
+            print(f"Query cache hit for: {user_query} ({cache.stats()})")
+            return mongo_query
+    return None
+
+def remember_mongo_query(user_query: str, mongo_query):
+    cache = query_cache.get_query_cache()
+    if cache is not None and validate_mongo_query(mongo_query):
+        cache.put(user_query, query_model_key(), mongo_query)
+
+def llm_mongo_query(user_query: str):
+    import ollama
+    print(f"Generating {'SQL' if expense_source() == 'sql' else 'MongoDB'} query for user input: {user_query}")
+    response = ollama.chat(
+        model=QUERY_MODEL, 
+        messages=[{"role": "user", "content": build_query_prompt(user_query)}]
+    )
+    return parse_llm_query(response["message"]["content"])
+
+def parse_llm_query(content: str):
+    try:
+        mongo_query = json.loads(content)
+        return mongo_query
+    except Exception as e:
+        print("Error parsing LLM output:", e)
+        return None
+
+def build_query_prompt(user_query: str) -> str:
+    if expense_source() == "sql":
+        return build_sql_prompt(user_query)
+    return f"""You are a MongoDB query translator. Convert user requests into valid MongoDB operations.
 
         CRITICAL RULES:
         1. Output ONLY valid JSON - no explanations, no extra text
@@ -172,57 +256,285 @@ def generate_mongo_query(user_query: str):
         User request: "{user_query}"
     """
 
-    response = ollama.chat(
-        model="llama3", 
-        messages=[{"role": "user", "content": prompt}]
-    )
-    
+def build_sql_prompt(user_query: str) -> str:
+    from src import sql_store
+    dialect = "DuckDB" if get_sql_store().name == "duckdb" else "SQLite"
+    date_type = "DATE" if dialect == "DuckDB" else "TEXT ('YYYY-MM-DD')"
+    columns = ", ".join(f"{name} {date_type if name == 'date' else kind}" for name, kind in sql_store.COLUMNS)
+    return f"""You are a {dialect} SQL query translator. Convert user requests into one read-only SQL query.
+
+        CRITICAL RULES:
+        1. Output ONLY valid JSON - no explanations, no extra text
+        2. Output format: {{"operation": "sql", "query": "SELECT ..."}}
+        3. Only SELECT (or WITH ... SELECT) statements, one statement, no semicolons
+        4. Use lower(...) for case-insensitive text matching
+
+        TABLE:
+        {sql_store.TABLE}({columns})
+        - debit is the amount spent, credit the amount received; the other one is 0.0 (NULL only when the amount could not be read)
+        - recipient_send_to is 'MERCHANT', 'PERSONAL' or '' (unknown); it is NULL for rows without recipient details
+        - Follow this schema for the values of each field: {json.dumps(SCHEMA_FIELDS)}
+
+        DATE QUERIES:
+        - Date range: CAST(date AS VARCHAR) BETWEEN '2025-04-01' AND '2025-04-30'
+        - Whole month: month_year = '2025-04'
+
+        EXAMPLES:
+        User: "Show me transactions on April 1st"
+        Output: {{"operation": "sql", "query": "SELECT date, description, debit, credit, transaction_category FROM {sql_store.TABLE} WHERE CAST(date AS VARCHAR) = '2025-04-01'"}}
+
+        User: "Total amount spent in April"
+        Output: {{"operation": "sql", "query": "SELECT SUM(debit) AS total FROM {sql_store.TABLE} WHERE month_year = '2025-04'"}}
+
+        Remember: Output ONLY the JSON, nothing else.
+
+        User request: "{user_query}"
+    """
+
+def validate_mongo_query(mongo_query) -> bool:
+    """Whether a generated query can be run: a find filter, a pipeline of $ stages, or a read-only SQL SELECT."""
+    if not isinstance(mongo_query, dict):
+        return False
+    operation, query = parse_query(mongo_query)
+    if operation == "sql":
+        from src import sql_store
+        return sql_store.is_read_only_sql(query)
+    if operation == "find":
+        return isinstance(query, dict)
+    if operation == "aggregate":
+        return isinstance(query, list) and all(
+            isinstance(stage, dict) and len(stage) == 1 and next(iter(stage)).startswith("$") for stage in query
+        )
+    return False
+
+def find_collscans(plan):
+    """Every COLLSCAN stage in an explain() plan, however deeply the planner nested it."""
+    scans = []
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            scans.append(plan)
+        for value in plan.values():
+            scans.extend(find_collscans(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            scans.extend(find_collscans(value))
+    return scans
+
+def explain_query(collection, operation, query):
+    # queryPlanner verbosity only plans the query, it does not run it
     try:
-        mongo_query = json.loads(response["message"]["content"])
-        return mongo_query
+        if operation == "find":
+            plan = collection.database.command("explain", {"find": collection.name, "filter": query}, verbosity="queryPlanner")
+        else:
+            plan = collection.database.command("explain", {"aggregate": collection.name, "pipeline": query, "cursor": {}}, verbosity="queryPlanner")
     except Exception as e:
-        print("Error parsing LLM output:", e)
+        print(f"Could not explain {operation} query: {e}")
         return None
+    if find_collscans(plan):
+        print(f"WARNING: {operation} query scans the whole collection (COLLSCAN), no index matches it: {json.dumps(query, default=str)}")
+    return plan
 
-def query_expenses(user_query: str):
-    print(f"Fetching Expenses")
-    client = MongoClient(MONGODB_URI)
-    db=client[DB_NAME]
-    collection=db[COLLECTION_NAME]
-    #results = collection.find({'payment_method':'OTHER'})
+def parse_query(user_query):
+    """("find", filter), ("aggregate", pipeline) or ("sql", statement) from a generated query, or (None, None)."""
+    if user_query.get("operation") == "sql":
+        return "sql", user_query.get("query")
     if "find" in user_query or (user_query.get("operation") == "find"):
         if "find" in user_query:
-            query = user_query["find"].get("filter", user_query["find"])
-        else:
-            query = user_query.get("filter", {})
-        cursor = collection.find(query)
-        results = list(cursor)
-    elif "aggregate" in user_query or (user_query.get("operation") == "aggregate"):
+            return "find", user_query["find"].get("filter", user_query["find"])
+        return "find", user_query.get("filter", {})
+    if "aggregate" in user_query or (user_query.get("operation") == "aggregate"):
         if "aggregate" in user_query:
-            pipeline = user_query["aggregate"].get("pipeline", user_query["aggregate"])
-        else:
-            pipeline = user_query.get("pipeline", [])
-        cursor = collection.aggregate(pipeline)
-        results = list(cursor)
-    else:
+            return "aggregate", user_query["aggregate"].get("pipeline", user_query["aggregate"])
+        return "aggregate", user_query.get("pipeline", [])
+    return None, None
+
+def iter_expense_batches(user_query, fields=None, batch_size=None):
+    """Yield the results of a generated query as lists of at most batch_size documents.
+
+    find results are projected to fields when given (by default whole documents, with _id as a string);
+    aggregate results keep the shape the pipeline gives them.
+    """
+    batch_size = batch_size or env.QUERY_BATCH_SIZE
+    collection = get_collection()
+    operation, query = parse_query(user_query)
+    if operation is None:
         print("Unsupported query type.", user_query)
-        
-    for doc in results:
-        doc['_id'] = str(doc['_id'])  
+        return
+    if env.EXPLAIN_QUERIES:
+        explain_query(collection, operation, query)
+    if operation == "find":
+        projection = {"_id": 0, **{field: 1 for field in fields}} if fields else None
+        cursor = collection.find(query, projection, batch_size=batch_size)
+    else:
+        cursor = collection.aggregate(query, batchSize=batch_size)
 
+    batch = []
+    with cursor:
+        for doc in cursor:
+            if "_id" in doc:
+                doc['_id'] = str(doc['_id'])
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def query_expenses(user_query, fields=None, batch_size=None):
+    print(f"Fetching Expenses")
+    if expense_source() != "mongo":
+        return expenses_dataframe(user_query, fields, batch_size).to_dict(orient="records")
+    results = [doc for batch in iter_expense_batches(user_query, fields, batch_size) for doc in batch]
     print("Results Fetched:", len(results))
     # print(json.dumps(expenses, indent=2))
-    client.close()
     return results
 
-def summarize_expenses(expenses, user_query: str):
+def expenses_dataframe(user_query, fields=None, batch_size=None):
+    """DataFrame of a generated query's results, built batch by batch from the cursor.
+
+    Plain find queries go through PyMongoArrow's bulk conversion when it is installed.
+    With EXPENSE_SOURCE=parquet the rows come from the Parquet export instead of MongoDB,
+    with EXPENSE_SOURCE=sql from the embedded store.
+    """
+    import pandas as pd
+    if expense_source() == "parquet":
+        return parquet_dataframe(user_query, fields)
+    if expense_source() == "sql":
+        return sql_dataframe(user_query)
+    operation, query = parse_query(user_query)
+    if operation == "find":
+        try:
+            from pymongoarrow.api import find_pandas_all
+        except ImportError:
+            find_pandas_all = None
+        if find_pandas_all is not None:
+            projection = {"_id": 0, **{field: 1 for field in fields}} if fields else None
+            df = find_pandas_all(get_collection(), query, projection=projection)
+            print("Results Fetched:", len(df))
+            return df
+    frames = [pd.DataFrame.from_records(batch) for batch in iter_expense_batches(user_query, fields, batch_size)]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    print("Results Fetched:", len(df))
+    return df
+
+def parquet_dataframe(user_query, fields=None, root=None):
+    """DataFrame of a find query run on the memory-mapped Parquet export (src/parquet_store.py), no MongoDB needed."""
+    import pandas as pd
+    operation, query = parse_query(user_query)
+    if operation != "find":
+        print("Only find queries can run on the Parquet export.", user_query)
+        return pd.DataFrame()
+    df = parquet_store.read_table(query, fields, root).to_pandas()
+    for column in df.select_dtypes("category"):
+        # categories in lexical order, so groupby and sorting order them like the strings from MongoDB
+        df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    print("Results Fetched:", len(df))
+    return df
+
+def sql_dataframe(user_query):
+    """DataFrame of a generated SQL query run on the embedded store, with recipient columns named as in the Parquet export."""
+    import pandas as pd
+    from src import sql_store
+    operation, query = parse_query(user_query)
+    if operation != "sql" or not sql_store.is_read_only_sql(query):
+        print("Only read-only SQL queries can run on the embedded store.", user_query)
+        return pd.DataFrame()
+    df = sql_store.to_document_columns(get_sql_store().query(query))
+    print("Results Fetched:", len(df))
+    return df
+
+def summarize_expenses(expenses, user_query: str, stream: bool = True, on_token=None):
+    """The LLM's answer for the results of a question; streamed, each piece goes to on_token (default: printed) as it arrives."""
+    import ollama
     print(f"Summarizing {len(expenses)} expense results.")
-    
-    prompt = f"""
+    messages = [{"role": "user", "content": build_summary_prompt(expenses, user_query)}]
+    if not stream:
+        response = ollama.chat(model=QUERY_MODEL, messages=messages)
+        return response["message"]["content"]
+
+    on_token = on_token or (lambda token: print(token, end="", flush=True))
+    started = time.perf_counter()
+    first_token = None
+    parts = []
+    for chunk in ollama.chat(model=QUERY_MODEL, messages=messages, stream=True):
+        token = chunk["message"]["content"]
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        parts.append(token)
+        on_token(token)
+    print(f"\nSummary streamed: first token after {first_token or 0:.2f}s, complete after {time.perf_counter() - started:.2f}s")
+    return "".join(parts)
+
+#region summary context budget
+def estimate_tokens(text: str) -> int:
+    # about 4 characters per token for English and JSON with llama-style tokenizers
+    return len(text) // 4 + 1
+
+def _compact_json(value) -> str:
+    return json.dumps(stringify_keys(value), default=str, separators=(",", ":"))
+
+def summary_aggregates(df):
+    """Sections of pre-computed aggregates for a result of transactions, most important first."""
+    import pandas as pd
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    for column in ('debit', 'credit'):
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0.0) if column in df else 0.0
+    sections = [
+        ("time_period", {"start": df['date'].min().date(), "end": df['date'].max().date()}),
+        ("overview_stats", {name: round(float(value), 2) if pd.notna(value) else None for name, value in overview_stats(df).items()}),
+    ]
+    if 'transaction_category' in df:
+        by_category = df.groupby('transaction_category')
+        sections.append(("category_totals", by_category['debit'].sum().round(2).sort_values(ascending=False).to_dict()))
+        sections.append(("category_counts", by_category['debit'].count().to_dict()))
+    monthly = df.groupby(df['date'].dt.to_period("M"))
+    sections.append(("monthly_totals", {"debit": monthly['debit'].sum().round(2).to_dict(), "credit": monthly['credit'].sum().round(2).to_dict()}))
+    top_columns = [column for column in ('date', 'description', 'debit', 'transaction_category') if column in df]
+    sections.append(("top_expenses", df.sort_values(by='debit', ascending=False).head(10)[top_columns].to_dict(orient='records')))
+    if 'recipient_bank_details' in df or 'recipient_bank_details.recipient_name' in df:
+        names = recipient_names(df)
+        sections.append(("top_recipients", df.groupby(names)['debit'].sum().round(2).sort_values(ascending=False).head(10).to_dict()))
+    if 'day_of_week' in df:
+        sections.append(("weekday_totals", df.groupby('day_of_week')['debit'].sum().round(2).to_dict()))
+    return sections
+
+def summary_context(expenses, budget: int = None) -> str:
+    """The results as they go into the summary prompt, kept within about budget tokens.
+
+    Small results go in as rows. Larger results of transactions are replaced by aggregates, added
+    section by section while they fit; other results (aggregation output) are cut to the rows that fit.
+    """
+    budget = budget or env.SUMMARY_TOKEN_BUDGET
+    kept, used = [], 0
+    for doc in expenses: # stops at the first row over budget, so a huge result is not serialized just to be measured
+        used += estimate_tokens(_compact_json(doc))
+        if used > budget:
+            break
+        kept.append(doc)
+    if len(kept) == len(expenses):
+        return _compact_json(expenses)
+
+    if expenses and all(isinstance(doc, dict) and 'date' in doc and 'debit' in doc for doc in expenses):
+        import pandas as pd
+        aggregates = {}
+        for name, section in summary_aggregates(pd.DataFrame(expenses)):
+            candidate = {**aggregates, name: section}
+            if aggregates and estimate_tokens(_compact_json(candidate)) > budget:
+                break
+            aggregates = candidate
+        return (f"{len(expenses)} transactions matched; too many to list, so these are pre-computed aggregates of all of them:\n"
+                + _compact_json(aggregates))
+
+    return f"First {len(kept)} of {len(expenses)} result rows:\n" + _compact_json(kept)
+#endregion
+
+def build_summary_prompt(expenses, user_query: str) -> str:
+    return f"""
         You are a financial assistant analyzing expense data. Your task is to provide a clear, helpful response based on the user's query and the MongoDB results.
 
         User Query: "{user_query}"
-        Database Results: {expenses}
+        Database Results: {summary_context(expenses)}
 
         Instructions:
         1. Directly answer the user's specific question
@@ -246,101 +558,64 @@ def summarize_expenses(expenses, user_query: str):
 
         Provide a helpful, human-friendly response:
         """
-    
-    response = ollama.chat(
-        model="llama3", 
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response["message"]["content"]
+
+def overview_stats(df):
+    return {
+        "total_transactions": len(df),
+        "total_spent": df['debit'].sum(),
+        "total_received": df['credit'].sum(),
+        "average_debit": df['debit'].mean(),
+        "average_credit": df['credit'].mean(),
+        "median_debit": df['debit'].median(),
+        "median_credit": df['credit'].median(),
+        "max_debit": df['debit'].max(),
+        "max_credit": df['credit'].max(),
+        "min_debit": df['debit'].min(),
+        "min_credit": df['credit'].min(),
+        "std_dev_debit": df['debit'].std(),
+        "std_dev_credit": df['credit'].std(),
+    }
 
 def analyze_large_dataset_pandas(expenses):
-    df = pd.DataFrame(expenses)
+    panda_analysis = pandas_analysis(expenses)
+    print ("Pandas Analysis Result:")
+    print(json.dumps(stringify_keys(panda_analysis), indent=2, default=str))
+    return panda_analysis
+
+def pandas_analysis(expenses):
+    # expenses: list of documents, or a DataFrame from expenses_dataframe
+    import pandas as pd
+    from src.expense_analytics import ExpenseCube
+    df = expenses if isinstance(expenses, pd.DataFrame) else pd.DataFrame(expenses)
     df['date'] = pd.to_datetime(df['date'])
+    cube = ExpenseCube(df) # one groupby; the summaries below are regroups of it
+    categories = cube.category_totals()
     start= df['date'].min().date(),
     end= df['date'].max().date(),
-    panda_analysis = {
+    return {
         "analysis_id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}",
         "time_period": {"start": start, "end": end},
-        "overview_stats": {
-            "total_transactions": len(df),
-            "total_spent": df['debit'].sum(),
-            "total_received": df['credit'].sum(),
-            "average_debit": df['debit'].mean(),
-            "average_credit": df['credit'].mean(),
-            "median_debit": df['debit'].median(),
-            "median_credit": df['credit'].median(),
-            "max_debit": df['debit'].max(),
-            "max_credit": df['credit'].max(),
-            "min_debit": df['debit'].min(),
-            "min_credit": df['credit'].min(),
-            "std_dev_debit": df['debit'].std(),
-            "std_dev_credit": df['credit'].std(),
-        },
+        "overview_stats": overview_stats(df),
         "temporal_analysis": {
-            "yearly_summary": df.groupby(df['date'].dt.year).agg({
-                'debit': ['sum', 'mean', 'max'],
-                'credit': ['sum', 'mean', 'max'],
-                'date': 'count'
-            }).rename(columns={'date': 'transaction_count'}).to_dict(orient='index'),
-            # "yearly_summary": df.groupby(df['date'].str[:4]).agg({
-            #     'debit': ['sum', 'mean', 'max'],
-            #     'credit': ['sum', 'mean', 'max'],
-            #     'date': 'count'
-            # }).rename(columns={'date': 'transaction_count'}).to_dict(orient='index'),
-            "monthly_summary": df.groupby('month_year').agg({
-                'debit': ['sum', 'mean', 'max'],
-                'credit': ['sum', 'mean', 'max'],
-                'date': 'count'
-            }).rename(columns={'date': 'transaction_count'}).to_dict(orient='index'),
-            "weekday_analysis": df.groupby('day_of_week').agg({
-                'debit': ['sum', 'mean', 'count'],
-                'credit': ['sum', 'mean', 'count'],
-                'date': 'count'
-            }).rename(columns={'date': 'transaction_count'}).to_dict(orient='index'),
-            "yearly_totals": {
-            "debit": df.groupby(df["date"].dt.year)["debit"].sum().to_dict(),
-            "credit": df.groupby(df["date"].dt.year)["credit"].sum().to_dict(),
-            "net": df.groupby(df["date"].dt.year).apply(lambda x: x["credit"].sum() - x["debit"].sum()).to_dict()
-            },
-            "monthly_totals": {
-                "debit": df.groupby(df["date"].dt.to_period("M"))["debit"].sum().to_dict(),
-                "credit": df.groupby(df["date"].dt.to_period("M"))["credit"].sum().to_dict(),
-                "net": df.groupby(df["date"].dt.to_period("M")).apply(lambda x: x["credit"].sum() - x["debit"].sum()).to_dict()
-            },
-            "quarterly_totals": {
-                "debit": df.groupby(df["date"].dt.to_period("Q"))["debit"].sum().to_dict(),
-                "credit": df.groupby(df["date"].dt.to_period("Q"))["credit"].sum().to_dict(),
-                "net": df.groupby(df["date"].dt.to_period("Q")).apply(lambda x: x["credit"].sum() - x["debit"].sum()).to_dict()
-            },
-            # "daily_totals": {
-            #     "debit": df.groupby(df["date"].dt.date)["debit"].sum().to_dict(),
-            #     "credit": df.groupby(df["date"].dt.date)["credit"].sum().to_dict(),
-            #     "net": df.groupby(df["date"].dt.date).apply(lambda x: x["credit"].sum() - x["debit"].sum()).to_dict()
-            # },
-            # "daily_averages": {
-            #     "debit": df.groupby(df["date"].dt.date)["debit"].mean().to_dict(),
-            #     "credit": df.groupby(df["date"].dt.date)["credit"].mean().to_dict()
-            # },
-            "weekend_vs_weekday": df.groupby('is_weekend').agg({
-                'debit': ['sum', 'mean', 'count'],
-                'credit': ['sum', 'mean', 'count'],
-                'date': 'count'
-            }).rename(columns={'date': 'transaction_count'}).to_dict(orient='index'),#todo: need to optimize weekend_vs_weekday, to show count in weekday and weekend
+            "yearly_summary": cube.yearly_summary(),
+            "monthly_summary": cube.monthly_summary(),
+            "weekday_analysis": cube.weekday_summary(),
+            "yearly_totals": cube.period_totals("Y"),
+            "monthly_totals": cube.period_totals("M"),
+            "quarterly_totals": cube.period_totals("Q"),
+            "weekend_vs_weekday": cube.weekend_summary(), #todo: need to optimize weekend_vs_weekday, to show count in weekday and weekend
         },
         "categorical_analysis": {
-            "totals": df.groupby('transaction_category')["debit"].sum().sort_values(ascending=False).to_dict(),
-            "counts": df.groupby('transaction_category')['debit'].count().to_dict(),
-            "averages": df.groupby('transaction_category')["debit"].mean().to_dict(),
+            "totals": categories["totals"],
+            "counts": categories["counts"],
+            "averages": categories["averages"],
             # "top_expenses": df.sort_values(by='debit', ascending=False).head(3)[['date', 'description', 'debit', 'transaction_category']].to_dict(orient='records'),
             "top_expenses": df[df['transaction_category'] != "PERSONAL"].sort_values(by='debit', ascending=False).head(10)[['date', 'description', 'debit', 'transaction_category']].to_dict(orient='records'),
-            "category_trends": calculate_category_trends(df),
+            "category_trends": calculate_category_trends(df, cube),
             "merchant_trends": analyze_merchant_trends(df),
         }
     }
 
-    print ("Pandas Analysis Result:")
-    print(json.dumps(stringify_keys(panda_analysis), indent=2, default=str))
-
 def determine_trend_direction(recent_data) -> str:
     
     first_value = recent_data.iloc[0]
@@ -353,10 +628,16 @@ def determine_trend_direction(recent_data) -> str:
     else:
         return "stable"
 
-def calculate_category_trends(df):
-    debit_df = df[(df['is_debit'] == True) & (df['transaction_category'] != "PERSONAL")].copy()
-    # credit_df = df[df['is_credit'] == True].copy()
-    credit_df = df[(df['is_credit'] == True) & (df['transaction_category'] != "PERSONAL")].copy()
+def calculate_category_trends(df, cube=None):
+    # monthly amounts and counts per category come from the cube, not from masking df once per category
+    from src.expense_analytics import ExpenseCube
+    cube = cube if cube is not None else ExpenseCube(df)
+    return build_category_trends(*cube.category_trend_inputs())
+
+def build_category_trends(monthly_debit, monthly_credit, expense_counts, income_counts):
+    # monthly_debit / monthly_credit: month_year x category sums (None when there are no expense / income rows)
+    # expense_counts / income_counts: category -> number of non-PERSONAL debit / credit rows
+    import pandas as pd
     trends={
         'expense_trends': {},
         'income_trends': {},
@@ -366,8 +647,8 @@ def calculate_category_trends(df):
     }
 
     # Expense Trends
-    if not debit_df.empty:
-      monthly_category = df.groupby(['month_year', 'transaction_category'])['debit'].sum().unstack(fill_value=0)
+    if monthly_debit is not None:
+      monthly_category = monthly_debit
       
       for category in monthly_category.columns:
           category_data= monthly_category[category]
@@ -406,8 +687,8 @@ def calculate_category_trends(df):
           # print(json.dumps(stringify_keys(trends['expense_trends'][category]), indent=2))
 
     # Income Trends
-    if not credit_df.empty:
-      monthly_category = df.groupby(['month_year', 'transaction_category'])['credit'].sum().unstack(fill_value=0)
+    if monthly_credit is not None:
+      monthly_category = monthly_credit
       
       for category in monthly_category.columns:
           category_data= monthly_category[category]
@@ -485,8 +766,8 @@ def calculate_category_trends(df):
         income_info = trends['income_trends'].get(category)
         net_info = trends['net_trends'].get(category)
 
-        expense_count = len(debit_df[debit_df["transaction_category"] == category]) if not debit_df.empty else 0
-        income_count = len(credit_df[credit_df["transaction_category"] == category]) if not credit_df.empty else 0
+        expense_count = int(expense_counts.get(category, 0))
+        income_count = int(income_counts.get(category, 0))
 
         trends["category_summary"][category] = {
             'category': category,
@@ -537,14 +818,12 @@ def calculate_category_trends(df):
 
 def analyze_merchant_trends(df): # use only data with sendTo as merchant
     
-    df_merchants = df[df['recipient_bank_details'].apply(lambda bd: isinstance(bd, dict) and bd.get('sendTo', '').lower() == 'merchant')].copy()
-    # df_merchants = df.loc[df['recipient_bank_details'].apply(lambda bd: isinstance(bd, dict) and bd.get('sendTo', '').lower() == 'merchant')]
-    # print(df_merchants["transaction_category"].head(2))
-    df_merchants.loc[:, 'merchant_name'] = df_merchants['recipient_bank_details'].apply(extract_merchant_name)
-    # merchant_stats = df[df['is_debit'] == True].groupby('merchant_name').agg({
-    #     'debit': ['sum', 'mean', 'count', 'max'],
-    #     'date': ['min', 'max']
-    # }).rename(columns={'date': 'transaction_count'})
+    if 'recipient_bank_details' in df:
+        send_to = df['recipient_bank_details'].str.get('sendTo') # NaN for rows without bank details
+    else: # flattened columns of the Parquet export
+        send_to = df['recipient_bank_details.sendTo'].astype(object)
+    df_merchants = df[(send_to.str.lower() == 'merchant').fillna(False).astype(bool)].copy()
+    df_merchants['merchant_name'] = recipient_names(df_merchants)
     merchant_stats=df_merchants.groupby("merchant_name")["debit"].agg([
         'sum', 'mean', 'count', 'max', 'min', 'std', 'median'
     ]).round(2).rename(columns={
@@ -559,17 +838,23 @@ def analyze_merchant_trends(df): # use only data with sendTo as merchant
     merchant_stats=merchant_stats.sort_values(by='total_spent', ascending=False)
 
     merchant_trends = {}
-    monthly_merchant = df_merchants.groupby(['month_year', 'merchant_name'])['debit'].sum().unstack(fill_value=0)
     top_merchants = merchant_stats.head(10).index.tolist()
+    # everything per merchant is grouped once over the top merchants' rows instead of masking df_merchants per merchant
+    top_rows = df_merchants[df_merchants['merchant_name'].isin(top_merchants)]
+    all_months = df_merchants['month_year'].dropna().drop_duplicates().sort_values()
+    monthly_merchant = top_rows.groupby(['month_year', 'merchant_name'])['debit'].sum().unstack(fill_value=0).reindex(all_months, fill_value=0)
+    by_merchant = top_rows.groupby('merchant_name', sort=False)
+    visits = by_merchant.size()
+    first_dates, last_dates = by_merchant['date'].min(), by_merchant['date'].max()
+    ordered = top_rows[['merchant_name', 'date']].sort_values('date', kind='stable')
+    avg_gaps = ordered.groupby('merchant_name')['date'].diff().dt.days.groupby(ordered['merchant_name']).mean()
+    categories_used = by_merchant['transaction_category'].unique()
+    payment_methods_used = by_merchant['payment_method'].unique()
 
     for merchant in top_merchants:
         merchant_data = monthly_merchant[merchant]
-        merchant_transactions = df_merchants[df_merchants['merchant_name'] == merchant]
-        transaction_dates = merchant_transactions['date'].sort_values()
-        if len(transaction_dates) > 1:
-            date_diffs = transaction_dates.diff().dt.days.dropna()
-            avg_days_between = float(date_diffs.mean()) if len(date_diffs) > 0 else 0
-        else:
+        avg_days_between = float(avg_gaps.get(merchant, 0)) if visits[merchant] > 1 else 0
+        if avg_days_between != avg_days_between: # NaN: no two dated visits
             avg_days_between = 0
 
         merchant_trends[merchant] = {
@@ -583,10 +868,10 @@ def analyze_merchant_trends(df): # use only data with sendTo as merchant
             'least_active_month': str(merchant_data.idxmin()) if len(merchant_data) > 0 else None,
             'avg_days_between_visits': avg_days_between,
             'visit_frequency': 'regular' if avg_days_between < 14 else 'occasional' if avg_days_between < 30 else 'rare',
-            'first_transaction': str(transaction_dates.min().date()) if len(transaction_dates) > 0 else None,
-            'last_transaction': str(transaction_dates.max().date()) if len(transaction_dates) > 0 else None,
-            'categories_used': merchant_transactions['transaction_category'].unique().tolist(),
-            'payment_methods_used': merchant_transactions['payment_method'].unique().tolist()
+            'first_transaction': str(first_dates[merchant].date()) if visits[merchant] > 0 else None,
+            'last_transaction': str(last_dates[merchant].date()) if visits[merchant] > 0 else None,
+            'categories_used': list(categories_used[merchant]),
+            'payment_methods_used': list(payment_methods_used[merchant])
         }
     
     merchant_analysis = {
@@ -605,6 +890,217 @@ def analyze_merchant_trends(df): # use only data with sendTo as merchant
     # print("-----------------")
 
 
+#region rollup queries
+# Summaries and trends over whole months read the pre-aggregated rollup documents, one per
+# (bank, month, category, payment method, debit/credit), instead of loading every transaction.
+def get_rollup_collection():
+    # named from the collection the ingest writer fills (with ENV=dev, <collection>_dev_rollups)
+    return mongo.get_rollup_collection(get_collection(mongo.get_effective_collection_name()))
+
+def get_rollups(month_from=None, month_to=None, extra_filter=None):
+    query = dict(extra_filter or {})
+    month_range = {op: month for op, month in (("$gte", month_from), ("$lte", month_to)) if month}
+    if month_range:
+        query["month_year"] = month_range
+    return list(get_rollup_collection().find(query, {"_id": 0}, batch_size=env.QUERY_BATCH_SIZE))
+
+def _whole_month(value, bound):
+    # "YYYY-MM" of a "YYYY-MM-DD" date filter bound that falls on a month boundary, else None
+    try:
+        year, month, day = (int(part) for part in str(value).split("-"))
+    except ValueError:
+        return None
+    if bound == "$gte" and day == 1:
+        return f"{year:04d}-{month:02d}"
+    if bound == "$lt" and day == 1:
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        return f"{year:04d}-{month:02d}"
+    if bound == "$lte" and 1 <= month <= 12 and day >= calendar.monthrange(year, month)[1]:
+        return f"{year:04d}-{month:02d}"
+    return None
+
+def rollup_month_range(user_query):
+    """(first month, last month) of a find query that selects whole months and nothing else, else None.
+
+    The filter may be empty, a month_year value or range, or a date range from the first of a month
+    to the end of a month; either end can be open (None).
+    """
+    operation, query = parse_query(user_query)
+    if operation != "find" or not isinstance(query, dict) or set(query) - {"date", "month_year"} or len(query) > 1:
+        return None
+    if not query:
+        return None, None
+    field, condition = next(iter(query.items()))
+    if field == "month_year":
+        if isinstance(condition, str):
+            return condition, condition
+        if isinstance(condition, dict) and condition and set(condition) <= {"$gte", "$lte"}:
+            return condition.get("$gte"), condition.get("$lte")
+        return None
+    if not isinstance(condition, dict) or not condition or set(condition) - {"$gte", "$lte", "$lt"} or len(set(condition) & {"$lte", "$lt"}) > 1:
+        return None
+    months = {bound: _whole_month(value, bound) for bound, value in condition.items()}
+    if None in months.values():
+        return None
+    return months.get("$gte"), months.get("$lte") or months.get("$lt")
+
+def calculate_category_trends_from_rollups(rollups):
+    """Same result as calculate_category_trends on the transactions the rollups were built from."""
+    import pandas as pd
+    rollup_df = pd.DataFrame(rollups)
+    if rollup_df.empty:
+        return build_category_trends(None, None, {}, {})
+    non_personal = rollup_df[rollup_df['transaction_category'] != "PERSONAL"]
+    expense_counts = non_personal[non_personal['is_debit'] == True].groupby('transaction_category')['count'].sum().to_dict()
+    income_counts = non_personal.groupby('transaction_category')['credit_count'].sum().to_dict()
+    monthly = rollup_df.groupby(['month_year', 'transaction_category'])
+    monthly_debit = monthly['debit_sum'].sum().unstack(fill_value=0) if sum(expense_counts.values()) else None
+    monthly_credit = monthly['credit_sum'].sum().unstack(fill_value=0) if sum(income_counts.values()) else None
+    return build_category_trends(monthly_debit, monthly_credit, expense_counts, income_counts)
+
+def _rollup_summary(totals, third):
+    # same shape as the pandas agg: {('debit', 'sum'): .., ('debit', 'mean'): .., ('debit', third): .., ..}
+    count = totals["count"]
+    return {
+        ('debit', 'sum'): totals["debit"], ('debit', 'mean'): totals["debit"] / count, ('debit', third): totals[f"debit_{third}"],
+        ('credit', 'sum'): totals["credit"], ('credit', 'mean'): totals["credit"] / count, ('credit', third): totals[f"credit_{third}"],
+        ('transaction_count', 'count'): count,
+    }
+
+def monthly_summary_from_rollups(rollups):
+    """monthly_summary of analyze_large_dataset_pandas: debit/credit sum, mean and max plus row count per month."""
+    months = {}
+    for rollup in rollups:
+        month = months.setdefault(rollup["month_year"], {"count": 0, "debit": 0.0, "credit": 0.0, "debit_max": 0.0, "credit_max": 0.0})
+        month["count"] += rollup["count"]
+        month["debit"] += rollup["debit_sum"]
+        month["credit"] += rollup["credit_sum"]
+        side = "debit_max" if rollup["is_debit"] else "credit_max" # amount is the debit of debit rows, the credit of the rest
+        month[side] = max(month[side], rollup["amount_max"])
+    return {month: _rollup_summary(months[month], "max") for month in sorted(months)}
+
+def weekday_analysis_from_rollups(rollups):
+    """weekday_analysis of analyze_large_dataset_pandas: debit/credit sum, mean and count per day of week."""
+    days = {}
+    for rollup in rollups:
+        for day_name, values in rollup.get("by_weekday", {}).items():
+            day = days.setdefault(day_name, {"count": 0, "debit": 0.0, "credit": 0.0})
+            for field in day:
+                day[field] += values[field]
+    for day in days.values():
+        day["debit_count"] = day["credit_count"] = day["count"]
+    return {day: _rollup_summary(days[day], "count") for day in sorted(days)}
+
+def analyze_rollups(month_from=None, month_to=None):
+    """Monthly, weekday and category analysis for a range of months, computed from the rollups only."""
+    rollups = get_rollups(month_from, month_to)
+    print(f"Rollup documents fetched: {len(rollups)}")
+    if not rollups:
+        return None
+    categories = {}
+    for rollup in rollups:
+        category = categories.setdefault(rollup["transaction_category"], {"debit": 0.0, "count": 0})
+        category["debit"] += rollup["debit_sum"]
+        category["count"] += rollup["count"]
+    months = sorted({rollup["month_year"] for rollup in rollups})
+    rollup_analysis = {
+        "analysis_id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        "time_period": {"start": months[0], "end": months[-1]},
+        "temporal_analysis": {
+            "monthly_summary": monthly_summary_from_rollups(rollups),
+            "weekday_analysis": weekday_analysis_from_rollups(rollups),
+        },
+        "categorical_analysis": {
+            "totals": dict(sorted(((name, c["debit"]) for name, c in categories.items()), key=lambda item: item[1], reverse=True)),
+            "counts": {name: c["count"] for name, c in sorted(categories.items())},
+            "averages": {name: c["debit"] / c["count"] for name, c in sorted(categories.items())},
+            "category_trends": calculate_category_trends_from_rollups(rollups),
+        },
+    }
+    print("Rollup Analysis Result:")
+    print(json.dumps(stringify_keys(rollup_analysis), indent=2, default=str))
+    return rollup_analysis
+
+def analyze_expenses(user_query):
+    """Summary and trend analysis of a generated query.
+
+    A MongoDB find on whole months is answered from the rollups kept at ingest. Other queries, and
+    months without rollups (ROLLUPS=false, or transactions stored before rollups existed and not
+    rebuilt yet), fall back to loading the matching transactions into pandas.
+    """
+    months = rollup_month_range(user_query) if env.ROLLUPS and expense_source() == "mongo" else None
+    if months is not None:
+        rollup_analysis = analyze_rollups(*months)
+        if rollup_analysis is not None:
+            return rollup_analysis
+        print("No rollups for these months, analysing the transactions instead")
+    return analyze_large_dataset_pandas(expenses_dataframe(user_query))
+#endregion
+
+#region embedded store analysis
+# The pandas_analysis report computed in the embedded store: the cube cells come from one SQL
+# GROUP BY, and only the columns that need every row (overview medians, merchants) are fetched.
+MERCHANT_COLUMNS = ["date", "month_year", "debit", "transaction_category", "payment_method", "recipient_send_to", "recipient_name"]
+
+def sql_analysis(transaction_store, date_from=None, date_to=None, extra_condition=None):
+    """pandas_analysis of the transactions dated date_from..date_to ("YYYY-MM-DD", compared as text like in MongoDB)
+    that also match extra_condition (a SQL boolean expression such as "is_debit")."""
+    import pandas as pd
+    from src import sql_store
+    from src.expense_analytics import ExpenseCube
+    conditions, params = [extra_condition] if extra_condition else [], []
+    for operator, value in ((">=", date_from), ("<=", date_to)):
+        if value:
+            conditions.append(f"CAST(date AS VARCHAR) {operator} ?")
+            params.append(value)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    table = sql_store.TABLE
+
+    amounts = transaction_store.query(f"SELECT date, debit, credit FROM {table}{where}", params)
+    if amounts.empty:
+        return None
+    amounts['date'] = pd.to_datetime(amounts['date'])
+    cube = ExpenseCube.from_cells(transaction_store.expense_cells(where, params))
+    categories = cube.category_totals()
+    top_expenses = transaction_store.query(
+        f"SELECT date, description, debit, transaction_category FROM {table}{where or ' WHERE TRUE'}"
+        " AND (transaction_category IS NULL OR transaction_category <> 'PERSONAL') ORDER BY debit DESC NULLS LAST LIMIT 10", params)
+    top_expenses['date'] = pd.to_datetime(top_expenses['date'])
+    merchants = transaction_store.query(
+        f"SELECT {', '.join(MERCHANT_COLUMNS)} FROM {table}{where or ' WHERE TRUE'} AND lower(recipient_send_to) = 'merchant'", params)
+    merchants = sql_store.to_document_columns(merchants.assign(date=pd.to_datetime(merchants['date'])))
+    start= amounts['date'].min().date(),
+    end= amounts['date'].max().date(),
+    return {
+        "analysis_id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        "time_period": {"start": start, "end": end},
+        "overview_stats": overview_stats(amounts),
+        "temporal_analysis": {
+            "yearly_summary": cube.yearly_summary(),
+            "monthly_summary": cube.monthly_summary(),
+            "weekday_analysis": cube.weekday_summary(),
+            "yearly_totals": cube.period_totals("Y"),
+            "monthly_totals": cube.period_totals("M"),
+            "quarterly_totals": cube.period_totals("Q"),
+            "weekend_vs_weekday": cube.weekend_summary(),
+        },
+        "categorical_analysis": {
+            "totals": categories["totals"],
+            "counts": categories["counts"],
+            "averages": categories["averages"],
+            "top_expenses": top_expenses.to_dict(orient='records'),
+            "category_trends": calculate_category_trends(None, cube),
+            "merchant_trends": analyze_merchant_trends(merchants),
+        }
+    }
+
+def analyze_store(date_from=None, date_to=None, extra_condition=None):
+    store_analysis = sql_analysis(get_sql_store(), date_from, date_to, extra_condition)
+    print("Store Analysis Result:")
+    print(json.dumps(stringify_keys(store_analysis), indent=2, default=str))
+    return store_analysis
+#endregion
+
 def extract_merchant_name(bank_details): # check if sendTo is merchant, then return recipient_name
   
     if isinstance(bank_details, dict):
@@ -613,6 +1109,13 @@ def extract_merchant_name(bank_details): # check if sendTo is merchant, then ret
 
 # Helper function to recursively convert all keys in a nested dict to strings
 # used mainly for json dumps
+def recipient_names(df):
+    """extract_merchant_name for every row, from the bank details dicts or the flattened Parquet column."""
+    import pandas as pd
+    if 'recipient_bank_details' in df:
+        return pd.Series([extract_merchant_name(bd) for bd in df['recipient_bank_details']], index=df.index, dtype=object)
+    return df['recipient_bank_details.recipient_name'].astype(object).fillna('Unknown')
+
 def stringify_keys(obj):
     import pandas as pd
     if isinstance(obj, dict):
@@ -643,10 +1146,12 @@ if __name__ == "__main__":
         # mongo_query=generate_mongo_query(user_query)
         mongo_query={'operation': 'find', 'filter': {'date': {'$gte': '2025-01-01', '$lte': '2025-06-31'}}}
         # print(f"Query Generation Response: {mongo_query}")
-        expenses = query_expenses(mongo_query)
-        
-        # Analyze and summarize the expenses using LLM
-        # expense_Analysis = summarize_expenses(expenses, user_query)
-        # print(f"Expense Analysis: {expense_Analysis}\n")
+        if expense_source() == "sql": # aggregated in the embedded store, no rows loaded into pandas
+            analyze_store('2025-01-01', '2025-06-31')
+        else:
+            # Analyze and summarize the expenses using LLM
+            # expense_Analysis = summarize_expenses(query_expenses(mongo_query), user_query)
+            # print(f"Expense Analysis: {expense_Analysis}\n")
 
-        analyze_large_dataset_pandas(expenses)
\ No newline at end of file
+            analyze_expenses(mongo_query) # whole months come from the rollups
+        close_client()
\ No newline at end of file
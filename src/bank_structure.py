@@ -1,7 +1,12 @@
 import json
 import os
+from src import env, header_detection
 
 bankColumnStructure={}
+headerIndexes={} # bank name -> compiled alias index, built once per bank
+bankTemplates=None # bank name -> learned table layout, see get_bank_template
+templateChanges={} # bank name -> template (None = dropped) set in this process, see take_template_changes
+deferTemplateSaves=False # set in pool workers: the parent process is the only one writing the template file
 
 def load_column_structure():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -17,4 +22,70 @@ def get_bank_columns(bank_name):
     if bank_name_upper in bankColumnStructure:
         return bankColumnStructure[bank_name_upper]["header"]
     else:
-        return None
\ No newline at end of file
+        return None
+
+def get_header_index(bank_name):
+    bank_name_upper=bank_name.upper()
+    if bank_name_upper not in headerIndexes:
+        header_config=get_bank_columns(bank_name_upper)
+        headerIndexes[bank_name_upper]=header_detection.compile_header_index(header_config) if header_config else None
+    return headerIndexes[bank_name_upper]
+
+#region learned bank templates
+# Statements from the same bank share a table layout. Once a statement has been parsed with full
+# header detection, its column map and the region of the page holding the table are stored here
+# (a sidecar JSON file next to the processed output), so later statements only extract that region.
+# Pool workers don't write the file: their changes go back to the parent, which merges and saves them.
+def get_template_file():
+    return env.BANK_TEMPLATE_FILE or os.path.join(env.OUTPUT_JSON_DIR or ".", "bank_templates.json")
+
+def load_bank_templates():
+    global bankTemplates
+    file_path = get_template_file()
+    bankTemplates = {}
+    if os.path.exists(file_path):
+        with open(file_path, "r") as file:
+            bankTemplates = json.load(file)
+
+def save_bank_templates():
+    file_path = get_template_file()
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    tmp_path = f"{file_path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as file:
+        json.dump(bankTemplates, file, indent=2)
+    os.replace(tmp_path, file_path)
+
+def get_bank_template(bank_name):
+    if bankTemplates is None:
+        load_bank_templates()
+    return bankTemplates.get(bank_name.upper())
+
+def set_bank_template(bank_name, template):
+    if bankTemplates is None:
+        load_bank_templates()
+    if template is None:
+        bankTemplates.pop(bank_name.upper(), None)
+    else:
+        bankTemplates[bank_name.upper()] = template
+    templateChanges[bank_name.upper()] = template
+    if not deferTemplateSaves:
+        save_bank_templates()
+
+def take_template_changes():
+    changes = dict(templateChanges)
+    templateChanges.clear()
+    return changes
+
+def merge_template_changes(changes):
+    """Apply the template changes a pool worker made and save the file."""
+    if not changes:
+        return
+    if bankTemplates is None:
+        load_bank_templates()
+    for bank_name, template in changes.items():
+        if template is None:
+            bankTemplates.pop(bank_name, None)
+        else:
+            bankTemplates[bank_name] = template
+    save_bank_templates()
+#endregion
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from itertools import zip_longest
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from src import log, metrics
+from src.transaction import Transaction
+
+logger = log.get_logger("enrichment")
+
+# Vectorized counterpart of pdfDataOrchestrator.process_transaction_row: the raw table rows of a
+# statement are parsed column-wise with pandas/NumPy instead of one strptime/strftime/float at a time.
+# The transactions it returns are identical to the per-row ones, in the same order.
+
+_MISSING = object()  # cell index past the end of the row (IndexError in the per-row path)
+
+def _cell_error(cell: Any) -> Exception:
+    """What the per-row path raises on a cell it can't .strip(): IndexError past the end of the row, else AttributeError."""
+    if cell is _MISSING:
+        return IndexError("list index out of range")
+    return AttributeError(f"'{type(cell).__name__}' object has no attribute 'strip'")
+
+def _transpose(rows: List[List[str]]) -> List[tuple]:
+    # one pass in C; short rows are padded with _MISSING
+    return list(zip_longest(*rows, fillvalue=_MISSING))
+
+def _cells(columns: List[tuple], index: int, row_count: int) -> Sequence[Any]:
+    return columns[index] if index < len(columns) else (_MISSING,) * row_count
+
+def _parse_amounts(cells: Sequence[Any], valid: np.ndarray, errors: Dict[int, Exception]) -> np.ndarray:
+    """float(cell.strip().replace(",", "")) for non-empty cells, 0.0 for empty ones.
+
+    Bad cells clear valid; the first error of each row is kept in errors.
+    """
+    amounts = np.zeros(len(cells), dtype=np.float64)
+    positions = [i for i, cell in enumerate(cells) if cell is _MISSING or cell]
+    if not positions:
+        return amounts
+    cleaned = [cells[i].strip().replace(",", "") if isinstance(cells[i], str) else cells[i] for i in positions]
+    try:
+        # object -> float64 goes through float() for every element, so values match the per-row path exactly
+        amounts[positions] = np.array(cleaned, dtype=object).astype(np.float64)
+    except (TypeError, ValueError):
+        for i, value in zip(positions, cleaned):
+            try:
+                if value is _MISSING:
+                    raise IndexError("list index out of range")
+                amounts[i] = float(value)
+            except (TypeError, ValueError, IndexError) as e:
+                if valid[i]:
+                    errors.setdefault(i, e)
+                valid[i] = False
+    return amounts
+
+def _parse_dates(cells: Sequence[Any], date_formats: Sequence[str]) -> Tuple[pd.Series, Dict[int, datetime]]:
+    """The dates of the cells, plus the rows whose date only strptime can hold.
+
+    datetime64[ns] spans 1677-2262, so a date outside it (e.g. a mistyped year) is left NaT in the
+    Series and parsed by the strptime loop of the per-row path instead, as are cells no format
+    matched in pandas; such rows are rare (mostly headers and other non-transaction rows).
+    """
+    raw = pd.Series([cell.strip() if isinstance(cell, str) else None for cell in cells], dtype=object)
+    dates = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+    for fmt in date_formats:  # first matching format wins, like the strptime loop
+        todo = dates.isna() & raw.notna()
+        if not todo.any():
+            break
+        parsed = pd.to_datetime(raw[todo], format=fmt, errors="coerce")
+        parsed = parsed[parsed.between(pd.Timestamp.min, pd.Timestamp.max)] # newer pandas parses beyond the ns range
+        dates[parsed.index] = parsed
+    outside = {}
+    for i in np.flatnonzero((dates.isna() & raw.notna()).to_numpy()):
+        text = raw.iat[i]
+        for fmt in date_formats if text else ():
+            try:
+                outside[i] = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+    return dates, outside
+
+def _date_fields(date_obj: datetime) -> tuple:
+    """(date, day_of_week, is_weekend, quarter) computed as process_transaction_row does."""
+    formatted_date = date_obj.strftime("%Y-%m-%d")
+    day_of_week = date_obj.strftime("%A")
+    return formatted_date, day_of_week, day_of_week in ("Saturday", "Sunday"), f"Q{(int(formatted_date[5:7]) - 1) // 3 + 1}"
+
+def enrich_rows(
+    rows: List[List[str]],
+    doc_id: str,
+    col_map: Dict[str, int],
+    date_formats: Sequence[str],
+    derive_metadata: Callable[[str], tuple],
+) -> List[Transaction]:
+    """Transactions for a batch of raw rows; rows the per-row path would reject are dropped.
+
+    derive_metadata maps an upper-cased description to (bank_details, payment_method,
+    transaction_category, is_recurring); it is called once per distinct description in the batch,
+    and the rows with that description share its bank details dict.
+    """
+    if not rows:
+        return []
+    try:
+        date_index, description_index = col_map["date"], col_map["description"]
+        amount_indexes = [col_map["debit"], col_map["credit"], col_map["balance"]]
+    except KeyError as e:
+        logger.error("Error processing transaction rows: column %s not found in %s", e, col_map)
+        return []
+
+    row_count = len(rows)
+    columns = _transpose(rows)
+    date_cells = _cells(columns, date_index, row_count)
+    dates, outside_dates = _parse_dates(date_cells, date_formats)
+    valid = dates.notna().to_numpy(copy=True) # rows without a date are not transactions
+    errors: Dict[int, Exception] = {} # rows the per-row path would record as errors, with its error
+    for i, cell in enumerate(date_cells):
+        if not isinstance(cell, str):
+            errors[i] = _cell_error(cell)
+
+    formatted_dates = dates.dt.strftime("%Y-%m-%d").tolist()
+    day_names = dates.dt.day_name().tolist()
+    is_weekend = (dates.dt.dayofweek >= 5).tolist()
+    quarters = ("Q" + dates.dt.quarter.astype("Int64").astype(str)).tolist()
+    for i, date_obj in outside_dates.items():
+        try:
+            formatted_dates[i], day_names[i], is_weekend[i], quarters[i] = _date_fields(date_obj)
+            valid[i] = True
+        except ValueError as e: # strftime doesn't zero-pad a year below 1000, so the quarter can't be read back
+            errors[i] = e
+
+    description_cells = _cells(columns, description_index, row_count)
+    descriptions = [cell.strip().replace("\n", " ") if isinstance(cell, str) else None for cell in description_cells]
+    for i, row in enumerate(rows):
+        if len(row) <= 2:
+            descriptions[i] = ""  # the per-row path does not read the description of such short rows
+    for i in np.flatnonzero(valid):
+        if descriptions[i] is None:
+            errors[i] = _cell_error(description_cells[i])
+            valid[i] = False
+    debit, credit, balance = (_parse_amounts(_cells(columns, index, row_count), valid, errors) for index in amount_indexes)
+    is_debit = debit > 0
+    is_credit = credit > 0
+    amount = np.where(is_debit, debit, credit)
+    amount_range = np.select([amount < 100, amount < 1000, amount < 10000], ["SMALL", "MEDIUM", "LARGE"], "VERY_LARGE")
+
+    metadata = {}  # description -> derived fields, or None if deriving them failed
+    metadata_errors = {}
+    for i in np.flatnonzero(valid):
+        description = descriptions[i]
+        if description in metadata:
+            continue
+        try:
+            metadata[description] = derive_metadata(description.upper())
+        except Exception as e:
+            metadata_errors[description] = e
+            metadata[description] = None
+
+    transactions = []
+    columns = zip(
+        range(row_count), valid.tolist(), formatted_dates, day_names, is_weekend, quarters,
+        descriptions, debit.tolist(), credit.tolist(), balance.tolist(),
+        is_debit.tolist(), is_credit.tolist(), amount_range.tolist(),
+    )
+    for i, is_valid, date, day_of_week, weekend, quarter, description, row_debit, row_credit, row_balance, row_is_debit, row_is_credit, row_amount_range in columns:
+        if not is_valid:
+            continue
+        derived = metadata[description]
+        if derived is None:
+            errors[i] = metadata_errors[description]
+            continue
+        bank_details, payment_method, transaction_category, is_recurring = derived
+        transactions.append(Transaction(
+            document_id=doc_id,
+            date=date,
+            month_year=date[:7],
+            quarter=quarter,
+            day_of_week=day_of_week,
+            is_weekend=weekend,
+            description=description,
+            debit=row_debit,
+            credit=row_credit,
+            balance=row_balance,
+            payment_method=payment_method,
+            transaction_category=transaction_category,
+            is_debit=row_is_debit,
+            is_credit=row_is_credit,
+            amount_range=row_amount_range,
+            is_recurring=is_recurring,
+            recipient_bank_details=bank_details, # copied by to_dict
+        ))
+    statement = metrics.current()
+    for i in sorted(errors):
+        statement.row_error(errors[i], rows[i])
+    return transactions
@@ -1,60 +1,150 @@
-from dotenv import load_dotenv
+import json
 import os
+import sys
+import types
+from typing import Annotated, Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+# Settings from the environment and .env, read as env.<NAME>. Nothing is read at import: the first
+# env.<NAME> access loads .env and builds one immutable Settings that every later read comes from.
+# Settings can't be assigned; benchmarks and tests swap in changed ones with env.configure().
+
+class _EnvVar(NamedTuple):
+    """Where a Settings field comes from: parse(os.getenv(name) or default), read when Settings is built."""
+    name: str
+    parse: Optional[Callable[[str], Any]] = None
+    default: Any = None
+
+    def read(self):
+        text = os.getenv(self.name) or (self.default() if callable(self.default) else self.default)
+        return text if self.parse is None or text is None else self.parse(text)
+
+def _flag(text: str) -> bool:
+    return text.strip().lower() in ("1", "true", "yes")
+
+def _lower(text: str) -> str:
+    return text.strip().lower()
+
+def _items(text: str) -> Tuple[str, ...]:
+    return tuple(x.strip() for x in text.split(",") if x.strip())
+
+def _keywords(text: str) -> Tuple[str, ...]:
+    return _items(text.upper())
+
+def _output_path(*parts: str) -> Callable[[], str]:
+    return lambda: os.path.join(os.getenv("OUTPUT_JSON_DIR") or ".", *parts)
 
 #region Configuration
-load_dotenv()
-INPUT_PDF_DIR = os.getenv("INPUT_PDF_DIR") # Folder containing PDF statements
-OUTPUT_JSON_DIR = os.getenv("OUTPUT_JSON_DIR") # Folder for JSON outputs
-COMBINED_FILE = os.getenv("COMBINED_FILE") # Combined transactions file
-DATE_FORMAT = os.getenv("DATE_FORMAT")  # Expected date format in PDFs
-CARRIER_LIST = os.getenv("CARRIER_LIST")
-FOOD_DELIVERY = os.getenv("FOOD_DELIVERY")
-SHOPPING = os.getenv("SHOPPING")
-TRANSPORT = os.getenv("TRANSPORT")
-GROCERY = os.getenv("GROCERY")
-HEALTHCARE = os.getenv("HEALTHCARE")
-RESTAURANTS = os.getenv("RESTAURANTS")
-FRUITS_VEGETABLES_FISH = os.getenv("FRUITS_VEGETABLES_FISH")
-INTEREST_INCOME = os.getenv("INTEREST_INCOME")
-RENT= os.getenv("RENT")
-EMI_LIST = os.getenv("EMI_LIST")
-CREDIT_CARD_PAYMENT = os.getenv("CREDIT_CARD_PAYMENT")
-SUBSCRIPTION_SERVICES = os.getenv("SUBSCRIPTION_SERVICES")
-UTILITY_BILLS = os.getenv("UTILITY_BILLS")
-RECURRING_PAYMENTS = os.getenv("RECURRING_PAYMENTS")
-FOODS_DRINKS = os.getenv("FOODS_DRINKS")
-ENTERTAINMENT = os.getenv("ENTERTAINMENT")
-MONGODB_URI = os.getenv("MONGO_DB_URI")
-DB_NAME = os.getenv("DB_NAME")
-ENV = os.getenv("ENV")
-COLLECTION_NAME = os.getenv("COLLECTION_NAME")
-PERSONAL_TYPE = os.getenv("PERSONAL_TYPE")
-EDUCATION = os.getenv("EDUCATION")
-SPECIAL_EMI = os.getenv("SPECIAL_EMI")
-MY_BANKS = os.getenv("MY_BANKS")
-#endregion
-
-#region clean Configuration
-CARRIER_LIST = [x.strip().upper() for x in (CARRIER_LIST or "").split(",") if x.strip()]
-FOOD_DELIVERY_LIST = [x.strip().upper() for x in (FOOD_DELIVERY or "").split(",") if x.strip()]
-SHOPPING_LIST = [x.strip().upper() for x in (SHOPPING or "").split(",") if x.strip()]
-TRANSPORT_LIST = [x.strip().upper() for x in (TRANSPORT or "").split(",") if x.strip()]
-GROCERY_LIST = [x.strip().upper() for x in (GROCERY or "").split(",") if x.strip()]
-HEALTHCARE_LIST = [x.strip().upper() for x in (HEALTHCARE or "").split(",") if x.strip()]
-RESTAURANTS_LIST = [x.strip().upper() for x in (RESTAURANTS or "").split(",") if x.strip()]
-FRUITS_VEGETABLES_FISH_LIST = [x.strip().upper() for x in (FRUITS_VEGETABLES_FISH or "").split(",") if x.strip()]
-INTEREST_INCOME_LIST = [x.strip().upper() for x in (INTEREST_INCOME or "").split(",") if x.strip()]
-RENT_LIST = [x.strip().upper() for x in (RENT or "").split(",") if x.strip()]
-EMI_LIST = [x.strip().upper() for x in (EMI_LIST or "").split(",") if x.strip()]
-CREDIT_CARD_PAYMENT_LIST = [x.strip().upper() for x in (CREDIT_CARD_PAYMENT or "").split(",") if x.strip()]
-SUBSCRIPTION_SERVICES_LIST = [x.strip().upper() for x in (SUBSCRIPTION_SERVICES or "").split(",") if x.strip()]
-UTILITY_BILLS_LIST = [x.strip().upper() for x in (UTILITY_BILLS or "").split(",") if x.strip()]
-RECURRING_PAYMENTS_LIST = [x.strip().upper() for x in (RECURRING_PAYMENTS or "").split(",") if x.strip()]
-FOODS_DRINKS_LIST = [x.strip().upper() for x in (FOODS_DRINKS or "").split(",") if x.strip()]
-ENTERTAINMENT_LIST = [x.strip().upper() for x in (ENTERTAINMENT or "").split(",") if x.strip()]
-PERSONAL_TYPE_LIST = [x.strip().upper() for x in (PERSONAL_TYPE or "").split(",") if x.strip()]
-EDUCATION_LIST = [x.strip().upper() for x in (EDUCATION or "").split(",") if x.strip()]
-SPECIAL_EMI_LIST = [x.strip().upper() for x in (SPECIAL_EMI or "").split(",") if x.strip()]
-MY_BANKS_LIST = [x.strip().upper() for x in (MY_BANKS or "").split(",") if x.strip()]
-DATE_FORMAT_LIST = [x.strip() for x in (DATE_FORMAT or "").split(",") if x.strip()]
-#endregion
+class Settings(NamedTuple): # a NamedTuple rather than a frozen dataclass: cheaper to import and to build
+    # each field's type is Annotated with the _EnvVar it is read from
+    INPUT_PDF_DIR: Annotated[Optional[str], _EnvVar("INPUT_PDF_DIR")] # Folder containing PDF statements
+    OUTPUT_JSON_DIR: Annotated[Optional[str], _EnvVar("OUTPUT_JSON_DIR")] # Folder for JSON outputs
+    COMBINED_FILE: Annotated[Optional[str], _EnvVar("COMBINED_FILE")] # Combined transactions file
+    MONGODB_URI: Annotated[Optional[str], _EnvVar("MONGO_DB_URI", default=lambda: os.getenv("MONGODB_URI"))] # the query scripts (and the README) use MONGODB_URI
+    DB_NAME: Annotated[Optional[str], _EnvVar("DB_NAME")]
+    ENV: Annotated[Optional[str], _EnvVar("ENV")]
+    COLLECTION_NAME: Annotated[Optional[str], _EnvVar("COLLECTION_NAME")]
+    INGEST_WORKERS: Annotated[int, _EnvVar("INGEST_WORKERS", int, 1)] # Number of processes used to parse PDFs (1 = serial)
+    INGEST_FILE_TIMEOUT: Annotated[Optional[float], _EnvVar("INGEST_FILE_TIMEOUT", float)] # Seconds without rows from a worker before its PDF is marked as failed
+    PAGE_WORKERS: Annotated[int, _EnvVar("PAGE_WORKERS", int, 1)] # Number of processes used to parse the pages of one PDF (1 = serial)
+    DB_INSERT_BATCH_SIZE: Annotated[int, _EnvVar("DB_INSERT_BATCH_SIZE", int, 1000)] # Transactions sent to MongoDB per bulk write
+    DB_FLUSH_INTERVAL: Annotated[float, _EnvVar("DB_FLUSH_INTERVAL", float, 5)] # Seconds before a partly filled write batch is flushed
+    MONGO_MAX_POOL_SIZE: Annotated[int, _EnvVar("MONGO_MAX_POOL_SIZE", int, 10)] # Connections kept in the shared MongoClient pool
+    INGESTION_LEDGER: Annotated[Optional[str], _EnvVar("INGESTION_LEDGER")] # "file" (default) or "mongo": where the list of ingested statements is kept
+    INGESTION_LEDGER_FILE: Annotated[Optional[str], _EnvVar("INGESTION_LEDGER_FILE")] # Ledger file path (default: OUTPUT_JSON_DIR/ingestion_ledger.json)
+    METADATA_CACHE_SIZE: Annotated[int, _EnvVar("METADATA_CACHE_SIZE", int, 50000)] # Descriptions kept in the metadata LRU cache
+    METADATA_CACHE_FILE: Annotated[Optional[str], _EnvVar("METADATA_CACHE_FILE")] # Optional file the metadata cache is persisted to between runs
+    VECTORIZED_ENRICHMENT: Annotated[bool, _EnvVar("VECTORIZED_ENRICHMENT", _flag, "true")] # Parse rows in pandas batches instead of one by one
+    ENRICHMENT_BATCH_ROWS: Annotated[int, _EnvVar("ENRICHMENT_BATCH_ROWS", int, 5000)] # Rows per vectorized enrichment batch
+    TABLE_CACHE: Annotated[bool, _EnvVar("TABLE_CACHE", _flag, "true")] # Cache the tables extracted from each PDF page
+    TABLE_CACHE_DIR: Annotated[str, _EnvVar("TABLE_CACHE_DIR", default=_output_path("table_cache"))] # Folder for the table cache
+    TABLE_SETTINGS: Annotated[Dict[str, Any], _EnvVar("TABLE_SETTINGS", json.loads, "{}")] # pdfplumber table_settings (JSON), part of the table cache key
+    BANK_TEMPLATES: Annotated[bool, _EnvVar("BANK_TEMPLATES", _flag, "true")] # Reuse learned table regions per bank
+    BANK_TEMPLATE_FILE: Annotated[Optional[str], _EnvVar("BANK_TEMPLATE_FILE")] # Learned bank templates file (default: OUTPUT_JSON_DIR/bank_templates.json)
+    METRICS_SINKS: Annotated[Tuple[str, ...], _EnvVar("METRICS_SINKS", lambda text: tuple(x for x in _items(text.lower()) if x != "none"), "stdout,jsonl")] # Where run metrics go
+    METRICS_FILE: Annotated[Optional[str], _EnvVar("METRICS_FILE")] # JSON-lines metrics file (default: OUTPUT_JSON_DIR/metrics.jsonl)
+    LOG_LEVEL: Annotated[str, _EnvVar("LOG_LEVEL", default="INFO")] # DEBUG, INFO, WARNING or ERROR
+    LOG_FILE: Annotated[Optional[str], _EnvVar("LOG_FILE")] # Optional file the log is also written to
+    LOG_QUEUE: Annotated[bool, _EnvVar("LOG_QUEUE", _flag, "true")] # Write log records from a background thread
+    LOG_ERROR_SAMPLES: Annotated[int, _EnvVar("LOG_ERROR_SAMPLES", int, 3)] # Skipped rows logged per error class and statement
+    ROLLUPS: Annotated[bool, _EnvVar("ROLLUPS", _flag, "true")] # Maintain the <collection>_rollups monthly totals on write
+    PARQUET_EXPORT: Annotated[bool, _EnvVar("PARQUET_EXPORT", _flag, "false")] # Also write each statement as Parquet, partitioned by bank and month
+    PARQUET_DIR: Annotated[str, _EnvVar("PARQUET_DIR", default=_output_path("parquet"))] # Folder for the Parquet export
+    STORE_BACKEND: Annotated[str, _EnvVar("STORE_BACKEND", _lower, "mongo")] # "mongo", "duckdb", "sqlite" or "embedded" (DuckDB if installed, else SQLite)
+    STORE_FILE: Annotated[Optional[str], _EnvVar("STORE_FILE")] # Embedded store file (default: OUTPUT_JSON_DIR/transactions.duckdb or .sqlite3)
+    QUERY_CACHE: Annotated[bool, _EnvVar("QUERY_CACHE", _flag, "true")] # Reuse generated MongoDB queries for repeated questions
+    QUERY_CACHE_FILE: Annotated[Optional[str], _EnvVar("QUERY_CACHE_FILE")] # Query cache file (default: OUTPUT_JSON_DIR/query_cache.json)
+    QUERY_CACHE_SIZE: Annotated[int, _EnvVar("QUERY_CACHE_SIZE", int, 1000)] # Questions kept in the query cache
+    QUERY_CACHE_TTL: Annotated[float, _EnvVar("QUERY_CACHE_TTL", float, 7 * 24 * 3600)] # Seconds a cached query stays valid (0 = forever)
+    EXPENSE_SOURCE: Annotated[Optional[str], _EnvVar("EXPENSE_SOURCE", _lower)] # query_expense.py: "mongo", "sql" (embedded store) or "parquet" (default: "mongo", or "sql" with an embedded STORE_BACKEND)
+    EXPLAIN_QUERIES: Annotated[bool, _EnvVar("EXPLAIN_QUERIES", _flag, "true")] # Warn when a query scans the whole collection
+    QUERY_BATCH_SIZE: Annotated[int, _EnvVar("QUERY_BATCH_SIZE", int, 1000)] # Documents per cursor batch
+    SUMMARY_TOKEN_BUDGET: Annotated[int, _EnvVar("SUMMARY_TOKEN_BUDGET", int, 3000)] # Above this the summary prompt gets aggregates instead of rows
+    INTENT_PARSER: Annotated[bool, _EnvVar("INTENT_PARSER", _flag, "true")] # Answer common questions without the LLM
+    QUERY_CONCURRENCY: Annotated[int, _EnvVar("QUERY_CONCURRENCY", int, 4)] # query_batch.py: questions in flight at once
+    LLM_CONCURRENCY: Annotated[int, _EnvVar("LLM_CONCURRENCY", int, 2)] # query_batch.py: simultaneous requests to Ollama
+    #endregion
+
+    #region clean Configuration
+    # comma separated keyword lists, upper-cased; matchers compiled from them are built once by their users
+    CARRIER_LIST: Annotated[Tuple[str, ...], _EnvVar("CARRIER_LIST", _keywords, "")]
+    FOOD_DELIVERY_LIST: Annotated[Tuple[str, ...], _EnvVar("FOOD_DELIVERY", _keywords, "")]
+    SHOPPING_LIST: Annotated[Tuple[str, ...], _EnvVar("SHOPPING", _keywords, "")]
+    TRANSPORT_LIST: Annotated[Tuple[str, ...], _EnvVar("TRANSPORT", _keywords, "")]
+    GROCERY_LIST: Annotated[Tuple[str, ...], _EnvVar("GROCERY", _keywords, "")]
+    HEALTHCARE_LIST: Annotated[Tuple[str, ...], _EnvVar("HEALTHCARE", _keywords, "")]
+    RESTAURANTS_LIST: Annotated[Tuple[str, ...], _EnvVar("RESTAURANTS", _keywords, "")]
+    FRUITS_VEGETABLES_FISH_LIST: Annotated[Tuple[str, ...], _EnvVar("FRUITS_VEGETABLES_FISH", _keywords, "")]
+    INTEREST_INCOME_LIST: Annotated[Tuple[str, ...], _EnvVar("INTEREST_INCOME", _keywords, "")]
+    RENT_LIST: Annotated[Tuple[str, ...], _EnvVar("RENT", _keywords, "")]
+    EMI_LIST: Annotated[Tuple[str, ...], _EnvVar("EMI_LIST", _keywords, "")]
+    CREDIT_CARD_PAYMENT_LIST: Annotated[Tuple[str, ...], _EnvVar("CREDIT_CARD_PAYMENT", _keywords, "")]
+    SUBSCRIPTION_SERVICES_LIST: Annotated[Tuple[str, ...], _EnvVar("SUBSCRIPTION_SERVICES", _keywords, "")]
+    UTILITY_BILLS_LIST: Annotated[Tuple[str, ...], _EnvVar("UTILITY_BILLS", _keywords, "")]
+    RECURRING_PAYMENTS_LIST: Annotated[Tuple[str, ...], _EnvVar("RECURRING_PAYMENTS", _keywords, "")]
+    FOODS_DRINKS_LIST: Annotated[Tuple[str, ...], _EnvVar("FOODS_DRINKS", _keywords, "")]
+    ENTERTAINMENT_LIST: Annotated[Tuple[str, ...], _EnvVar("ENTERTAINMENT", _keywords, "")]
+    PERSONAL_TYPE_LIST: Annotated[Tuple[str, ...], _EnvVar("PERSONAL_TYPE", _keywords, "")]
+    EDUCATION_LIST: Annotated[Tuple[str, ...], _EnvVar("EDUCATION", _keywords, "")]
+    SPECIAL_EMI_LIST: Annotated[Tuple[str, ...], _EnvVar("SPECIAL_EMI", _keywords, "")]
+    MY_BANKS_LIST: Annotated[Tuple[str, ...], _EnvVar("MY_BANKS", _keywords, "")]
+    DATE_FORMAT_LIST: Annotated[Tuple[str, ...], _EnvVar("DATE_FORMAT", _items, "")] # Expected date formats in PDFs
+    #endregion
+
+_SOURCES = tuple(hint.__metadata__[0] for hint in Settings.__annotations__.values())
+_FIELDS = frozenset(Settings._fields)
+_settings: Optional[Settings] = None
+
+def get_settings() -> Settings:
+    """The settings, read from the environment (after loading .env) on first use."""
+    global _settings
+    if _settings is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _settings = Settings._make(source.read() for source in _SOURCES)
+    return _settings
+
+def configure(settings: Optional[Settings] = None, **values) -> Settings:
+    """Use settings, or the current settings with values replaced, from now on; returns the previous ones.
+
+    For benchmarks and tests: env.configure(previous) puts the returned settings back.
+    """
+    global _settings
+    previous = get_settings()
+    _settings = (settings or previous)._replace(**values)
+    return previous
+
+def __getattr__(name: str):
+    if name not in _FIELDS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(_settings or get_settings(), name)
+
+def __dir__():
+    return sorted(set(globals()) | set(Settings._fields))
+
+class _SettingsModule(types.ModuleType):
+    def __setattr__(self, name, value):
+        if name in _FIELDS:
+            raise AttributeError(f"env.{name} is read-only, use env.configure({name}=...)")
+        super().__setattr__(name, value)
+
+sys.modules[__name__].__class__ = _SettingsModule
@@ -0,0 +1,118 @@
+import pandas as pd
+
+# Shared groupby engine for the pandas analyzers in query_expense.py. ExpenseCube groups the
+# transactions once by every key the analyses slice on (month, month_year, category, debit/credit
+# flags, weekday, weekend) and keeps sums, counts and maxima per cell. Every yearly, monthly,
+# weekday, category and trend summary is then a small regroup of the cube instead of another
+# pass over the rows.
+
+CUBE_KEYS = ["period", "month_year", "transaction_category", "is_debit", "is_credit", "day_of_week", "is_weekend"]
+
+AMOUNT_AGGREGATES = {
+    "debit_sum": ("debit", "sum"),
+    "debit_count": ("debit", "count"),
+    "debit_max": ("debit", "max"),
+    "credit_sum": ("credit", "sum"),
+    "credit_count": ("credit", "count"),
+    "credit_max": ("credit", "max"),
+    "rows": ("date", "count"),
+    "size": ("date", "size"),
+}
+
+class ExpenseCube:
+    """Transactions aggregated by CUBE_KEYS; df must have date converted with pd.to_datetime."""
+
+    def __init__(self, df: pd.DataFrame):
+        keyed = df.assign(date=pd.to_datetime(df["date"]))
+        keyed["period"] = keyed["date"].dt.to_period("M")
+        for key in CUBE_KEYS:
+            if key not in keyed:
+                keyed[key] = None
+        # dropna=False keeps rows with a missing key; each summary drops them for its own keys only
+        self.cells = keyed.groupby(CUBE_KEYS, dropna=False, sort=False).agg(**AMOUNT_AGGREGATES).reset_index()
+
+    @classmethod
+    def from_cells(cls, cells: pd.DataFrame) -> "ExpenseCube":
+        """A cube over cells aggregated elsewhere (e.g. SqlStore.expense_cells), period as "YYYY-MM" text."""
+        cube = cls.__new__(cls)
+        cube.cells = cells.assign(period=pd.PeriodIndex(cells["period"], freq="M"))
+        return cube
+
+    def _regroup(self, by):
+        """Sums, counts and maxima of the cells grouped by by (column names or Series aligned with the cells)."""
+        return self.cells.groupby(by).agg(
+            debit_sum=("debit_sum", "sum"),
+            debit_count=("debit_count", "sum"),
+            debit_max=("debit_max", "max"),
+            credit_sum=("credit_sum", "sum"),
+            credit_count=("credit_count", "sum"),
+            credit_max=("credit_max", "max"),
+            rows=("rows", "sum"),
+            size=("size", "sum"),
+        )
+
+    def _periods(self, frequency: str):
+        periods = self.cells["period"]
+        if frequency == "Y":
+            return periods.dt.year.rename("date")
+        return (periods if frequency == "M" else periods.dt.asfreq(frequency)).rename("date")
+
+    #region summaries as analyze_large_dataset_pandas reports them
+    @staticmethod
+    def _summary_frame(grouped, statistics):
+        # the layout of df.groupby(...).agg({'debit': [...], 'credit': [...], 'date': 'count'}) with date renamed
+        columns = {}
+        for amount in ("debit", "credit"):
+            for statistic in statistics:
+                if statistic == "mean":
+                    columns[(amount, "mean")] = grouped[f"{amount}_sum"] / grouped[f"{amount}_count"]
+                else:
+                    columns[(amount, statistic)] = grouped[f"{amount}_{statistic}"]
+        columns[("transaction_count", "count")] = grouped["rows"]
+        frame = pd.DataFrame(columns)
+        frame.columns = pd.MultiIndex.from_tuples(frame.columns)
+        return frame
+
+    def yearly_summary(self):
+        return self._summary_frame(self._regroup(self._periods("Y")), ["sum", "mean", "max"]).to_dict(orient="index")
+
+    def monthly_summary(self):
+        return self._summary_frame(self._regroup("month_year"), ["sum", "mean", "max"]).to_dict(orient="index")
+
+    def weekday_summary(self):
+        return self._summary_frame(self._regroup("day_of_week"), ["sum", "mean", "count"]).to_dict(orient="index")
+
+    def weekend_summary(self):
+        return self._summary_frame(self._regroup("is_weekend"), ["sum", "mean", "count"]).to_dict(orient="index")
+
+    def period_totals(self, frequency: str):
+        """debit, credit and net (credit - debit) per year ("Y"), month ("M") or quarter ("Q") of the date."""
+        grouped = self._regroup(self._periods(frequency))
+        return {
+            "debit": grouped["debit_sum"].to_dict(),
+            "credit": grouped["credit_sum"].to_dict(),
+            "net": (grouped["credit_sum"] - grouped["debit_sum"]).to_dict(),
+        }
+
+    def category_totals(self):
+        grouped = self._regroup("transaction_category")
+        return {
+            "totals": grouped["debit_sum"].sort_values(ascending=False).to_dict(),
+            "counts": grouped["debit_count"].to_dict(),
+            "averages": (grouped["debit_sum"] / grouped["debit_count"]).to_dict(),
+        }
+    #endregion
+
+    def category_trend_inputs(self):
+        """(monthly_debit, monthly_credit, expense_counts, income_counts) as build_category_trends takes them."""
+        cells = self.cells
+        not_personal = cells["transaction_category"] != "PERSONAL"
+        expense_cells = cells[(cells["is_debit"] == True) & not_personal]
+        income_cells = cells[(cells["is_credit"] == True) & not_personal]
+        # the monthly amounts cover every row, as calculate_category_trends always has; the counts only non-PERSONAL debits/credits
+        by_month_category = cells.groupby(["month_year", "transaction_category"])
+        monthly_debit = by_month_category["debit_sum"].sum().unstack(fill_value=0) if expense_cells["size"].sum() else None
+        monthly_credit = by_month_category["credit_sum"].sum().unstack(fill_value=0) if income_cells["size"].sum() else None
+        expense_counts = expense_cells.groupby("transaction_category")["size"].sum()
+        income_counts = income_cells.groupby("transaction_category")["size"].sum()
+        return monthly_debit, monthly_credit, expense_counts[expense_counts > 0].to_dict(), income_counts[income_counts > 0].to_dict()
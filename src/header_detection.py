@@ -1,22 +1,42 @@
 import re
+from typing import Dict, Optional, Tuple
+
+_CID_RE = re.compile(r"\(cid:\d+\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9 ]")
+# a row whose first cell is a date is a transaction, never a header
+_DATE_CELL_RE = re.compile(r"\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}")
 
 def normalize_headers(header: str) -> str:
     if not header:
         return ""
     header = header.lower().strip()
-    header = re.sub(r"\(cid:\d+\)", " ",header)
-    header = re.sub(r"\s+", " ", header)
-    header = re.sub(r"[^a-z0-9 ]", "", header)
+    header = _CID_RE.sub(" ", header)
+    header = _WHITESPACE_RE.sub(" ", header)
+    header = _NON_ALNUM_RE.sub("", header)
     # header = re.sub(r'[^A-Za-z0-9 ]', " ", header)
     return header.strip()
 
-def detect_column_map(header_row, header_config):
+def compile_header_index(header_config) -> Dict[str, Tuple[str, ...]]:
+    """Map each lower-cased alias to the column keys it names, in header_config order."""
+    index: Dict[str, Tuple[str, ...]] = {}
+    for key, aliases in header_config.items():
+        for alias in aliases:
+            keys = index.get(alias.lower(), ())
+            if key not in keys:
+                index[alias.lower()] = keys + (key,)
+    return index
+
+def detect_column_map(header_row, header_config, header_index: Optional[Dict[str, Tuple[str, ...]]] = None):
+    if header_index is None:
+        header_index = compile_header_index(header_config)
+    first_cell = next((cell for cell in header_row if cell), None)
+    if first_cell is None or _DATE_CELL_RE.match(first_cell):
+        return {}
     col_map = {}
     for idx, cell in enumerate(header_row):
         if not cell:
             continue
-        cell_lower = normalize_headers(cell)
-        for key, aliases in header_config.items():
-            if cell_lower in [a.lower() for a in aliases]:
-                col_map[key] = idx
-    return col_map
\ No newline at end of file
+        for key in header_index.get(normalize_headers(cell), ()):
+            col_map[key] = idx
+    return col_map
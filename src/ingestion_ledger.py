@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable
+from src import env
+
+# Bump PARSER_VERSION when the PDF parsing / categorization logic changes and SCHEMA_VERSION when
+# the shape of the stored transaction documents changes: every statement is then re-ingested once.
+PARSER_VERSION = "1"
+SCHEMA_VERSION = "2"
+
+def file_sha256(pdf_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ledger_key(content_hash: str) -> str:
+    return f"{content_hash}:{PARSER_VERSION}:{SCHEMA_VERSION}"
+
+class IngestionLedger:
+    """Record of the statements already loaded into the DB.
+
+    Entries are keyed by ledger_key (content hash + parser/schema version), so an unchanged file
+    is found with a single dict lookup while a modified file or a parser upgrade misses.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.entries = entries or {}
+        self.keys_by_document = {entry["document_id"]: key for key, entry in self.entries.items()}
+
+    def is_ingested(self, key: str) -> bool:
+        return key in self.entries
+
+    def record(self, key: str, document_id: str, file_name: str, transaction_count: int):
+        self.forget(document_id)  # an older version of the same statement is superseded
+        self.entries[key] = {
+            "document_id": document_id,
+            "file_name": file_name,
+            "parser_version": PARSER_VERSION,
+            "schema_version": SCHEMA_VERSION,
+            "transaction_count": transaction_count,
+            "ingested_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.keys_by_document[document_id] = key
+        self._save_entry(key)
+
+    def forget(self, document_id: str):
+        key = self.keys_by_document.pop(document_id, None)
+        if key is not None:
+            self.entries.pop(key, None)
+            self._delete_entry(key)
+
+    def forget_all(self, document_ids: Iterable[str]):
+        for document_id in document_ids:
+            self.forget(document_id)
+
+    def _save_entry(self, key: str):
+        raise NotImplementedError
+
+    def _delete_entry(self, key: str):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class FileIngestionLedger(IngestionLedger):
+    """Ledger kept as a JSON file; rewritten after every change so an interrupted run keeps its progress."""
+
+    def __init__(self, path: str):
+        self.path = path
+        entries = {}
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                entries = json.load(file)
+        super().__init__(entries)
+
+    def _write(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.entries, file, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _save_entry(self, key: str):
+        self._write()
+
+    def _delete_entry(self, key: str):
+        self._write()
+
+class MongoIngestionLedger(IngestionLedger):
+    """Ledger kept in a Mongo collection (one document per ledger key), loaded once per run.
+
+    It uses the collection's client as is; the shared client is closed by whoever opened it.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        entries = {doc.pop("_id"): doc for doc in collection.find({})}
+        super().__init__(entries)
+
+    def _save_entry(self, key: str):
+        self.collection.replace_one({"_id": key}, self.entries[key], upsert=True)
+
+    def _delete_entry(self, key: str):
+        self.collection.delete_one({"_id": key})
+
+def open_ledger() -> IngestionLedger:
+    if (env.INGESTION_LEDGER or "file").strip().lower() == "mongo":
+        from src import mongo
+        collection = mongo.get_client()[env.DB_NAME][f"{mongo.get_effective_collection_name()}_ingestion_ledger"]
+        return MongoIngestionLedger(collection)
+    return FileIngestionLedger(env.INGESTION_LEDGER_FILE or os.path.join(env.OUTPUT_JSON_DIR, "ingestion_ledger.json"))
@@ -0,0 +1,315 @@
+import calendar
+import datetime
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src import env
+
+# Rule-based fast path for generate_mongo_query. The common question shapes ("total spend on
+# <category> in <month>", "list transactions between <dates>", "top merchants in <period>") are
+# turned into a MongoDB query without the LLM. A question is only answered here when every word
+# of it is understood: dates, categories, payment methods, banks and merchant keywords are taken
+# out, and anything left that is not a filler word sends the question to the LLM instead.
+
+# stored transaction_category -> (src.env keyword lists of the category, how questions name it)
+CATEGORIES = {
+    "FOOD_DELIVERY": (["FOOD_DELIVERY_LIST"], ["food delivery", "food deliveries", "food orders"]),
+    "GROCERY": (["GROCERY_LIST"], ["grocery", "groceries"]),
+    "SHOPPING": (["SHOPPING_LIST"], ["shopping"]),
+    "TRANSPORT": (["TRANSPORT_LIST"], ["transport", "transportation", "travel", "commute"]),
+    "HEALTHCARE": (["HEALTHCARE_LIST"], ["healthcare", "health", "medical", "medicines"]),
+    "RESTAURANTS": (["RESTAURANTS_LIST"], ["restaurant", "restaurants", "dining", "eating out"]),
+    "FRUITS_VEGETABLES": (["FRUITS_VEGETABLES_FISH_LIST"], ["fruits and vegetables", "fruits", "vegetables", "fish"]),
+    "INTEREST_INCOME": (["INTEREST_INCOME_LIST"], ["interest", "interest income"]),
+    "RENT": (["RENT_LIST"], ["rent"]),
+    "SALARY": ([], ["salary", "salaries"]),
+    "RECHARGE": (["CARRIER_LIST"], ["recharge", "recharges", "mobile recharge", "phone recharge"]),
+    "LOAN_PAYMENT": (["EMI_LIST", "SPECIAL_EMI_LIST"], ["emi", "emis", "loan", "loans", "loan payment", "loan payments"]),
+    "CREDIT_CARD_PAYMENT": (["CREDIT_CARD_PAYMENT_LIST"], ["credit card bill", "credit card bills", "credit card payments"]),
+    "SUBSCRIPTION_SERVICES": (["SUBSCRIPTION_SERVICES_LIST"], ["subscription", "subscriptions"]),
+    "UTILITY_BILLS": (["UTILITY_BILLS_LIST"], ["utility", "utilities", "utility bills", "bills"]),
+    "FOODS_DRINKS": (["FOODS_DRINKS_LIST"], ["foods and drinks", "food and drinks", "drinks"]),
+    "ENTERTAINMENT": (["ENTERTAINMENT_LIST"], ["entertainment", "movies"]),
+    "EDUCATION": (["EDUCATION_LIST"], ["education", "tuition"]),
+}
+
+# stored payment_method (see extract_payment_method) -> how questions name it
+PAYMENT_METHODS = {
+    "UPI": ["upi"],
+    "CARD_PAYMENT": ["card", "cards", "debit card", "pos", "card payments"],
+    "ATM": ["atm", "atm withdrawals", "cash withdrawals", "withdrawals"],
+    "BANK_TRANSFER": ["neft", "imps", "rtgs", "bank transfer", "bank transfers"],
+    "CHEQUE": ["cheque", "cheques"],
+    "ONLINE_BANKING": ["net banking", "netbanking", "online banking"],
+    "CREDIT_CARD": ["credit card"],
+}
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+MONTHS["sept"] = 9
+_MONTH = "(%s)" % "|".join(sorted(MONTHS, key=len, reverse=True))
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"((?:19|20)\d\d)"
+
+# (name, pattern); earlier patterns win where two overlap
+_DATE_PATTERNS = [
+    ("iso", re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")),
+    ("dmy", re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b")),
+    ("month_days", re.compile(rf"\b{_MONTH} {_DAY}((?:,? (?:and )?{_DAY})+)(?: {_YEAR})?\b")),
+    ("day_month", re.compile(rf"\b{_DAY} (?:of )?{_MONTH}(?: {_YEAR})?\b")),
+    ("month_day", re.compile(rf"\b{_MONTH} {_DAY}(?: {_YEAR})?\b")),
+    ("quarter", re.compile(rf"\bq([1-4])(?: {_YEAR})?\b")),
+    ("month", re.compile(rf"\b{_MONTH}(?: {_YEAR})?\b")),
+    ("year", re.compile(rf"\b{_YEAR}\b")),
+    ("last_days", re.compile(r"\b(?:last|past) (\d+) days\b")),
+    ("relative", re.compile(r"\b(today|yesterday|this month|last month|this year|last year)\b")),
+]
+_RANGE_JOIN = re.compile(r"^\s*(?:and|to|till|until|through|-)\s*$")
+_RANGE_START = re.compile(r"\b(?:between|from)\s*$")
+_JOINED = re.compile(r"\b(?:and|or)\b") # between two filters: either one, not rows matching both
+# "may" is read as the month only after a preposition ("spend in may"), else it is the verb
+_MAY_AS_MONTH = re.compile(r"\b(?:in|of|for|during|since|until|from|to|till|between|and)\s+$")
+
+_TOP = re.compile(r"\btop(?: (\d+))? (?:merchants|payees|recipients|shops|stores)\b")
+_TOTAL = re.compile(r"\b(?:total|how much|sum of|sum)\b")
+_LIST = re.compile(r"\b(?:list|show|get|display|fetch|give me)\b")
+_INCOME_WORDS = re.compile(r"\b(?:income|earned|earn|received|receive|credited|credits|deposits)\b")
+_SPEND_WORDS = re.compile(r"\b(?:spend|spent|spending|spendings|expenses|expense|paid|pay|payments|debits|debited)\b")
+
+# words a question may contain besides what the rules above take out
+FILLER_WORDS = set("""
+a an the my me i we our did do does was were is are have has what whats what's which all of on in for at by via
+using with through from to during between and or any much many how there been made make
+transactions transaction records record entries entry amount amounts money overall please
+""".split())
+
+def normalize(question: str) -> str:
+    text = question.lower().replace("’", "'")
+    text = re.sub(r"[^\w\s/'-]", " ", text)
+    return " ".join(text.split())
+
+def _month_end(year: int, month: int) -> datetime.date:
+    return datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+def _recent_year(month: int, day: int, today: datetime.date) -> int:
+    """Year of the latest month/day that is not after today, for dates written without a year."""
+    return today.year if (month, day) <= (today.month, today.day) else today.year - 1
+
+class IntentParser:
+    """Turns a question into a MongoDB query, or None when the question is not understood."""
+
+    def __init__(self, banks: Optional[Sequence[str]] = None, keywords: Optional[Dict[str, Sequence[str]]] = None):
+        banks = env.MY_BANKS_LIST if banks is None else banks
+        if keywords is None:
+            keywords = {category: [k for name in lists for k in getattr(env, name)] for category, (lists, _) in CATEGORIES.items()}
+
+        # phrase -> (field, value); merchant keywords match descriptions, the rest are exact fields
+        phrases: Dict[str, Tuple[str, Any]] = {}
+        for category, words in keywords.items():
+            for keyword in words:
+                phrases[normalize(keyword)] = ("description", keyword.upper())
+        for method, words in PAYMENT_METHODS.items():
+            for word in words:
+                phrases[word] = ("payment_method", method)
+        for category, (_, words) in CATEGORIES.items():
+            for word in words + [category.lower().replace("_", " ")]:
+                phrases[word] = ("transaction_category", category)
+        for bank in banks:
+            for word in (bank.lower(), f"{bank.lower()} bank"):
+                phrases[word] = ("bank_name", f"{bank.upper()} BANK")
+        self.phrases = {phrase: value for phrase, value in phrases.items() if phrase}
+        alternatives = "|".join(re.escape(p) for p in sorted(self.phrases, key=len, reverse=True))
+        self.phrase_pattern = re.compile(rf"\b(?:{alternatives})\b") if alternatives else None
+
+    def parse(self, question: str, today: Optional[datetime.date] = None) -> Optional[Dict[str, Any]]:
+        """{"intent": ..., "query": ...} for a question the rules cover, else None."""
+        today = today or datetime.date.today()
+        text = normalize(question)
+
+        dates = self._find_dates(text, today)
+        if dates is None:
+            return None
+        date_filter, text = dates
+
+        match: Dict[str, Any] = {}
+        if date_filter is not None:
+            match["date"] = date_filter
+        if self.phrase_pattern is not None:
+            previous_end = None
+            for found in self.phrase_pattern.finditer(text):
+                field, value = self.phrases[found.group(0)]
+                if field in match and match[field] != value:
+                    return None # two categories, banks, ...: leave it to the LLM
+                if previous_end is not None and _JOINED.search(text[previous_end:found.start()]):
+                    return None # "groceries and swiggy": meant as either one, not rows matching both
+                match[field] = value
+                previous_end = found.end()
+            text = self.phrase_pattern.sub(" ", text)
+        if "description" in match:
+            match["description"] = {"$regex": re.escape(match["description"]), "$options": "i"}
+
+        top = _TOP.search(text)
+        income = bool(_INCOME_WORDS.search(text)) or match.get("transaction_category") in ("SALARY", "INTEREST_INCOME")
+        if top:
+            intent = "top_merchants"
+            query = {"operation": "aggregate", "pipeline": [
+                {"$match": {**match, "is_debit": True, "recipient_bank_details.sendTo": "MERCHANT"}},
+                {"$group": {"_id": "$recipient_bank_details.recipient_name", "total": {"$sum": "$debit"}, "count": {"$sum": 1}}},
+                {"$sort": {"total": -1}},
+                {"$limit": int(top.group(1) or 5)},
+            ]}
+        elif _TOTAL.search(text):
+            intent = "total_income" if income else "total_spend"
+            query = {"operation": "aggregate", "pipeline": [
+                {"$match": {**match, "is_credit" if income else "is_debit": True}},
+                {"$group": {"_id": None, "total": {"$sum": "$credit" if income else "$debit"}, "count": {"$sum": 1}}},
+            ]}
+        elif _LIST.search(text):
+            intent = "list_transactions"
+            if income:
+                match["is_credit"] = True
+            elif _SPEND_WORDS.search(text):
+                match["is_debit"] = True
+            query = {"operation": "find", "filter": match}
+        else:
+            return None
+
+        for pattern in (_TOP, _TOTAL, _LIST, _INCOME_WORDS, _SPEND_WORDS):
+            text = pattern.sub(" ", text)
+        leftover = [word for word in text.split() if word not in FILLER_WORDS]
+        if leftover:
+            return None
+        return {"intent": intent, "query": query}
+
+    #region dates
+    def _find_dates(self, text: str, today: datetime.date) -> Optional[Tuple[Any, str]]:
+        """(date filter or None, text without the dates), or None when the dates are ambiguous."""
+        found: List[Tuple[int, int, Any, bool]] = [] # (start, end, range or list of days, year given)
+        taken = [False] * len(text)
+        for kind, pattern in _DATE_PATTERNS:
+            for match in pattern.finditer(text):
+                if any(taken[match.start():match.end()]):
+                    continue
+                if kind == "month" and match.group(0) == "may" and not _MAY_AS_MONTH.search(text[:match.start()]):
+                    continue
+                value = self._date_value(kind, match, today)
+                if value is None:
+                    return None
+                has_year = kind in ("iso", "dmy", "year") or bool(re.search(rf"\b{_YEAR}\b", match.group(0)))
+                found.append((match.start(), match.end(), value, has_year))
+                taken[match.start():match.end()] = [True] * (match.end() - match.start())
+        found.sort(key=lambda item: item[0])
+        if not found:
+            return None, text
+
+        if len(found) == 1:
+            start, end, value, _ = found[0]
+            if isinstance(value, list) and len(value) == 2 and _RANGE_START.search(text[:start]):
+                value = (value[0], value[1]) # "between may 1 and 5"
+            date_filter = self._date_filter(value)
+        elif len(found) == 2 and _RANGE_JOIN.match(text[found[0][1]:found[1][0]]) and all(isinstance(f[2], tuple) for f in found):
+            if text[found[0][1]:found[1][0]].strip() == "and" and not _RANGE_START.search(text[:found[0][0]]):
+                return None # "january and march": two separate periods, not the range between them
+            first, second = found[0][2], found[1][2]
+            if not found[0][3] and found[1][3]: # "from april to june 2025": the year is written once
+                first = (first[0].replace(year=second[1].year), first[1])
+                if first[0] > second[1]:
+                    first = (first[0].replace(year=first[0].year - 1), first[1])
+            elif found[0][3] and not found[1][3]: # "march 2025 to may": the range continues from the first year
+                second = self._in_year(second, first[0].year)
+                if second is not None and second[1] < first[0]:
+                    second = self._in_year(second, first[0].year + 1)
+                if second is None:
+                    return None
+            if second[1] < first[0]:
+                return None
+            date_filter = self._date_filter((first[0], second[1]))
+            found = [(found[0][0], found[1][1], None, True)]
+        else:
+            return None
+        for start, end, _, _ in reversed(found):
+            text = text[:start] + " " + text[end:]
+        return date_filter, text
+
+    @staticmethod
+    def _in_year(value, year: int):
+        """A (first day, last day) date range moved to year; None when a day doesn't exist there (29 february)."""
+        start, end = value
+        try:
+            if start != end and start.day == 1 and end == _month_end(end.year, end.month): # whole months: end on the last day
+                return start.replace(year=year), _month_end(year + end.year - start.year, end.month)
+            return start.replace(year=year), end.replace(year=year + end.year - start.year)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _date_filter(value) -> Dict[str, Any]:
+        if isinstance(value, list):
+            return {"$in": [day.isoformat() for day in value]}
+        start, end = value
+        if start == end:
+            return start.isoformat()
+        return {"$gte": start.isoformat(), "$lte": end.isoformat()}
+
+    @staticmethod
+    def _date_value(kind: str, match: re.Match, today: datetime.date):
+        """(first day, last day) of a date expression, a list of days, or None when it is not a valid date."""
+        groups = match.groups()
+        try:
+            if kind == "iso":
+                day = datetime.date(int(groups[0]), int(groups[1]), int(groups[2]))
+                return day, day
+            if kind == "dmy":
+                day = datetime.date(int(groups[2]), int(groups[1]), int(groups[0]))
+                return day, day
+            if kind == "month_days":
+                month = MONTHS[groups[0]]
+                days = [int(groups[1])] + [int(day) for day in re.findall(r"(\d{1,2})(?:st|nd|rd|th)?", groups[2])]
+                year = int(groups[-1]) if groups[-1] else _recent_year(month, min(days), today)
+                return [datetime.date(year, month, day) for day in days]
+            if kind in ("day_month", "month_day"):
+                day_text, month_name = (groups[0], groups[1]) if kind == "day_month" else (groups[1], groups[0])
+                month, day = MONTHS[month_name], int(day_text)
+                year = int(groups[2]) if groups[2] else _recent_year(month, day, today)
+                day = datetime.date(year, month, day)
+                return day, day
+            if kind == "quarter":
+                quarter = int(groups[0])
+                year = int(groups[1]) if groups[1] else (today.year if quarter <= (today.month - 1) // 3 + 1 else today.year - 1)
+                return datetime.date(year, quarter * 3 - 2, 1), _month_end(year, quarter * 3)
+            if kind == "month":
+                month = MONTHS[groups[0]]
+                year = int(groups[1]) if groups[1] else _recent_year(month, 1, today)
+                return datetime.date(year, month, 1), _month_end(year, month)
+            if kind == "year":
+                year = int(groups[0])
+                return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+            if kind == "last_days":
+                return today - datetime.timedelta(days=int(groups[0]) - 1), today
+            phrase = groups[0]
+            if phrase == "today":
+                return today, today
+            if phrase == "yesterday":
+                day = today - datetime.timedelta(days=1)
+                return day, day
+            if phrase == "this month":
+                return today.replace(day=1), today
+            if phrase == "last month":
+                end = today.replace(day=1) - datetime.timedelta(days=1)
+                return end.replace(day=1), end
+            if phrase == "this year":
+                return datetime.date(today.year, 1, 1), today
+            return datetime.date(today.year - 1, 1, 1), datetime.date(today.year - 1, 12, 31)
+        except ValueError: # 31 april and the like
+            return None
+    #endregion
+
+_intent_parser: Optional[IntentParser] = None
+
+def get_intent_parser() -> IntentParser:
+    global _intent_parser
+    if _intent_parser is None:
+        _intent_parser = IntentParser()
+    return _intent_parser
+
+def parse_question(question: str, today: Optional[datetime.date] = None) -> Optional[Dict[str, Any]]:
+    return get_intent_parser().parse(question, today)
@@ -0,0 +1,77 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+def trie_regex(keywords: Iterable[str]) -> str:
+    """Regex source matching any of the keywords, factored as a prefix trie.
+
+    re tries the branches of an alternation one by one, so a flat "A|B|C..." costs one attempt per
+    keyword at every position; the trie form only follows the branch of the next character.
+    Longer keywords are preferred: at a given position the longest matching keyword is reported.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of a keyword
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:%s)" % "|".join(branches)
+        return "(?:%s)?" % body if "" in node else body
+
+    return build(trie)
+
+def compile_keywords(keywords: Sequence[str]) -> Optional[re.Pattern]:
+    """One regex matching any of the keywords as a substring; None when there are no keywords."""
+    if not keywords:
+        return None
+    return re.compile(trie_regex(keywords))
+
+def contains_any(pattern: Optional[re.Pattern], text: str) -> bool:
+    return pattern is not None and pattern.search(text) is not None
+
+class CategoryMatcher:
+    """Ordered keyword rules compiled into a single regex.
+
+    rules is a list of (category, contains_keywords, prefix_keywords): a rule matches when the text
+    contains one of contains_keywords or starts with one of prefix_keywords. match() returns the
+    category of the first matching rule, like an if/elif chain of any(...) checks would.
+
+    All contains_keywords go into one trie regex wrapped in a lookahead, so finditer visits every
+    position of the text once and reports the longest keyword starting there. Any other keyword
+    starting at that position is a prefix of it, so each keyword is ranked with the best rule among
+    its own prefixes, and the lowest rank over all positions is the answer.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, List[str], List[str]]], default: str = "OTHER"):
+        self.categories = [category for category, _, _ in rules]
+        self.default = default
+        self.prefix_rules = [(tuple(prefixes), index) for index, (_, _, prefixes) in enumerate(rules) if prefixes]
+
+        rule_of_keyword: Dict[str, int] = {}
+        for index, (_, contains, _) in enumerate(rules):
+            for keyword in contains:
+                rule_of_keyword.setdefault(keyword, index)  # rules are in priority order
+        self.rank = {
+            keyword: min(rule_of_keyword[keyword[:end]] for end in range(1, len(keyword) + 1) if keyword[:end] in rule_of_keyword)
+            for keyword in rule_of_keyword
+        }
+        self.pattern = re.compile("(?=(%s))" % trie_regex(rule_of_keyword)) if rule_of_keyword else None
+
+    def match(self, text: str) -> str:
+        best = None
+        for prefixes, index in self.prefix_rules:
+            if text.startswith(prefixes):
+                best = index
+                break
+        if self.pattern is not None:
+            for match in self.pattern.finditer(text):
+                rank = self.rank[match.group(1)]
+                if best is None or rank < best:
+                    best = rank
+                    if best == 0:
+                        break
+        return self.default if best is None else self.categories[best]
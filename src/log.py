@@ -0,0 +1,104 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+from typing import Any, Dict, List, Optional
+from src import env
+
+# Logging for the ingestion pipeline. Records go through a QueueHandler by default, so the code
+# that logs only puts the record on a queue; a listener thread does the formatting and console
+# or file I/O. Row-level errors are not logged one by one: see ErrorAggregator.
+
+LOGGER_NAME = "expense_tracker"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+def _output_handlers() -> List[logging.Handler]:
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if env.LOG_FILE:
+        handlers.append(logging.FileHandler(env.LOG_FILE))
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def setup_logging(level: Optional[str] = None, queued: Optional[bool] = None):
+    """Configure the pipeline loggers; calling it again replaces the previous configuration."""
+    global _listener
+    stop_logging()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel((level or env.LOG_LEVEL).upper())
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+    handlers = _output_handlers()
+    if queued if queued is not None else env.LOG_QUEUE:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        logger.addHandler(logging.handlers.QueueHandler(records))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
+
+def setup_worker_logging():
+    """Process pool initializer: a forked worker inherits the parent's queue, but not its listener thread."""
+    global _listener
+    _listener = None # the listener belongs to the parent
+    setup_logging(queued=False)
+
+def stop_logging():
+    """Drain the queue and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
+
+class ErrorAggregator:
+    """Row errors of one statement: a count plus the first max_samples samples per error class.
+
+    Recording is in memory only, so the parsing loop never waits on I/O for a bad row; the
+    aggregate is logged once per statement with log_to.
+    """
+
+    def __init__(self, max_samples: Optional[int] = None):
+        self.max_samples = max_samples # None: LOG_ERROR_SAMPLES, read on the first error
+        self.errors: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, error_class: str, message: str, row: Any = None):
+        entry = self.errors.get(error_class)
+        if entry is None:
+            entry = self.errors[error_class] = {"count": 0, "samples": []}
+            if self.max_samples is None:
+                self.max_samples = env.LOG_ERROR_SAMPLES
+        entry["count"] += 1
+        if len(entry["samples"]) < self.max_samples:
+            entry["samples"].append({"message": message, "row": row})
+
+    def __len__(self) -> int:
+        return sum(entry["count"] for entry in self.errors.values())
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return self.errors
+
+    @classmethod
+    def from_dict(cls, errors: Dict[str, Dict[str, Any]]) -> "ErrorAggregator":
+        aggregator = cls()
+        aggregator.errors = {name: {"count": entry["count"], "samples": list(entry["samples"])} for name, entry in errors.items()}
+        return aggregator
+
+    def log_to(self, logger: logging.Logger, file_name: str):
+        for error_class, entry in self.errors.items():
+            for sample in entry["samples"]:
+                logger.warning("%s: skipped row (%s: %s): %s", file_name, error_class, sample["message"], sample["row"])
+            suppressed = entry["count"] - len(entry["samples"])
+            if suppressed > 0:
+                logger.warning("%s: %d more %s rows skipped", file_name, suppressed, error_class)
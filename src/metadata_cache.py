@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+from src import env, log
+
+logger = log.get_logger("metadata_cache")
+
+def config_fingerprint() -> str:
+    """Hash of every keyword list in src.env plus the parser version.
+
+    Cached metadata is only valid for the configuration it was derived with; a persisted cache
+    whose fingerprint differs from the current one is dropped on load.
+    """
+    from src.ingestion_ledger import PARSER_VERSION
+    lists = {name: getattr(env, name) for name in sorted(dir(env)) if name.endswith("_LIST")}
+    payload = json.dumps({"parser_version": PARSER_VERSION, "lists": lists}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class MetadataCache:
+    """Bounded LRU cache of description -> derived metadata, optionally persisted to a JSON file."""
+
+    def __init__(self, max_size: int, path: Optional[str] = None, fingerprint: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+        self.fingerprint = fingerprint or config_fingerprint()
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.added: "OrderedDict[str, None]" = OrderedDict() # keys put since the last mark()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    def get(self, key: str):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value):
+        self.added[key] = None
+        self._store(key, value)
+
+    def _store(self, key: str, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def mark(self):
+        """Start recording a delta; pass the result to changes_since()."""
+        self.added.clear()
+        return self.hits, self.misses
+
+    def changes_since(self, mark) -> dict:
+        """The entries put and the lookups counted since mark(), for merge() in another process."""
+        entries = [(key, self.entries[key]) for key in self.added if key in self.entries]
+        return {"entries": entries, "hits": self.hits - mark[0], "misses": self.misses - mark[1]}
+
+    def merge(self, changes: dict):
+        # pool workers each have their own copy of the cache: the parent merges what they learned
+        # so that save() and stats() cover the whole run
+        for key, value in changes["entries"]:
+            self._store(key, value)
+        self.hits += changes["hits"]
+        self.misses += changes["misses"]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self.entries),
+        }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable metadata cache %s: %s", self.path, e)
+            return
+        if data.get("fingerprint") != self.fingerprint:
+            logger.info("Keyword configuration changed, discarding the persisted metadata cache")
+            return
+        for key, value in data.get("entries", [])[-self.max_size:]:
+            self.entries[key] = tuple(value)
+
+    def save(self):
+        if not self.path:
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"fingerprint": self.fingerprint, "entries": list(self.entries.items())}, file)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,194 @@
+import datetime
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+from src import env, log
+
+logger = log.get_logger("metrics")
+
+# Instrumentation for the orchestrator. Every statement gets a StatementMetrics (per-page times,
+# row counts); the parsing code records into the current one of its process. RunMetrics collects
+# the statements of a run, hands each event to the configured sinks and builds the run report.
+
+class StatementMetrics:
+    """Counters and timings of one statement file."""
+
+    def __init__(self, file_name: str):
+        self.file = file_name
+        self.status = "ok"
+        self.error = None
+        self.parse_seconds = 0.0 # time spent inside the parser, not waiting on the consumer
+        self.db_seconds = 0.0
+        self.pages: List[Dict[str, Any]] = []
+        self.counts = {"rows_extracted": 0, "header_rows_scanned": 0, "rows_enriched": 0, "malformed_rows": 0, "transactions": 0}
+        self.errors = log.ErrorAggregator()
+
+    def page(self, page_number: int, seconds: float, rows: Optional[int], source: str = "pdf"):
+        self.pages.append({"page": page_number, "seconds": round(seconds, 4), "rows": rows, "source": source})
+        self.counts["rows_extracted"] += rows or 0
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def row_error(self, error: Exception, row: Any = None):
+        """A row with a valid date that could not be turned into a transaction."""
+        self.counts["malformed_rows"] += 1
+        self.errors.add(type(error).__name__, str(error), row)
+
+    def fail(self, error: str):
+        self.status = "failed"
+        self.error = error
+
+    @property
+    def rows_rejected(self) -> int:
+        # rows the parser saw but that are not transactions (no valid date: headers, totals, notes)
+        return max(self.counts["rows_enriched"] - self.counts["transactions"] - self.counts["malformed_rows"], 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "file": self.file,
+            "status": self.status,
+            "error": self.error,
+            "seconds": round(self.parse_seconds + self.db_seconds, 4),
+            "parse_seconds": round(self.parse_seconds, 4),
+            "db_seconds": round(self.db_seconds, 4),
+            **self.counts,
+            "rows_rejected": self.rows_rejected,
+            "errors": self.errors.to_dict(),
+            "pages": self.pages,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StatementMetrics":
+        # statements parsed in a worker process come back to the parent as dicts
+        statement = cls(data["file"])
+        statement.load(data)
+        return statement
+
+    def load(self, data: Dict[str, Any]):
+        """Replace this statement's metrics with to_dict() output, e.g. from the worker that parsed the file."""
+        self.status, self.error = data["status"], data["error"]
+        self.parse_seconds, self.db_seconds = data["parse_seconds"], data["db_seconds"]
+        self.pages = list(data["pages"])
+        self.counts = {name: data[name] for name in self.counts}
+        self.errors = log.ErrorAggregator.from_dict(data["errors"])
+
+_current = StatementMetrics("") # records of code running outside a statement go nowhere
+
+def current() -> StatementMetrics:
+    return _current
+
+def set_current(statement: StatementMetrics):
+    global _current
+    _current = statement
+
+#region sinks
+class StdoutSink:
+    # one summary line per event, through the (queued) log handlers
+    def emit(self, event: Dict[str, Any]):
+        if event["event"] == "statement":
+            logger.info(
+                "Metrics %s: %d pages, %d rows, %d transactions, %d rejected, %d malformed, %.2fs parse, %.2fs db",
+                event["file"], len(event["pages"]), event["rows_extracted"], event["transactions"],
+                event["rows_rejected"], event["malformed_rows"], event["parse_seconds"], event["db_seconds"],
+            )
+        elif event["event"] == "run":
+            logger.info(
+                "Run metrics: %d files, %d transactions in %.2fs (%s rows/s)",
+                len(event["processed_files"]), event["total_transactions"], event["seconds"], event["transactions_per_sec"],
+            )
+
+    def close(self):
+        pass
+
+class JsonLinesSink:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "a")
+
+    def emit(self, event: Dict[str, Any]):
+        self.file.write(json.dumps(event, default=str) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def _metrics_file() -> str:
+    return env.METRICS_FILE or os.path.join(env.OUTPUT_JSON_DIR or ".", "metrics.jsonl")
+
+# name -> factory; register_sink adds others (e.g. a push to a metrics service)
+SINKS: Dict[str, Callable[[], Any]] = {
+    "stdout": StdoutSink,
+    "jsonl": lambda: JsonLinesSink(_metrics_file()),
+}
+
+def register_sink(name: str, factory: Callable[[], Any]):
+    """Make a sink available to METRICS_SINKS; a sink has emit(event: dict) and close()."""
+    SINKS[name] = factory
+
+def open_sinks(names: Optional[List[str]] = None) -> List[Any]:
+    names = env.METRICS_SINKS if names is None else names
+    unknown = [name for name in names if name not in SINKS]
+    if unknown:
+        logger.warning("Unknown metrics sinks ignored: %s", unknown)
+    return [SINKS[name]() for name in names if name in SINKS]
+#endregion
+
+class RunMetrics:
+    """Collects the statements of one orchestrator run and builds its report."""
+
+    def __init__(self, sinks: Optional[List[Any]] = None, **config):
+        self.sinks = open_sinks() if sinks is None else sinks
+        self.config = config
+        self.statements: List[StatementMetrics] = []
+        self.started_at = datetime.datetime.now()
+        self._started = time.perf_counter()
+
+    def emit(self, event: Dict[str, Any]):
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                logger.warning("Metrics sink %s failed: %s", type(sink).__name__, e)
+
+    def record(self, statement: StatementMetrics):
+        self.statements.append(statement)
+        statement.errors.log_to(logger, statement.file)
+        self.emit({"event": "statement", **statement.to_dict()})
+
+    def finish(self, **extra) -> Dict[str, Any]:
+        """Build the run report, emit it and close the sinks."""
+        seconds = time.perf_counter() - self._started
+        done = [s for s in self.statements if s.status == "ok"]
+        transactions = sum(s.counts["transactions"] for s in done)
+        pages = [page for s in self.statements for page in s.pages]
+        report = {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(seconds, 3),
+            **self.config,
+            "total_files": len(self.statements),
+            "processed_files": [s.file for s in done],
+            "failed_files": len(self.statements) - len(done),
+            "failed": [{"file": s.file, "error": s.error} for s in self.statements if s.status != "ok"],
+            "total_transactions": transactions,
+            "transactions_per_sec": round(transactions / seconds) if seconds else None,
+            "pages": len(pages),
+            "pages_from_cache": sum(1 for page in pages if page["source"] == "cache"),
+            "page_seconds": round(sum(page["seconds"] for page in pages), 3),
+            "slowest_page_seconds": max((page["seconds"] for page in pages), default=0.0),
+            "rows_extracted": sum(s.counts["rows_extracted"] for s in self.statements),
+            "rows_rejected": sum(s.rows_rejected for s in self.statements),
+            "malformed_rows": sum(s.counts["malformed_rows"] for s in self.statements),
+            "parse_seconds": round(sum(s.parse_seconds for s in self.statements), 3),
+            "db_seconds": round(sum(s.db_seconds for s in self.statements), 3),
+            "slowest_files": [
+                {"file": s.file, "seconds": round(s.parse_seconds + s.db_seconds, 3)}
+                for s in sorted(self.statements, key=lambda s: s.parse_seconds + s.db_seconds, reverse=True)[:5]
+            ],
+            **extra,
+        }
+        self.emit({"event": "run", **report})
+        for sink in self.sinks:
+            sink.close()
+        return report
@@ -1,17 +1,262 @@
-from pymongo import MongoClient
-from typing import List, Dict, Any
-from src import env
-
-def insert_transactions_to_db(transactions: List[Dict[str, Any]]):
-    client = MongoClient(env.MONGODB_URI)  # Update with your MongoDB URI
-    db = client[env.DB_NAME]  # Database name
-    collection = db[get_effective_collection_name()]  # Collection name
-    if transactions:
-        collection.insert_many(transactions)  # Insert all transactions
-    client.close()
+import time
+from pymongo import DeleteMany, InsertOne, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from typing import List, Dict, Any, Iterable, Optional
+from src import env, log
+from src.store import transaction_fingerprint
+from src.transaction import to_document
+
+logger = log.get_logger("mongo")
+
+_client = None
+_indexed = set() # (collection full name, rollups) whose indexes a writer already ensured with this client
+
+def get_client() -> MongoClient:
+    """Process-wide MongoClient; pymongo pools connections inside it, so reuse it instead of reconnecting."""
+    global _client
+    if _client is None:
+        _client = MongoClient(env.MONGODB_URI, maxPoolSize=env.MONGO_MAX_POOL_SIZE)
+    return _client
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+    _indexed.clear() # the next client may be connected to another server
+
+def get_transactions_collection():
+    return get_client()[env.DB_NAME][get_effective_collection_name()]
+
+def get_rollup_collection(transactions_collection=None):
+    """Monthly rollups of a transactions collection, stored next to it as <name>_rollups."""
+    collection = transactions_collection if transactions_collection is not None else get_transactions_collection()
+    return collection.database[f"{collection.name}_rollups"]
+
+# (keys, options) of every index on the transactions collection, matching how it is queried
+TRANSACTION_INDEXES = [
+    # upsert key of TransactionWriter; sparse, because documents written before fingerprints
+    # existed have none and would all collide on the null key of a plain unique index
+    ([("fingerprint", 1)], {"unique": True, "sparse": True}),
+    ([("document_id", 1)], {}), # a re-ingested statement's rows are deleted by document_id
+    ([("date", 1)], {}), # date and date-range filters
+    ([("month_year", 1), ("transaction_category", 1)], {}), # monthly and per-category totals
+    ([("is_debit", 1), ("date", 1)], {}), # expenses (or income) within a date range
+    ([("recipient_bank_details.recipient_name", 1)], {}), # merchant / payee lookups
+]
+
+def ensure_indexes(collection=None, rollups: Optional[bool] = None) -> Dict[str, Any]:
+    """Create the transactions (and rollup) indexes if missing; safe to call on every run.
+
+    An index that can't be built (e.g. conflicting existing data) is logged and skipped, so the
+    others are still created; returns {"created": [names], "failed": {name: error}}.
+    """
+    collection = collection if collection is not None else get_transactions_collection()
+    indexes = [(collection, keys, options) for keys, options in TRANSACTION_INDEXES]
+    if env.ROLLUPS if rollups is None else rollups:
+        indexes.append((get_rollup_collection(collection), [(field, 1) for field in ROLLUP_KEY_FIELDS], {"unique": True}))
+    result = {"created": [], "failed": {}}
+    for target, keys, options in indexes:
+        name = f"{target.name}." + "_".join(f"{field}_{direction}" for field, direction in keys)
+        try:
+            target.create_index(keys, **options)
+            result["created"].append(name)
+        except PyMongoError as e:
+            logger.warning("Could not create index %s: %s", name, e)
+            result["failed"][name] = str(e)
+    return result
+
+class TransactionWriter:
+    """Buffered, idempotent writer for the transactions collection.
+
+    Rows are upserted on their fingerprint with unordered bulk_write calls, so re-running a
+    statement matches the existing documents instead of duplicating them. The buffer is flushed
+    every batch_size rows, or on the next write once flush_interval seconds have passed.
+    stats counts inserted (new), matched (already stored) and skipped (repeated in a batch) rows,
+    and the seconds spent in bulk_write.
+
+    With rollups on, every flush also adds the rows it inserted to the monthly rollup collection
+    (see rollup_updates); rows that were already stored are not counted again.
+    """
+
+    def __init__(self, collection=None, batch_size: Optional[int] = None, flush_interval: Optional[float] = None, rollups: Optional[bool] = None):
+        self.collection = collection if collection is not None else get_transactions_collection()
+        self.batch_size = batch_size or env.DB_INSERT_BATCH_SIZE
+        self.flush_interval = env.DB_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.rollup_collection = get_rollup_collection(self.collection) if (env.ROLLUPS if rollups is None else rollups) else None
+        self.stats = {"inserted": 0, "matched": 0, "skipped": 0, "failed": 0, "batches": 0, "rollup_updates": 0, "seconds": 0.0}
+        self._buffer: Dict[str, tuple] = {} # fingerprint -> (operation, document)
+        self._last_flush = time.monotonic()
+        indexed = (self.collection.full_name, self.rollup_collection is not None)
+        if indexed not in _indexed: # upserts look rows up by fingerprint; once per collection, not per statement
+            ensure_indexes(self.collection, rollups=indexed[1])
+            _indexed.add(indexed)
+
+    def write(self, transaction):
+        transaction = to_document(transaction) # a Transaction becomes a dict only here
+        fingerprint = transaction.get("fingerprint") or transaction_fingerprint(transaction)
+        if fingerprint in self._buffer:
+            self.stats["skipped"] += 1
+            return
+        document = {**transaction, "fingerprint": fingerprint}
+        self._buffer[fingerprint] = (UpdateOne({"fingerprint": fingerprint}, {"$setOnInsert": document}, upsert=True), document)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_many(self, transactions: Iterable[Any]) -> int:
+        count = 0
+        for transaction in transactions:
+            self.write(transaction)
+            count += 1
+        return count
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        operations = [operation for operation, _ in self._buffer.values()]
+        documents = [document for _, document in self._buffer.values()]
+        self._buffer = {}
+        self.stats["batches"] += 1
+        started = time.perf_counter()
+        try:
+            try:
+                result = self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # unordered: the rest of the batch was still applied
+                details = e.details
+                self.stats["inserted"] += details.get("nUpserted", 0)
+                self.stats["matched"] += details.get("nMatched", 0)
+                self.stats["failed"] += len(details.get("writeErrors", []))
+                self._write_rollups([documents[upsert["index"]] for upsert in details.get("upserted", [])])
+                raise
+            self.stats["inserted"] += result.upserted_count
+            self.stats["matched"] += result.matched_count
+            # upserted_ids holds the batch positions of the rows that were new
+            self._write_rollups([documents[index] for index in result.upserted_ids])
+        finally:
+            self.stats["seconds"] += time.perf_counter() - started
+
+    def discard(self):
+        """Drop the buffered rows without writing them (the statement they belong to failed)."""
+        self._buffer = {}
+
+    def _write_rollups(self, inserted: List[Dict[str, Any]]):
+        if self.rollup_collection is None or not inserted:
+            return
+        updates = rollup_updates(inserted)
+        self.rollup_collection.bulk_write(updates, ordered=False)
+        self.stats["rollup_updates"] += len(updates)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def insert_transactions_to_db(transactions: List[Dict[str, Any]]) -> Dict[str, int]:
+    writer = TransactionWriter()
+    writer.write_many(transactions)
+    writer.close()
+    return writer.stats
+
+def delete_transactions_for_document(document_id: str, collection=None) -> int:
+    collection = collection if collection is not None else get_transactions_collection()
+    if collection.find_one({"document_id": document_id}, {"_id": 1}) is None:
+        return 0 # a statement seen for the first time: nothing to delete or rebuild
+    keys = [] # rollup keys the document contributed to; rebuilt once its rows are gone
+    if env.ROLLUPS:
+        keys = [group["_id"] for group in collection.aggregate([
+            {"$match": {"document_id": document_id}},
+            {"$group": {"_id": {field: f"${field}" for field in ROLLUP_KEY_FIELDS}}},
+        ])]
+    deleted = collection.delete_many({"document_id": document_id}).deleted_count
+    if keys:
+        rebuild_rollups(keys, collection)
+    return deleted
+
+#region monthly rollups
+# Pre-aggregated totals per (bank, month, category, payment method, debit/credit), kept up to date
+# while transactions are written so summaries and trends don't have to scan the transactions.
+ROLLUP_KEY_FIELDS = ("bank_name", "month_year", "transaction_category", "payment_method", "is_debit")
+ROLLUP_PROJECTION = {field: 1 for field in ROLLUP_KEY_FIELDS + ("debit", "credit", "is_credit", "day_of_week")}
+
+def rollup_key(transaction: Dict[str, Any]) -> tuple:
+    return tuple(transaction.get(field) for field in ROLLUP_KEY_FIELDS)
+
+def rollup_totals(transactions: Iterable[Dict[str, Any]]) -> Dict[tuple, Dict[str, Any]]:
+    """Rollup values per key: counts, debit/credit/amount sums, amount min/max and a per-weekday split.
+
+    amount is the debit of debit rows and the credit of the others, like the amount the queries use.
+    """
+    totals: Dict[tuple, Dict[str, Any]] = {}
+    for transaction in transactions:
+        debit = float(transaction.get("debit") or 0.0)
+        credit = float(transaction.get("credit") or 0.0)
+        amount = debit if transaction.get("is_debit") else credit
+        key = rollup_key(transaction)
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = {
+                "count": 0, "credit_count": 0, "debit_sum": 0.0, "credit_sum": 0.0, "amount_sum": 0.0,
+                "amount_min": amount, "amount_max": amount, "by_weekday": {},
+            }
+        total["count"] += 1
+        total["credit_count"] += 1 if transaction.get("is_credit") else 0
+        total["debit_sum"] += debit
+        total["credit_sum"] += credit
+        total["amount_sum"] += amount
+        total["amount_min"] = min(total["amount_min"], amount)
+        total["amount_max"] = max(total["amount_max"], amount)
+        day = total["by_weekday"].setdefault(transaction.get("day_of_week") or "Unknown", {"count": 0, "debit": 0.0, "credit": 0.0})
+        day["count"] += 1
+        day["debit"] += debit
+        day["credit"] += credit
+    return totals
+
+def rollup_updates(transactions: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    """One $inc/$min/$max upsert per rollup key, adding a batch of newly stored transactions."""
+    updates = []
+    for key, total in rollup_totals(transactions).items():
+        increments = {field: total[field] for field in ("count", "credit_count", "debit_sum", "credit_sum", "amount_sum")}
+        for day, values in total["by_weekday"].items():
+            for field, value in values.items():
+                increments[f"by_weekday.{day}.{field}"] = value
+        updates.append(UpdateOne(
+            dict(zip(ROLLUP_KEY_FIELDS, key)),
+            {"$inc": increments, "$min": {"amount_min": total["amount_min"]}, "$max": {"amount_max": total["amount_max"]}},
+            upsert=True,
+        ))
+    return updates
+
+def rebuild_rollups(keys: Optional[List[Dict[str, Any]]] = None, collection=None) -> int:
+    """Recompute rollups from the transactions: the given keys (dicts of ROLLUP_KEY_FIELDS), or all of them.
+
+    Needed after rows are deleted, since a minimum or maximum can't be taken back with $inc,
+    and to build the rollups of transactions stored before they existed.
+    """
+    collection = collection if collection is not None else get_transactions_collection()
+    rollups = get_rollup_collection(collection)
+    if keys is None:
+        rollups.delete_many({})
+        match = {}
+    else:
+        if not keys:
+            return 0
+        match = {"$or": [dict(key) for key in keys]}
+    totals = rollup_totals(collection.find(match, ROLLUP_PROJECTION))
+    operations = [DeleteMany(dict(key)) for key in (keys or [])]
+    operations += [InsertOne({**dict(zip(ROLLUP_KEY_FIELDS, key)), **total}) for key, total in totals.items()]
+    if operations:
+        rollups.bulk_write(operations, ordered=True) # deletes first, then the recomputed documents
+    return len(totals)
+#endregion
 
 def get_effective_collection_name() -> str:
     base = env.COLLECTION_NAME
     if (env.ENV or "").strip().lower() == "dev":
         return f"{base}_dev"
-    return base
\ No newline at end of file
+    return base
@@ -0,0 +1,230 @@
+import datetime
+import importlib.util
+from glob import escape
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from src import env
+from src.transaction import to_document
+
+# optional: the Parquet export and offline analysis need pyarrow. It is imported by _require_pyarrow
+# on first use (pyarrow.dataset also loads pandas), so importing this module stays cheap.
+pa = pc = ds = fs = None
+
+# Columnar copy of the statement output, for analysis without MongoDB.
+# Transactions are flattened (recipient_bank_details.<key> columns, named like the MongoDB
+# paths) and typed: dictionary-encoded strings for the low-cardinality fields, float64 amounts,
+# timestamp dates. Files are partitioned hive-style by bank_name and month_year, one file per
+# statement and partition ("<document_id>-0.parquet"), so re-ingesting a statement replaces
+# only its own files.
+
+PARTITION_FIELDS = ("bank_name", "month_year")
+RECIPIENT_FIELDS = ("source", "sendTo", "transaction_id", "recipient_name", "bank_name", "banking_type",
+                    "ATM_Name", "Terminal_id", "Reference_id", "Location", "bank", "cheque_number")
+CATEGORICAL_FIELDS = ("bank_name", "document_id", "month_year", "quarter", "day_of_week", "payment_method",
+                      "transaction_category", "amount_range", "recipient_bank_details.source",
+                      "recipient_bank_details.sendTo", "recipient_bank_details.recipient_name",
+                      "recipient_bank_details.bank_name", "recipient_bank_details.banking_type")
+
+def is_available() -> bool:
+    return pa is not None or importlib.util.find_spec("pyarrow") is not None
+
+def _require_pyarrow():
+    global pa, pc, ds, fs
+    if pa is not None:
+        return
+    try:
+        import pyarrow.compute
+        import pyarrow.dataset
+        from pyarrow import fs as pyarrow_fs
+    except ImportError:
+        raise ImportError("the Parquet export and offline analysis need pyarrow (pip install pyarrow)") from None
+    pa, pc, ds, fs = pyarrow, pyarrow.compute, pyarrow.dataset, pyarrow_fs
+
+def default_root() -> str:
+    return env.PARQUET_DIR
+
+def transaction_schema():
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ("bank_name", categorical), ("document_id", categorical), ("row_index", pa.int32()),
+        ("date", pa.timestamp("ms")), ("month_year", categorical), ("quarter", categorical),
+        ("day_of_week", categorical), ("is_weekend", pa.bool_()), ("description", pa.string()),
+        ("debit", pa.float64()), ("credit", pa.float64()), ("balance", pa.float64()),
+        ("payment_method", categorical), ("transaction_category", categorical), ("is_debit", pa.bool_()),
+        ("is_credit", pa.bool_()), ("amount_range", categorical), ("is_recurring", pa.bool_()),
+    ]
+    for key in RECIPIENT_FIELDS:
+        name = f"recipient_bank_details.{key}"
+        fields.append((name, categorical if name in CATEGORICAL_FIELDS else pa.string()))
+    return pa.schema(fields)
+
+def partitioning():
+    return ds.partitioning(pa.schema([(field, pa.string()) for field in PARTITION_FIELDS]), flavor="hive")
+
+def _document_schema():
+    # transactions as the orchestrator yields them: plain strings, nested recipient_bank_details
+    fields = []
+    for field in transaction_schema():
+        if field.name.startswith("recipient_bank_details."):
+            continue
+        fields.append(pa.field(field.name, pa.string() if pa.types.is_dictionary(field.type) or field.name == "date" else field.type))
+    fields.append(pa.field("recipient_bank_details", pa.struct([(key, pa.string()) for key in RECIPIENT_FIELDS])))
+    return pa.schema(fields)
+
+def transactions_table(transactions: List[Dict[str, Any]]):
+    """Flattened, typed Arrow table of transactions as the orchestrator yields them."""
+    _require_pyarrow()
+    table = pa.Table.from_pylist([to_document(transaction) for transaction in transactions], schema=_document_schema()).flatten() # struct fields become "recipient_bank_details.<key>"
+    date_index = table.schema.get_field_index("date")
+    table = table.set_column(date_index, "date", pc.strptime(table.column("date"), format="%Y-%m-%d", unit="ms"))
+    return table.select(transaction_schema().names).cast(transaction_schema())
+
+def delete_statement(document_id: str, root: Optional[str] = None) -> int:
+    """Remove the files of one statement from every partition; returns how many were removed."""
+    removed = 0
+    for path in Path(root or default_root()).glob(f"**/{escape(document_id)}-*.parquet"):
+        path.unlink()
+        removed += 1
+    return removed
+
+def write_statement(document_id: str, transactions: List[Dict[str, Any]], root: Optional[str] = None) -> int:
+    """Replace the Parquet files of one statement with transactions; returns the rows written."""
+    _require_pyarrow()
+    root = root or default_root()
+    delete_statement(document_id, root)
+    if not transactions:
+        return 0
+    ds.write_dataset(
+        transactions_table(transactions), root, format="parquet", partitioning=partitioning(),
+        basename_template=f"{document_id}-{{i}}.parquet", existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(transactions)
+
+class StatementExport:
+    """Collects the transactions of a statement while they stream to the DB writer, then writes them as Parquet."""
+
+    def __init__(self, root: Optional[str] = None):
+        _require_pyarrow()
+        self.root = root or default_root()
+        self._rows: List[Any] = [] # Transaction objects until the statement is written
+
+    def tee(self, transactions: Iterable[Any]) -> Iterator[Any]:
+        self._rows = []
+        for transaction in transactions:
+            self._rows.append(transaction)
+            yield transaction
+
+    def write(self, document_id: str) -> int:
+        rows, self._rows = self._rows, []
+        return write_statement(document_id, rows, self.root)
+
+#region reading
+def open_dataset(root: Optional[str] = None):
+    """The exported transactions as a pyarrow dataset; files are memory-mapped when scanned."""
+    _require_pyarrow()
+    return ds.dataset(root or default_root(), format="parquet", partitioning=partitioning(),
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+def _date_value(value: str):
+    if len(value) != 10: # strptime would read "2025-04-3" as the 3rd
+        return None
+    try:
+        return pa.scalar(datetime.datetime.strptime(value, "%Y-%m-%d"), pa.timestamp("ms"))
+    except ValueError:
+        return None
+
+def _month_end_value(value: str):
+    # "2025-06-31" sorts after every June date and before July: the last day of the month stands in for it
+    try:
+        month = datetime.datetime.strptime(value[:7], "%Y-%m")
+        day = int(value[8:])
+    except ValueError:
+        return None
+    last_day = ((month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - datetime.timedelta(days=1))
+    if len(value) != 10 or value[7] != "-" or day <= last_day.day:
+        return None
+    return pa.scalar(last_day, pa.timestamp("ms"))
+
+def _comparison(field: str, operator: str, value):
+    column = ds.field(field)
+    if field != "date" or not isinstance(value, str):
+        return _apply(column, operator, value)
+    # dates are strings in MongoDB: compare as timestamps when the value is a real date (or a day
+    # past the end of its month), as text otherwise, and prune month_year partitions too
+    timestamp = _date_value(value)
+    month_end = _month_end_value(value) if timestamp is None else None
+    if timestamp is not None:
+        expression = _apply(column, operator, timestamp)
+    elif month_end is not None and operator in ("$lt", "$lte", "$gt", "$gte"):
+        expression = _apply(column, "$lte" if operator in ("$lt", "$lte") else "$gt", month_end)
+    else:
+        expression = _apply(pc.strftime(column, format="%Y-%m-%d"), operator, value)
+    month_operator = {"$gt": "$gte", "$lt": "$lte"}.get(operator, operator)
+    if month_operator in ("$eq", "$gte", "$lte"):
+        expression = expression & _apply(ds.field("month_year"), month_operator, value[:7])
+    return expression
+
+def _apply(column, operator: str, value):
+    if operator == "$eq":
+        return column == value
+    if operator == "$ne": # like MongoDB, missing values are not equal to anything
+        return (column != value) | column.is_null()
+    if operator == "$gt":
+        return column > value
+    if operator == "$gte":
+        return column >= value
+    if operator == "$lt":
+        return column < value
+    if operator == "$lte":
+        return column <= value
+    if operator == "$in":
+        return column.isin(list(value))
+    if operator == "$nin":
+        return ~column.isin(list(value)) | column.is_null()
+    raise ValueError(f"unsupported operator {operator}")
+
+def filter_expression(mongo_filter: Dict[str, Any]):
+    """pyarrow expression for a MongoDB find filter (comparisons, $in/$nin, $regex, $and/$or); None matches all.
+
+    Raises ValueError for operators it does not translate.
+    """
+    _require_pyarrow()
+    expressions = []
+    for field, condition in (mongo_filter or {}).items():
+        if field in ("$and", "$or"):
+            parts = [filter_expression(part) for part in condition]
+            if field == "$or" and any(part is None for part in parts): # one branch matches everything
+                continue
+            parts = [part for part in parts if part is not None]
+            if not parts:
+                continue
+            combined = parts[0]
+            for part in parts[1:]:
+                combined = combined & part if field == "$and" else combined | part
+            expressions.append(combined)
+        elif field.startswith("$"):
+            raise ValueError(f"unsupported operator {field}")
+        elif isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            for operator, value in condition.items():
+                if operator == "$options":
+                    continue
+                if operator == "$regex":
+                    ignore_case = "i" in condition.get("$options", "")
+                    expressions.append(pc.match_substring_regex(ds.field(field), pattern=value, ignore_case=ignore_case))
+                else:
+                    expressions.append(_comparison(field, operator, value))
+        else:
+            expressions.append(_comparison(field, "$eq", condition))
+    if not expressions:
+        return None
+    combined = expressions[0]
+    for expression in expressions[1:]:
+        combined = combined & expression
+    return combined
+
+def read_table(mongo_filter: Optional[Dict[str, Any]] = None, fields: Optional[Iterable[str]] = None, root: Optional[str] = None):
+    """Arrow table of the exported transactions matching a MongoDB find filter, limited to fields that exist."""
+    dataset = open_dataset(root)
+    columns = [name for name in dataset.schema.names if fields is None or name in fields] or None
+    return dataset.to_table(columns=columns, filter=filter_expression(mongo_filter))
+#endregion
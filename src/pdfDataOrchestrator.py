@@ -1,13 +1,21 @@
 #region Imports
-import pdfplumber
 import os
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, NamedTuple, Tuple
 import re
+import time
+import multiprocessing
+import queue
+from collections import deque
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from src import bank_structure,header_detection,mongo as db,env
+from src import bank_structure,header_detection,mongo as db,env,ingestion_ledger,keyword_matcher,metadata_cache,table_cache,metrics,log,parquet_store,store
+from src.transaction import Transaction
 #endregion
 
+logger = log.get_logger("orchestrator")
+
 #todo:: Move categorization lists to DB collection for easier management and updates.
 
 # add enum with date, description, debit, credit, balance
@@ -19,78 +27,493 @@ from src import bank_structure,header_detection,mongo as db,env
 #     BALANCE = "balance"
 #get bank column structure from JSON
 
-def process_all_statements() -> Dict[str, Any]:
-    print("Processing all PDF statements...")
+def process_all_statements(
+    workers: Optional[int] = None,
+    force_document_ids: Optional[List[str]] = None,
+    reenrich: bool = False,
+    metrics_sinks: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """Parse every statement in INPUT_PDF_DIR, write its transactions to the DB and return the run report.
+
+    reenrich re-runs only the enrichment stage (categorization, metadata) for every statement
+    whose tables are in the table cache, without opening the PDFs; the ledger is bypassed.
+    Per-statement metrics go to metrics_sinks (default: METRICS_SINKS) as they complete.
+    With PARQUET_EXPORT each statement is also written to PARQUET_DIR (see src/parquet_store.py).
+    STORE_BACKEND picks where transactions are written: MongoDB or an embedded DuckDB/SQLite file (src/store.py).
+    """
+    logger.info("Processing all PDF statements...")
 
     Path(env.OUTPUT_JSON_DIR).mkdir(exist_ok=True)
     monthly_output_dir=os.path.join(env.OUTPUT_JSON_DIR, "monthly")
     Path(monthly_output_dir).mkdir(parents=True, exist_ok=True) # parents=True -> will create all parent directories if they do not exist
 
     all_transactions = []
-    processing_stats={
-        "total_files": 0,
-        "processed_files": [],
-        "failed_files": 0,
-        "total_transactions": 0
-    }
-    for pdf_file in Path(env.INPUT_PDF_DIR).glob("*.pdf"):
+    processing_stats={}
+    workers = env.INGEST_WORKERS if workers is None else workers
+    run_metrics = metrics.RunMetrics(metrics_sinks, workers=workers, reenrich=reenrich)
+    ledger = ingestion_ledger.open_ledger()
+    ledger.forget_all(force_document_ids or [])  # forced statements are re-ingested even if unchanged
+    parquet_export = None
+    if env.PARQUET_EXPORT:
+        if parquet_store.is_available():
+            parquet_export = parquet_store.StatementExport()
+        else:
+            logger.warning("PARQUET_EXPORT is on but pyarrow is not installed; statements are only written to the DB")
+
+    pdf_files = []
+    ledger_keys = {}
+    file_hashes = {} # each file is hashed once: for the ledger here, for the table cache when it is parsed
+    skipped_files = []
+    for pdf_file in sorted(Path(env.INPUT_PDF_DIR).glob("*.pdf")): # sorted so the DB sees the same order on every run
+        file_hash = ingestion_ledger.file_sha256(pdf_file)
+        key = ingestion_ledger.ledger_key(file_hash)
+        if reenrich:
+            if table_cache.lookup(pdf_file, _template_crop(_statement_template(pdf_file)), file_hash) is None:
+                logger.info("Skipping %s: no cached tables to re-enrich", pdf_file.name)
+                skipped_files.append(pdf_file.name)
+                continue
+        elif ledger.is_ingested(key):
+            logger.info("Skipping %s: already ingested", pdf_file.name)
+            skipped_files.append(pdf_file.name)
+            continue
+        ledger_keys[pdf_file] = key
+        file_hashes[pdf_file] = file_hash
+        pdf_files.append(pdf_file)
+
+    transaction_store = store.open_store()
+    try:
+        with transaction_store.writer() as writer:
+            # parsing can run in worker processes, but only this (parent) process writes to the DB
+            for pdf_file, transactions, statement in iter_statement_results(pdf_files, monthly_output_dir, workers, file_hashes):
+                writer_seconds = writer.stats["seconds"]
+                delete_seconds = 0.0
+                try:
+                    doc_id = os.path.splitext(pdf_file.name)[0]
+                    started = time.perf_counter()
+                    transaction_store.delete_document(doc_id)  # rows from an earlier version of this statement
+                    delete_seconds = time.perf_counter() - started
+                    if parquet_export is not None:
+                        transactions = parquet_export.tee(transactions)
+                    transaction_count = writer.write_many(transactions)
+                    writer.flush()  # the ledger must only list statements that are fully written
+                    if parquet_export is not None:
+                        parquet_export.write(doc_id)
+                    ledger.record(ledger_keys[pdf_file], doc_id, pdf_file.name, transaction_count)
+                except Exception as e:
+                    logger.error("Failed to process %s: %s", pdf_file.name, e)
+                    statement.fail(str(e))
+                    # rows already flushed would stay in the DB (and the rollups) without a ledger entry
+                    writer.discard()
+                    try:
+                        transaction_store.delete_document(doc_id)
+                    except Exception as cleanup_error:
+                        logger.error("Could not remove the partial rows of %s: %s", pdf_file.name, cleanup_error)
+                statement.db_seconds = delete_seconds + writer.stats["seconds"] - writer_seconds
+                run_metrics.record(statement)
+            logger.info("DB write stats: %s", writer.stats)
+        cache = get_metadata_cache()
+        cache.save()
+        logger.info("Metadata cache stats: %s", cache.stats())
+        processing_stats = run_metrics.finish(skipped_files=skipped_files, db=writer.stats, metadata_cache=cache.stats())
+    finally:
+        ledger.close()
+        transaction_store.close()
+        db.close_client() # the ledger may use MongoDB even when the store does not
+    return processing_stats
+
+def iter_statement_results(pdf_files: List[Path], output_dir: str, workers: int = 1, file_hashes: Optional[Dict[Path, str]] = None):
+    """Yield (pdf_file, transactions, statement_metrics) for each file, in the order of pdf_files.
+
+    file_hashes maps files to their sha256 where it is already known, so they are not read again.
+
+    transactions is a lazy iterator, and statement_metrics is complete once it has been consumed.
+    With workers > 1 the files are parsed in a process pool and each worker streams its rows back
+    in chunks through a queue, so the writer gets a file's rows while the file is still being
+    parsed. At most 2 * workers files are in flight at a time. A worker that fails, crashes or
+    sends nothing for INGEST_FILE_TIMEOUT seconds while its file is being read makes its iterator
+    raise (the wait starts again after every chunk, so a long statement that keeps streaming rows
+    is not cut off). After
+    a crash or timeout the pool's processes are terminated (a hung worker would otherwise keep the
+    interpreter from exiting), and the other in-flight files are resubmitted to a fresh pool.
+    """
+    file_hashes = file_hashes or {}
+    if workers <= 1:
+        for pdf_file in pdf_files:
+            statement = metrics.StatementMetrics(pdf_file.name)
+            yield pdf_file, process_single_statement(pdf_file, output_dir, statement_metrics=statement, file_hash=file_hashes.get(pdf_file)), statement
+        return
+
+    manager = multiprocessing.Manager() # its queues can be passed to pool workers
+    pending = deque(pdf_files)
+    in_flight = deque()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker)
+    pool_failed = [False] # set by _stream_results when it gives up on a worker
+    try:
+        while pending or in_flight:
+            if pool_failed[0]:
+                pending.extendleft(reversed([queued_file for queued_file, _, _ in in_flight]))
+                in_flight.clear()
+                _terminate_pool(executor)
+                executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker)
+                pool_failed[0] = False
+            while pending and len(in_flight) < workers * 2:
+                pdf_file = pending.popleft()
+                results = manager.Queue()
+                in_flight.append((pdf_file, executor.submit(_process_statement_safely, pdf_file, output_dir, results, file_hashes.get(pdf_file)), results))
+
+            pdf_file, future, results = in_flight.popleft()
+            statement = metrics.StatementMetrics(pdf_file.name)
+            yield pdf_file, _stream_results(future, results, statement, pool_failed), statement
+        executor.shutdown()
+    finally:
+        _terminate_pool(executor)
+        manager.shutdown()
+
+def _stream_results(future, results, statement: metrics.StatementMetrics, pool_failed: List[bool]) -> Iterator[Transaction]:
+    """The transactions one pool worker sends through results; statement gets the worker's metrics at the end."""
+    timeout = env.INGEST_FILE_TIMEOUT
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
         try:
-            transactions = process_single_statement(pdf_file, monthly_output_dir)
-            db.insert_transactions_to_db(transactions)  # Insert transactions into MongoDB
-        except Exception as e:
-            print(f"Failed to process {pdf_file.name}: {str(e)}")
+            kind, payload = results.get(timeout=1.0)
+        except queue.Empty:
+            if future.done() and results.empty(): # the worker exited without its final message: it crashed
+                pool_failed[0] = True
+                error = future.exception()
+                raise RuntimeError(f"worker failed ({type(error).__name__}: {error})" if error else "worker exited early")
+            if deadline is not None and time.monotonic() > deadline:
+                pool_failed[0] = True
+                raise RuntimeError(f"worker failed (nothing received for INGEST_FILE_TIMEOUT={timeout}s)")
+            continue
+        if kind == "rows":
+            yield from payload
+            deadline = time.monotonic() + timeout if timeout else None # the worker is still making progress
             continue
+        statement.load(payload["statement"])
+        get_metadata_cache().merge(payload["metadata_cache"])
+        bank_structure.merge_template_changes(payload["bank_templates"])
+        if kind == "error":
+            raise RuntimeError(payload["error"])
+        return
+
+def _terminate_pool(executor: ProcessPoolExecutor):
+    processes = list((getattr(executor, "_processes", None) or {}).values()) # before shutdown drops them
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+def _init_pool_worker():
+    log.setup_worker_logging()
+    bank_structure.deferTemplateSaves = True # learned templates are sent back with the results
+
+def _process_statement_safely(pdf_file: Path, output_dir: str, results, file_hash: Optional[str] = None):
+    # runs inside the worker process: rows go to the parent through results in DB-batch sized
+    # chunks, and exceptions are sent instead of raised so one bad PDF is reported against its
+    # own file and does not affect the rest of the batch
+    # page_workers=1: the file pool already uses every core, don't fan out pages on top of it
+    statement = metrics.StatementMetrics(pdf_file.name)
+    cache = get_metadata_cache()
+    cache_mark = cache.mark()
+    try:
+        chunk = []
+        for transaction in process_single_statement(pdf_file, output_dir, page_workers=1, statement_metrics=statement, file_hash=file_hash):
+            chunk.append(transaction)
+            if len(chunk) >= env.DB_INSERT_BATCH_SIZE:
+                results.put(("rows", chunk))
+                chunk = []
+        if chunk:
+            results.put(("rows", chunk))
+        kind, error = "done", None
+    except Exception as e:
+        kind, error = "error", str(e)
+    # what the worker learned while parsing goes back with the file's last message
+    results.put((kind, {"error": error, "statement": statement.to_dict(), "metadata_cache": cache.changes_since(cache_mark),
+                        "bank_templates": bank_structure.take_template_changes()}))
+
+def process_single_statement(
+    pdf_path: Path,
+    output_dir: str,
+    page_workers: Optional[int] = None,
+    statement_metrics: Optional[metrics.StatementMetrics] = None,
+    file_hash: Optional[str] = None,
+) -> Iterator[Transaction]:
+    """Yield the transactions of one statement in page order.
 
-def process_single_statement(pdf_path: Path, output_dir: str) -> Dict[str, Any]:
-    print(f"Processing {pdf_path.name}...")
-    transactions = []
+    The header row is detected once and its column_map is used for every later row. With
+    page_workers > 1 page tables are extracted in a process pool, with at most 2 * page_workers
+    pages in flight; extracted tables are kept in the table cache so later runs skip pdfplumber.
+    Page times and row counts are recorded in statement_metrics. file_hash is the file's sha256,
+    if the caller has computed it already.
+    """
+    statement = statement_metrics or metrics.StatementMetrics(pdf_path.name)
+    metrics.set_current(statement)
     doc_id=os.path.splitext(pdf_path.name)[0]  # Extract document ID from filename
-    
+    started = time.perf_counter()
+    # row_index is the position of the row in the statement; it is part of the DB fingerprint
+    for row_index, transaction in enumerate(_iter_statement_transactions(pdf_path, doc_id, page_workers, file_hash)):
+        transaction.row_index = row_index
+        statement.counts["transactions"] = row_index + 1
+        statement.parse_seconds += time.perf_counter() - started # time spent by the consumer is not ours
+        yield transaction
+        started = time.perf_counter()
+    statement.parse_seconds += time.perf_counter() - started
+
+def _statement_bank(doc_id: str) -> Tuple[str, str]:
+    """(bank name, bank key) of a statement, from its document id."""
+    bank_name = get_bank_name(doc_id.split("_")[0]) # send only bank name part to get_bank_name function
+    return bank_name, bank_name.split(" ")[0].upper()
+
+def _statement_template(pdf_path: Path) -> Optional[Dict[str, Any]]:
+    if not env.BANK_TEMPLATES:
+        return None
+    return bank_structure.get_bank_template(_statement_bank(os.path.splitext(pdf_path.name)[0])[1])
+
+def _template_crop(template: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """The page region a learned template limits extraction to (None: whole pages)."""
+    return tuple(template["bbox"]) if template is not None else None
+
+def _iter_statement_transactions(pdf_path: Path, doc_id: str, page_workers: Optional[int] = None, file_hash: Optional[str] = None) -> Iterator[Transaction]:
+    logger.info("Processing %s...", pdf_path.name)
+    bank_name, bank_key = _statement_bank(doc_id)
+    bank_schema=bank_structure.get_bank_columns(bank_key)
+    header_index=bank_structure.get_header_index(bank_key)
+    if header_index is None:
+        logger.warning("No column structure for %s, skipping %s", bank_name, pdf_path.name)
+        return
+
+    template=_statement_template(pdf_path)
+    from_cache = [False] # set by _iter_statement_pages when the pages come from the table cache
+    rows=chain.from_iterable(_iter_statement_pages(pdf_path, page_workers, template, bank_key, from_cache, file_hash))
+    column_map=None
+    # header detection is sequential: scan rows until the header row shows up
+    for row in rows:
+        metrics.current().count("header_rows_scanned")
+        tmp_column_map=header_detection.detect_column_map(row,bank_schema,header_index)
+        if "date" in tmp_column_map and "description" in tmp_column_map:
+            column_map=tmp_column_map
+            logger.debug("%s: column map %s", pdf_path.name, column_map)
+            break
+    if column_map is None:
+        return
+    # learning opens the PDF with pdfplumber, which cached pages (e.g. --reenrich) are meant to avoid;
+    # the template is learned from the next statement of the bank that is extracted
+    if env.BANK_TEMPLATES and not from_cache[0] and bank_structure.get_bank_template(bank_key) is None:
+        _learn_bank_template(pdf_path, bank_key, column_map)
+    # the rest of the header page and every later page use the same column_map
+    for transaction in _enrich_rows(rows, doc_id, column_map):
+        transaction.bank_name = bank_name
+        yield transaction
+
+def _iter_statement_pages(
+    pdf_path: Path,
+    page_workers: Optional[int] = None,
+    template: Optional[Dict[str, Any]] = None,
+    bank_key: Optional[str] = None,
+    from_cache: Optional[List[bool]] = None,
+    file_hash: Optional[str] = None,
+) -> Iterator[List[List[str]]]:
+    """Yield the non-blank table rows of every page, in page order.
+
+    Pages come from the table cache when this file was extracted before with the same settings
+    and table region; otherwise they are extracted from the PDF and written to the cache on the
+    way through, keyed by the region the extraction ended up using.
+    """
+    if file_hash is None and table_cache.is_enabled():
+        file_hash = ingestion_ledger.file_sha256(pdf_path) # once for the lookup and the new entry's path
+    cached_path = table_cache.lookup(pdf_path, _template_crop(template), file_hash)
+    if from_cache is not None:
+        from_cache[0] = cached_path is not None
+    if cached_path is not None:
+        started = time.perf_counter()
+        for page_number, page_rows in enumerate(table_cache.read_pages(cached_path), 1):
+            metrics.current().page(page_number, time.perf_counter() - started, len(page_rows), source="cache")
+            yield page_rows
+            started = time.perf_counter()
+        return
+
+    writer = table_cache.PageWriter(table_cache.cache_path(pdf_path, file_hash=file_hash)) if table_cache.is_enabled() else None
+    complete = True
+    crop_used = [None] # set by _extract_statement_pages once it knows whether the template fits
+    try:
+        for page_rows in _extract_statement_pages(pdf_path, page_workers, template, bank_key, crop_used):
+            if page_rows is None: # extraction failed for this page
+                complete = False
+                page_rows = []
+            if writer is not None:
+                writer.write(page_rows)
+            yield page_rows
+    finally:
+        if writer is not None:
+            if complete:
+                writer.commit(table_cache.cache_path(pdf_path, crop_used[0], file_hash))
+            else:
+                writer.discard() # a page failed or the consumer stopped early: don't cache a partial file
+
+def _extract_statement_pages(
+    pdf_path: Path,
+    page_workers: Optional[int] = None,
+    template: Optional[Dict[str, Any]] = None,
+    bank_key: Optional[str] = None,
+    crop_used: Optional[List[Optional[tuple]]] = None,
+) -> Iterator[Optional[List[List[str]]]]:
+    import pdfplumber # imported when a PDF is first parsed: statements in the table cache never need it
+    page_workers = env.PAGE_WORKERS if page_workers is None else page_workers
+    crop = None
     with pdfplumber.open(pdf_path) as pdf:
+        page_count = len(pdf.pages)
+        checked_pages = []
+        if template is not None:
+            # with a learned template only the table region is extracted; the pages up to the header
+            # page are checked first, and the whole statement is re-detected if the layout has moved
+            crop = _template_crop(template)
+            if template["header_page"] < page_count:
+                checked_pages = [_timed_page_rows(pdf, i, pdf_path.name, crop) for i in range(template["header_page"] + 1)]
+            if not _template_matches(checked_pages, template, bank_key):
+                logger.warning("Bank template for %s does not fit %s, detecting the table again", bank_key, pdf_path.name)
+                bank_structure.set_bank_template(bank_key, None) # relearned from this statement
+                crop = None
+                checked_pages = []
+        if crop_used is not None:
+            crop_used[0] = crop
+        for page_index, (page_rows, seconds) in enumerate(checked_pages):
+            yield _record_page(page_index, page_rows, seconds)
+        start = len(checked_pages)
+        if page_workers <= 1 or page_count - start <= 1:
+            for page_index in range(start, page_count):
+                yield _record_page(page_index, *_timed_page_rows(pdf, page_index, pdf_path.name, crop))
+            return
 
-        bank_name = get_bank_name(doc_id.split("_")[0]) # send only bank name part to get_bank_name function
-        bank_schema=bank_structure.get_bank_columns(bank_name.split(" ")[0].upper())
-        column_map=None
-        for page in pdf.pages:
-            try:
-                tables = page.extract_tables()
-                if not tables:
-                    continue
-                
-                for table in tables:
-                     for row in table:
-                        try:
-                            if not row or all(not col or not col.strip() for col in row):
-                                continue
-
-                            if column_map is None:
-                                tmp_column_map=header_detection.detect_column_map(row,bank_schema)
-
-                                if "date" in tmp_column_map and "description" in tmp_column_map:
-                                    column_map=tmp_column_map
-                                    print(f"{column_map}")
-                                    continue  # Skip header row after mapping columns
-                                else:
-                                    continue
-                            # for testing purpose, remove later
-                            # continue
-
-                            # if datetime.strptime(row[column_map["date"]], "%d-%m-%Y"):#check for valid row
-                            transaction = process_transaction_row(row, doc_id, column_map)
-                            if transaction:
-                                transaction={"bank_name": bank_name, **transaction} # Add bank name to transaction at the beginning
-                                transactions.append(transaction)
-                        except (ValueError, IndexError, AttributeError) as e:
-                            print(f"Skipping malformed row: {row}. Error: {str(e)}")
-                            continue
-
-            except Exception as e:
-                print(f"Error processing page {page.page_number} in {pdf_path.name}: {str(e)}")
+    # pages are independent, so their tables can be extracted in parallel; results are yielded in page order
+    with ProcessPoolExecutor(max_workers=page_workers, initializer=_open_worker_pdf, initargs=(str(pdf_path),)) as executor:
+        pending = deque(range(start, page_count))
+        in_flight = deque()
+        while pending or in_flight:
+            while pending and len(in_flight) < page_workers * 2:
+                page_index = pending.popleft()
+                in_flight.append((page_index, executor.submit(_extract_worker_page_rows, page_index, pdf_path.name, crop)))
+            page_index, future = in_flight.popleft()
+            yield _record_page(page_index, *future.result())
+
+def _iter_page_rows(page, crop: Optional[tuple] = None) -> Iterator[List[str]]:
+    """Yield the non-blank table rows of a page, or of the crop region of it."""
+    if crop is not None:
+        x0, top, x1, bottom = page.bbox
+        page = page.within_bbox((max(crop[0], x0), max(crop[1], top), min(crop[2], x1), min(crop[3], bottom)))
+    for table in page.extract_tables(env.TABLE_SETTINGS):
+        for row in table:
+            if not row or all(not col or not col.strip() for col in row):
                 continue
-    # print(f"{json.dumps(transactions, indent=2)}")
-    return transactions
+            yield row
 
-def process_transaction_row(row: List[str], doc_id: str,col_map) -> Optional[Dict[str, Any]]:
+def _extract_page_rows(pdf, page_index: int, file_name: str, crop: Optional[tuple] = None) -> Optional[List[List[str]]]:
+    page = pdf.pages[page_index]
+    try:
+        return list(_iter_page_rows(page, crop))
+    except Exception as e:
+        logger.error("Error processing page %s in %s: %s", page.page_number, file_name, e)
+        return None
+    finally:
+        page.close() # drop pdfplumber's per-page object cache
+
+def _timed_page_rows(pdf, page_index: int, file_name: str, crop: Optional[tuple] = None):
+    """(rows, seconds) of one page; the time goes to the parent's metrics from page workers too."""
+    started = time.perf_counter()
+    page_rows = _extract_page_rows(pdf, page_index, file_name, crop)
+    return page_rows, time.perf_counter() - started
+
+def _record_page(page_index: int, page_rows: Optional[List[List[str]]], seconds: float) -> Optional[List[List[str]]]:
+    metrics.current().page(page_index + 1, seconds, len(page_rows) if page_rows is not None else None)
+    return page_rows
+
+def _template_matches(pages: List[tuple], template: Dict[str, Any], bank_key: str) -> bool:
+    """True if the cropped pages contain a header row giving the template's column map."""
+    header_index = bank_structure.get_header_index(bank_key)
+    for page_rows, _ in pages:
+        for row in page_rows or []:
+            if header_detection.detect_column_map(row, None, header_index) == template["column_map"]:
+                return True
+    return False
+
+def _learn_bank_template(pdf_path: Path, bank_key: str, column_map: Dict[str, int]) -> None:
+    """Store the column map and table region of a statement parsed with full header detection."""
+    import pdfplumber
+    header_index = bank_structure.get_header_index(bank_key)
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_index, page in enumerate(pdf.pages):
+                tables = page.find_tables(env.TABLE_SETTINGS)
+                if not any(header_detection.detect_column_map(row, None, header_index) == column_map
+                           for table in tables for row in table.extract()):
+                    continue
+                # the header page and the page after it cover both the first and the continuation layout
+                boxes = [table.bbox for table in tables]
+                if page_index + 1 < len(pdf.pages):
+                    boxes += [table.bbox for table in pdf.pages[page_index + 1].find_tables(env.TABLE_SETTINGS)]
+                # how far down the table runs depends on the number of transactions, so the region
+                # keeps the table's left, top and right edges and runs to the bottom of the page
+                pad = 2 # keep ruling lines on the region border
+                bbox = [
+                    min(box[0] for box in boxes) - pad, min(box[1] for box in boxes) - pad,
+                    max(box[2] for box in boxes) + pad, float(page.bbox[3]),
+                ]
+                bank_structure.set_bank_template(bank_key, {
+                    "column_map": column_map,
+                    "header_page": page_index,
+                    "bbox": bbox,
+                    "learned_from": pdf_path.name,
+                })
+                logger.info("Learned table template for %s from %s", bank_key, pdf_path.name)
+                return
+    except Exception as e:
+        logger.warning("Could not learn table template for %s from %s: %s", bank_key, pdf_path.name, e)
+
+def _enrich_rows(rows, doc_id: str, column_map) -> Iterator[Transaction]:
+    """Turn raw table rows into transactions, row by row or in vectorized batches."""
+    statement = metrics.current()
+    if env.VECTORIZED_ENRICHMENT:
+        from src import batch_enrichment # pandas is imported with the first statement, not with the module
+        for batch in _batched(rows, env.ENRICHMENT_BATCH_ROWS):
+            statement.count("rows_enriched", len(batch))
+            yield from batch_enrichment.enrich_rows(batch, doc_id, column_map, env.DATE_FORMAT_LIST, derive_description_metadata)
+        return
+
+    for row in rows:
+        statement.count("rows_enriched")
+        try:
+            # if datetime.strptime(row[column_map["date"]], "%d-%m-%Y"):#check for valid row
+            transaction = process_transaction_row(row, doc_id, column_map)
+            if transaction:
+                yield transaction
+        except (ValueError, IndexError, AttributeError) as e:
+            statement.row_error(e, row)
+            continue
+
+def _batched(items, batch_size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+#region page worker
+# each page worker opens the PDF once and keeps it for all the pages it is given
+_worker_pdf = None
+
+def _open_worker_pdf(pdf_path: str):
+    global _worker_pdf
+    import pdfplumber
+    log.setup_worker_logging()
+    _worker_pdf = pdfplumber.open(pdf_path)
+
+def _extract_worker_page_rows(page_index: int, file_name: str, crop: Optional[tuple] = None):
+    return _timed_page_rows(_worker_pdf, page_index, file_name, crop)
+#endregion
+
+def process_transaction_row(row: List[str], doc_id: str,col_map) -> Optional[Transaction]:
     transaction=None
     try:
         # Clean and convert date
@@ -127,54 +550,65 @@ def process_transaction_row(row: List[str], doc_id: str,col_map) -> Optional[Dic
             description=description,
             debit=debit,
             credit=credit,
+        )
+        
+        transaction = Transaction(
+            document_id=doc_id,
             date=formatted_date,
+            month_year=month_year,
+            quarter=quarter,
             day_of_week=day_of_week,
-            is_weekend=is_weekend
+            is_weekend=is_weekend,
+            description=description,
+            debit=debit,
+            credit=credit,
+            balance=balance,
+            **metadata,
         )
-        
-        transaction = {
-            "document_id": doc_id,
-            "date": formatted_date,
-            "month_year": month_year,
-            "quarter": quarter,
-            "day_of_week": day_of_week,
-            "is_weekend": is_weekend,
-            "description": description,
-            "debit": debit,
-            "credit": credit,
-            "balance": balance,
-            **metadata,  # Flatten metadata into main transaction dict
-        }
     except Exception as e:
-        print(f"Error processing transaction row: {str(e)}")
-        print(f"ROW: {row}")
+        metrics.current().row_error(e, row) # counted and sampled, logged once per statement
         
     return transaction
 
+_metadata_cache = None
+
+def get_metadata_cache() -> metadata_cache.MetadataCache:
+    # created on first use; in pool mode every worker process has its own in-memory copy, and the
+    # parent merges what each worker added (see _process_statement_safely) before saving it
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = metadata_cache.MetadataCache(env.METADATA_CACHE_SIZE, env.METADATA_CACHE_FILE)
+    return _metadata_cache
+
+def derive_description_metadata(description_upper: str):
+    """(bank_details, payment_method, transaction_category, is_recurring) for an upper-cased description."""
+    # these repeat month after month for the same merchants, so they are cached
+    cache = get_metadata_cache()
+    derived = cache.get(description_upper)
+    if derived is None:
+        derived = (
+            extract_bank_details(description_upper),
+            extract_payment_method(description_upper),
+            categorize_transaction(description_upper),
+            is_recurring_payment(description_upper),
+        )
+        cache.put(description_upper, derived)
+    return derived # the bank details dict is shared with the cache; Transaction.to_dict copies it
+
 def extract_comprehensive_metadata(
     description: str,
     debit: float,
     credit: float,
-    date: str,
-    day_of_week: str,
-    is_weekend: bool,
 ) -> Dict[str, Any]:
-    description_upper = description.upper()
-    bank_details = extract_bank_details(description_upper)
-    payment_method = extract_payment_method(description_upper)
-    transaction_category = categorize_transaction(description_upper)
+    bank_details, payment_method, transaction_category, is_recurring = derive_description_metadata(description.upper())
     is_debit = debit > 0
     is_credit = credit > 0
     amount_range = categorize_amount_range(debit if is_debit else credit)
-    is_recurring = is_recurring_payment(description_upper)
     metadata = {
         "payment_method": payment_method,
         "transaction_category": transaction_category,
         "is_debit": is_debit,
         "is_credit": is_credit,
-        "date": date,
-        "day_of_week": day_of_week,
-        "is_weekend": is_weekend,
         "amount_range": amount_range,
         "is_recurring": is_recurring,
         "recipient_bank_details": bank_details,
@@ -193,7 +627,7 @@ def extract_bank_details(description: str) -> Optional[Dict[str, str]]:
             
             transaction_id = upi_parts[2] if len(upi_parts) > 2 else ""
             recepient_name = upi_parts[3] if len(upi_parts) > 3 else ""
-            recipient_type = "PERSONAL" if any(x in recepient_name.upper() for x in env.PERSONAL_TYPE_LIST) else getRecipientType(target_identifier)
+            recipient_type = "PERSONAL" if keyword_matcher.contains_any(get_matchers().personal_type, recepient_name.upper()) else getRecipientType(target_identifier)
             bank_name = upi_parts[5] if len(upi_parts) > 5 else ""
 
             return {
@@ -264,7 +698,7 @@ def extract_bank_details(description: str) -> Optional[Dict[str, str]]:
     return None
 
 def getRecipientType(target_identifier):
-    if target_identifier.startswith("P2P") or any(x in target_identifier for x in env.PERSONAL_TYPE_LIST): # P2P - person to person
+    if target_identifier.startswith("P2P") or keyword_matcher.contains_any(get_matchers().personal_type, target_identifier): # P2P - person to person
         recipient_type = "PERSONAL"
     elif target_identifier.startswith(("P2M", "P2A")): # P2A- person to account, P2M - person to merchant
         recipient_type = "MERCHANT"
@@ -315,53 +749,55 @@ def extract_payment_method(description: str) -> str:
 
 # for now generalize the utility under utlity bills, categorize it later manually/or in future in DB
 #endregion
+
+#region compiled keyword matchers
+def build_category_matcher() -> keyword_matcher.CategoryMatcher:
+    # (category, contains keywords, startswith keywords) in priority order; the first matching rule wins
+    return keyword_matcher.CategoryMatcher([
+        ("FOOD_DELIVERY", env.FOOD_DELIVERY_LIST, []),
+        ("GROCERY", env.GROCERY_LIST, []),
+        ("SHOPPING", env.SHOPPING_LIST, []),
+        ("TRANSPORT", env.TRANSPORT_LIST, []),
+        ("HEALTHCARE", env.HEALTHCARE_LIST, []),
+        ("RESTAURANTS", env.RESTAURANTS_LIST, []),
+        ("FRUITS_VEGETABLES", env.FRUITS_VEGETABLES_FISH_LIST, []),
+        ("INTEREST_INCOME", env.INTEREST_INCOME_LIST, []),
+        ("RENT", env.RENT_LIST, []),
+        ("SALARY", ["SALARY"], []),
+        ("RECHARGE", env.CARRIER_LIST, []),
+        ("LOAN_PAYMENT", env.SPECIAL_EMI_LIST, env.EMI_LIST),
+        ("CREDIT_CARD_PAYMENT", env.CREDIT_CARD_PAYMENT_LIST, []),
+        ("SUBSCRIPTION_SERVICES", env.SUBSCRIPTION_SERVICES_LIST, []),
+        ("UTILITY_BILLS", env.UTILITY_BILLS_LIST, []),
+        ("FOODS_DRINKS", env.FOODS_DRINKS_LIST, []),
+        ("ENTERTAINMENT", env.ENTERTAINMENT_LIST, []),
+        ("EDUCATION", env.EDUCATION_LIST, []),
+        # check for PERSONAL_TYPE_LIST last
+        ("PERSONAL", env.PERSONAL_TYPE_LIST, []),
+    ], default="OTHER")
+
+class Matchers(NamedTuple):
+    category: keyword_matcher.CategoryMatcher
+    recurring: Optional[re.Pattern]
+    personal_type: Optional[re.Pattern]
+
+_matchers = None
+
+def get_matchers() -> Matchers:
+    # compiled on first use rather than at import, so importing the module doesn't read the settings
+    global _matchers
+    if _matchers is None:
+        _matchers = Matchers(
+            build_category_matcher(),
+            keyword_matcher.compile_keywords(env.RECURRING_PAYMENTS_LIST),
+            keyword_matcher.compile_keywords(env.PERSONAL_TYPE_LIST),
+        )
+    return _matchers
+#endregion
+
 def categorize_transaction(description: str)-> str:
     """Categorize transaction based on description keywords."""
-    # print(f"Categorizing transaction: {description}")
-    description=description.upper()
-    # check for PERSONAL_TYPE_LIST first 
-    # if any(x in description for x in PERSONAL_TYPE_LIST):
-    #     return "PERSONAL"
-    if any(x in description for x in env.FOOD_DELIVERY_LIST):
-        return "FOOD_DELIVERY"
-    elif any(x in description for x in env.GROCERY_LIST):
-        return "GROCERY"
-    elif any(x in description for x in env.SHOPPING_LIST):
-        return "SHOPPING"
-    elif any(x in description for x in env.TRANSPORT_LIST):
-        return "TRANSPORT"
-    elif any(x in description for x in env.HEALTHCARE_LIST):
-        return "HEALTHCARE"
-    elif any(x in description for x in env.RESTAURANTS_LIST):
-        return "RESTAURANTS"
-    elif any(x in description for x in env.FRUITS_VEGETABLES_FISH_LIST):
-        return "FRUITS_VEGETABLES"
-    elif any(x in description for x in env.INTEREST_INCOME_LIST):
-        return "INTEREST_INCOME"
-    elif any (x in description for x in env.RENT_LIST):
-        return "RENT"
-    elif any (x in description for x in ['SALARY']):
-        return "SALARY"
-    elif any (x in description for x in env.CARRIER_LIST):
-        return "RECHARGE"
-    elif any(description.startswith(x) for x in env.EMI_LIST) or any(x in description for x in env.SPECIAL_EMI_LIST):
-        return "LOAN_PAYMENT"
-    elif any (x in description for x in env.CREDIT_CARD_PAYMENT_LIST):
-        return "CREDIT_CARD_PAYMENT"
-    elif any (x in description for x in env.SUBSCRIPTION_SERVICES_LIST):
-        return "SUBSCRIPTION_SERVICES"
-    elif any (x in description for x in env.UTILITY_BILLS_LIST):
-        return "UTILITY_BILLS"
-    elif any (x in description for x in env.FOODS_DRINKS_LIST):
-        return "FOODS_DRINKS"
-    elif any (x in description for x in env.ENTERTAINMENT_LIST):
-        return "ENTERTAINMENT"
-    elif any (x in description for x in env.EDUCATION_LIST):
-        return "EDUCATION"
-    if any(x in description for x in env.PERSONAL_TYPE_LIST):
-        return "PERSONAL"
-    else:
-        return "OTHER"
+    return get_matchers().category.match(description.upper())
 
 def categorize_amount_range(amount:float) -> str:
     if amount < 100:
@@ -374,10 +810,7 @@ def categorize_amount_range(amount:float) -> str:
         return "VERY_LARGE"
 
 def is_recurring_payment(description: str) -> bool:
-    description=description.upper()
-    if any (x in description for x in env.RECURRING_PAYMENTS_LIST):
-        return True
-    return False
+    return keyword_matcher.contains_any(get_matchers().recurring, description.upper())
 
 def get_bank_name(_tmpdoc_id: str) -> str:
     bank_name = "UnknownBank"
@@ -386,10 +819,16 @@ def get_bank_name(_tmpdoc_id: str) -> str:
             bank_name = bank.title().upper() + " BANK"
     return bank_name
 
-def startorchestrator() -> Dict[str, Any]:
-    print("PDF Orchestrator initialized")
-    result = process_all_statements()
-    print("PDF Orchestrator completed processing all statements.")
+def startorchestrator(
+    workers: Optional[int] = None,
+    force_document_ids: Optional[List[str]] = None,
+    reenrich: bool = False,
+    metrics_sinks: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """Run the orchestrator and return its run report (see metrics.RunMetrics.finish)."""
+    logger.info("PDF Orchestrator initialized")
+    result = process_all_statements(workers=workers, force_document_ids=force_document_ids, reenrich=reenrich, metrics_sinks=metrics_sinks)
+    logger.info("PDF Orchestrator completed processing all statements.")
     return result
 
 # if __name__ == "__main__":
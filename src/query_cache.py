@@ -0,0 +1,227 @@
+import calendar
+import copy
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from src import env, log
+
+logger = log.get_logger("query_cache")
+
+# Cache of question -> validated MongoDB query for generate_mongo_query, so a repeated question
+# does not wait on the LLM again. Questions are normalized before lookup, and a second entry is
+# kept per question "shape" with its months and years replaced by placeholders: "grocery spend
+# in may 2025" can then reuse the query cached for "grocery spend in april 2025", with the dates
+# in it moved from April to May. Questions with relative dates ("last month", "yesterday") are
+# never cached: the LLM resolves them to the dates of the day they were asked.
+
+MONTHS = {name: number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+MONTHS = {name.lower(): number for name, number in MONTHS.items()}
+MONTHS["sept"] = 9
+
+_MONTH_PATTERN = "|".join(sorted(MONTHS, key=len, reverse=True))
+# a month with an optional year, or a year on its own
+_DATE_TOKEN = re.compile(rf"\b(?:({_MONTH_PATTERN})\b(?:\s+((?:19|20)\d\d))?|((?:19|20)\d\d))\b")
+# "may" is a month only before a number or after a preposition
+_MAY_AS_MONTH = re.compile(r"\b(?:in|of|for|during|since|until|from|to|till|between|and)\s+$")
+_DATE_VALUE = re.compile(r"^((?:19|20)\d\d)-(\d\d)(?:-(\d\d))?")
+_RELATIVE_DATE = re.compile(
+    r"\b(?:today|tonight|yesterday|tomorrow|recent|recently|ago|so far|to date|till date|ytd|mtd"
+    r"|(?:this|last|past|previous|next|current|coming)\s+(?:\d+\s+)?(?:days?|weeks?|weekend|months?|quarters?|years?|fortnight))\b"
+)
+
+Params = List[Tuple[Optional[int], Optional[int]]] # (month, year) per date token of a question
+
+def normalize_question(question: str) -> str:
+    text = question.lower().replace("’", "'")
+    text = re.sub(r"[^\w\s'-]", " ", text)
+    return " ".join(text.split())
+
+def is_relative(normalized: str) -> bool:
+    """Whether a normalized question has dates relative to when it is asked, which a cached query would freeze."""
+    return _RELATIVE_DATE.search(normalized) is not None
+
+def parameterize(normalized: str) -> Tuple[str, Params]:
+    """The question with its months and years replaced by placeholders, plus the (month, year) values taken out."""
+    params: Params = []
+    parts = []
+    position = 0
+    for match in _DATE_TOKEN.finditer(normalized):
+        month_name, month_year, year = match.groups()
+        if month_name == "may" and not month_year and not _MAY_AS_MONTH.search(normalized[:match.start()]) \
+                and not re.match(r"\s+\d", normalized[match.end():]):
+            continue
+        parts.append(normalized[position:match.start()])
+        if month_name:
+            params.append((MONTHS[month_name], int(month_year) if month_year else None))
+            parts.append("{month} {year}" if month_year else "{month}")
+        else:
+            params.append((None, int(year)))
+            parts.append("{year}")
+        position = match.end()
+    parts.append(normalized[position:])
+    return "".join(parts), params
+
+def _shift_date(value: str, old_params: Params, new_params: Params) -> Tuple[str, List[int]]:
+    """value with the month/year of every matching old param replaced by the new one, and the matched params."""
+    match = _DATE_VALUE.match(value)
+    if not match:
+        return value, []
+    old_year, old_month = int(match.group(1)), int(match.group(2))
+    year, month = old_year, old_month
+    matched = []
+    for index, ((param_month, param_year), (new_month, new_year)) in enumerate(zip(old_params, new_params)):
+        if (param_month is not None and old_month != param_month) or (param_year is not None and old_year != param_year):
+            continue
+        matched.append(index)
+        year = new_year if new_year is not None else year
+        month = new_month if new_month is not None else month
+    if not matched:
+        return value, []
+    shifted = f"{year:04d}-{month:02d}"
+    if match.group(3):
+        day = int(match.group(3))
+        last_day = calendar.monthrange(year, month)[1]
+        if day >= calendar.monthrange(old_year, old_month)[1] or day > last_day: # end of month stays end of month
+            day = last_day
+        shifted += f"-{day:02d}"
+    return shifted + value[match.end():], matched
+
+def substitute_dates(query: Any, old_params: Params, new_params: Params) -> Optional[Any]:
+    """The cached query of one question applied to another question of the same shape.
+
+    None when a date of the old question does not appear in the query: the query was then not
+    derived from that date, so there is nothing safe to substitute.
+    """
+    used = set()
+
+    def visit(value):
+        if isinstance(value, dict):
+            return {key: visit(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [visit(item) for item in value]
+        if isinstance(value, str):
+            value, matched = _shift_date(value, old_params, new_params)
+            used.update(matched)
+        return value
+
+    substituted = visit(query)
+    return substituted if len(used) == len(old_params) else None
+
+class QueryCache:
+    """LRU cache with a TTL of normalized question -> MongoDB query, optionally persisted to a JSON file."""
+
+    def __init__(self, max_size: int, ttl: float, path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl # seconds, 0 = entries never expire
+        self.path = path
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.template_hits = 0
+        self.misses = 0
+        self.skipped = 0 # relative-date questions, never looked up or stored
+        if path:
+            self.load()
+
+    def _expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return bool(self.ttl) and now - entry["created"] > self.ttl
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, time.time()):
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def get(self, question: str, model: str):
+        normalized = normalize_question(question)
+        if is_relative(normalized):
+            self.skipped += 1
+            return None
+        entry = self._lookup(f"q|{model}|{normalized}")
+        if entry is not None:
+            self.hits += 1
+            return copy.deepcopy(entry["query"])
+        template, params = parameterize(normalized)
+        if params:
+            entry = self._lookup(f"t|{model}|{template}")
+            if entry is not None:
+                query = substitute_dates(entry["query"], entry["params"], params)
+                if query is not None:
+                    self.template_hits += 1
+                    return query
+        self.misses += 1
+        return None
+
+    def put(self, question: str, model: str, query: Any):
+        normalized = normalize_question(question)
+        if is_relative(normalized):
+            return
+        now = time.time()
+        query = copy.deepcopy(query)
+        self._store(f"q|{model}|{normalized}", {"query": query, "created": now})
+        template, params = parameterize(normalized)
+        if params:
+            self._store(f"t|{model}|{template}", {"query": query, "params": params, "created": now})
+        self.save()
+
+    def _store(self, key: str, entry: Dict[str, Any]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.template_hits + self.misses
+        return {
+            "hits": self.hits,
+            "template_hits": self.template_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": round((self.hits + self.template_hits) / lookups, 4) if lookups else 0.0,
+            "size": len(self.entries),
+        }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as file:
+                entries = json.load(file).get("entries", [])
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable query cache %s: %s", self.path, e)
+            return
+        now = time.time()
+        for key, entry in entries[-self.max_size:]:
+            if not self._expired(entry, now):
+                if "params" in entry:
+                    entry["params"] = [tuple(param) for param in entry["params"]]
+                self.entries[key] = entry
+
+    def save(self):
+        if not self.path:
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"entries": list(self.entries.items())}, file)
+        os.replace(tmp_path, self.path)
+
+_query_cache: Optional[QueryCache] = None
+
+def get_query_cache() -> Optional[QueryCache]:
+    """The process-wide query cache, or None when QUERY_CACHE is off."""
+    global _query_cache
+    if not env.QUERY_CACHE:
+        return None
+    if _query_cache is None:
+        path = env.QUERY_CACHE_FILE or os.path.join(env.OUTPUT_JSON_DIR or ".", "query_cache.json")
+        _query_cache = QueryCache(env.QUERY_CACHE_SIZE, env.QUERY_CACHE_TTL, path)
+    return _query_cache
@@ -1,14 +1,8 @@
-import msal
 import requests
 import os
 import base64
 from dotenv import load_dotenv
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google.auth.exceptions import RefreshError  # added to catch expired/revoked tokens
+# msal and the Google client libraries are imported when their provider is first used
 
 # Load environment variables
 load_dotenv()
@@ -17,14 +11,14 @@ load_dotenv()
 CLIENT_ID = os.getenv("CLIENT_ID")
 AUTHORITY = os.getenv("AUTHORITY")
 SCOPES = os.getenv("SCOPES", "Mail.Read,User.Read").split(",")
-SENDER_EMAIL = os.getenv("SENDER_EMAIL").split(",")
+SENDER_EMAIL = (os.getenv("SENDER_EMAIL") or "").split(",")
 DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR", "../attachments/locked")
 
 GMAIL_CREDENTIALS = os.getenv("GMAIL_CREDENTIALS")
 GMAIL_TOKEN = os.getenv("GMAIL_TOKEN")
-GMAIL_SCOPES = os.getenv("GMAIL_SCOPES").split(",")
-BANK_NAME = os.getenv("BANK_NAME").lower()
-SUBJECT_QUERY = os.getenv("SUBJECT_QUERY").split(",")
+GMAIL_SCOPES = (os.getenv("GMAIL_SCOPES") or "").split(",")
+BANK_NAME = (os.getenv("BANK_NAME") or "").lower()
+SUBJECT_QUERY = (os.getenv("SUBJECT_QUERY") or "").split(",")
 CACHE_FILE = os.getenv("CACHE_FILE", "token_cache.bin")
 
 # below env are only for privacy
@@ -32,18 +26,24 @@ bank1 = os.getenv("bank1")
 bank2 = os.getenv("bank2")
 bank3 = os.getenv("bank3")
 
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-
 # ---------- Token Cache & Auth (Graph / Outlook) ----------
-cache = msal.SerializableTokenCache()
-if os.path.exists(CACHE_FILE):
-    cache.deserialize(open(CACHE_FILE, "r").read())
-
-app = msal.PublicClientApplication(
-    client_id=CLIENT_ID,
-    authority=AUTHORITY,
-    token_cache=cache
-)
+cache = None
+app = None
+
+def get_graph_app():
+    """The MSAL app with its token cache loaded from CACHE_FILE, created on first use."""
+    global cache, app
+    if app is None:
+        import msal
+        cache = msal.SerializableTokenCache()
+        if os.path.exists(CACHE_FILE):
+            cache.deserialize(open(CACHE_FILE, "r").read())
+        app = msal.PublicClientApplication(
+            client_id=CLIENT_ID,
+            authority=AUTHORITY,
+            token_cache=cache
+        )
+    return app
 
 # Helper: save bytes to file (ensures safe filename)
 def _save_bytes_to_file(banker, filename, content_bytes):
@@ -63,6 +63,7 @@ def _save_bytes_to_file(banker, filename, content_bytes):
 # --- OUTLOOK / MICROSOFT GRAPH (Outlook) helpers ---
 # These functions use Microsoft Graph (Outlook) APIs to list messages and download attachments.
 def _get_graph_headers():
+    app = get_graph_app()
     accounts = app.get_accounts()
     if accounts:
         result = app.acquire_token_silent(SCOPES, account=accounts[0])
@@ -131,6 +132,11 @@ def download_attachments_graph(banker, messages, headers=None):
 # --- GMAIL / GOOGLE MAIL helpers ---
 # These functions use the Gmail API to authenticate, list messages and download attachments.
 def get_gmail_service():
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    from google.auth.exceptions import RefreshError  # added to catch expired/revoked tokens
 
     creds = None
     if os.path.exists(GMAIL_TOKEN):
@@ -207,6 +213,7 @@ def download_attachments_gmail(banker, service, messages):
 # ---------- Orchestration based on MAIL_PROVIDER ----------
 def main():
     print(f"Downloading for : {BANK_NAME}")
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
     # Outlook (Microsoft Graph) for bank1
     if BANK_NAME in (bank1, "all"):
         # Provider: Outlook / Microsoft Graph
@@ -0,0 +1,238 @@
+import re
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence
+from src import env
+from src.store import TransactionStore, transaction_fingerprint
+from src.transaction import to_document
+
+try:
+    import duckdb
+except ImportError:  # optional: the embedded store falls back to sqlite3
+    duckdb = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: DuckDB then reads inserted batches from a DataFrame
+    pa = None
+
+if TYPE_CHECKING: # pandas is imported by the first query (or DataFrame insert), not with the module
+    import pandas as pd
+
+# Embedded transactions store (DuckDB or SQLite, one file, no server). Transactions are stored
+# flat in one "transactions" table: recipient_bank_details becomes recipient_* columns so that
+# SQL (including LLM-generated SQL) can filter and group on them without JSON functions.
+# Writes are idempotent like the MongoDB writer: INSERT OR IGNORE on the row fingerprint.
+
+TABLE = "transactions"
+
+RECIPIENT_COLUMNS = {
+    "source": "recipient_source", "sendTo": "recipient_send_to", "transaction_id": "recipient_transaction_id",
+    "recipient_name": "recipient_name", "bank_name": "recipient_bank_name", "banking_type": "recipient_banking_type",
+    "ATM_Name": "recipient_atm_name", "Terminal_id": "recipient_terminal_id", "Reference_id": "recipient_reference_id",
+    "Location": "recipient_location", "bank": "recipient_bank", "cheque_number": "recipient_cheque_number",
+}
+
+# (column, type); date is a DATE in DuckDB and "YYYY-MM-DD" text in SQLite
+COLUMNS = [
+    ("fingerprint", "TEXT"), ("bank_name", "TEXT"), ("document_id", "TEXT"), ("row_index", "INTEGER"),
+    ("date", "DATE"), ("month_year", "TEXT"), ("quarter", "TEXT"), ("day_of_week", "TEXT"), ("is_weekend", "BOOLEAN"),
+    ("description", "TEXT"), ("debit", "DOUBLE"), ("credit", "DOUBLE"), ("balance", "DOUBLE"),
+    ("payment_method", "TEXT"), ("transaction_category", "TEXT"), ("is_debit", "BOOLEAN"), ("is_credit", "BOOLEAN"),
+    ("amount_range", "TEXT"), ("is_recurring", "BOOLEAN"),
+] + [(column, "TEXT") for column in RECIPIENT_COLUMNS.values()]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+BOOLEAN_COLUMNS = [name for name, kind in COLUMNS if kind == "BOOLEAN"]
+TRANSACTION_COLUMNS = COLUMN_NAMES[1:len(COLUMN_NAMES) - len(RECIPIENT_COLUMNS)] # read from the transaction itself
+AMOUNT_POSITIONS = [COLUMN_NAMES.index(name) for name, kind in COLUMNS if kind == "DOUBLE"]
+
+# SQLite needs indexes for the usual filters; DuckDB scans columns and its indexes only slow inserts down
+SQLITE_INDEXES = [
+    ("document_id",), ("date",), ("month_year", "transaction_category"), ("is_debit", "date"), ("recipient_name",),
+]
+
+CUBE_SQL = """
+    SELECT substr(CAST(date AS VARCHAR), 1, 7) AS period, month_year, transaction_category, is_debit, is_credit,
+           day_of_week, is_weekend,
+           COALESCE(SUM(debit), 0) AS debit_sum, COUNT(debit) AS debit_count, MAX(debit) AS debit_max,
+           COALESCE(SUM(credit), 0) AS credit_sum, COUNT(credit) AS credit_count, MAX(credit) AS credit_max,
+           COUNT(date) AS "rows", COUNT(*) AS "size"
+    FROM transactions{where}
+    GROUP BY 1, 2, 3, 4, 5, 6, 7
+"""
+
+_WRITE_KEYWORDS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|DROP|ALTER|CREATE|REPLACE|TRUNCATE|ATTACH|DETACH|COPY|PRAGMA|INSTALL|LOAD|EXPORT|IMPORT|CALL|SET|VACUUM|CHECKPOINT)\b",
+    re.IGNORECASE,
+)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+def is_read_only_sql(sql) -> bool:
+    """Whether sql is a single SELECT (or WITH ... SELECT) statement that can't change the database."""
+    if not isinstance(sql, str):
+        return False
+    statement = _STRING_LITERAL.sub("''", sql).strip().rstrip(";").strip()
+    if ";" in statement or not re.match(r"(SELECT|WITH)\b", statement, re.IGNORECASE):
+        return False
+    return _WRITE_KEYWORDS.search(statement) is None
+
+def sql_row(transaction: Dict[str, Any], fingerprint: str) -> tuple:
+    """A transaction as the orchestrator yields it, in COLUMNS order with recipient details flattened."""
+    details = transaction.get("recipient_bank_details") or {}
+    row = [fingerprint, *map(transaction.get, TRANSACTION_COLUMNS), *map(details.get, RECIPIENT_COLUMNS)]
+    for position in AMOUNT_POSITIONS: # NaN amounts are stored as NULL, so SQL aggregates skip them like pandas does
+        if row[position] != row[position]:
+            row[position] = None
+    return tuple(row)
+
+def python_bools(values: "pd.Series") -> "pd.Series":
+    """True/False/None objects from DuckDB booleans or SQLite 0/1 integers, as in documents from MongoDB."""
+    flags = values.astype("boolean")
+    return flags.astype(object).where(flags.notna(), None)
+
+def to_document_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Query results with the recipient_* columns renamed to the recipient_bank_details.<key> names
+    the analyzers read (as in the Parquet export), and booleans as Python bools."""
+    df = df.rename(columns={column: f"recipient_bank_details.{key}" for key, column in RECIPIENT_COLUMNS.items()})
+    for column in df.columns.intersection(BOOLEAN_COLUMNS):
+        df[column] = python_bools(df[column])
+    return df
+
+class SqlStore(TransactionStore):
+    """Transactions in an embedded DuckDB or SQLite file."""
+
+    def __init__(self, path: str, dialect: str = "duckdb", read_only: bool = False):
+        self.path = path
+        self.name = dialect
+        if dialect == "duckdb":
+            if duckdb is None:
+                raise ImportError("the duckdb store needs duckdb (pip install duckdb)")
+            self.connection = duckdb.connect(path, read_only=read_only)
+        else:
+            uri = f"file:{path}?mode=ro" if read_only else f"file:{path}"
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False) # query_batch reads from worker threads
+        if not read_only:
+            self.ensure_schema()
+
+    def ensure_schema(self):
+        date_type = "DATE" if self.name == "duckdb" else "TEXT"
+        columns = ", ".join(
+            f"{name} {date_type if name == 'date' else kind}{' PRIMARY KEY' if name == 'fingerprint' else ''}" for name, kind in COLUMNS
+        )
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} ({columns})")
+        if self.name == "sqlite":
+            for fields in SQLITE_INDEXES:
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_{'_'.join(fields)} ON {TABLE} ({', '.join(fields)})")
+            self.connection.commit()
+
+    def writer(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        return SqlTransactionWriter(self, batch_size, flush_interval)
+
+    def insert_rows(self, rows: List[tuple]) -> int:
+        """INSERT OR IGNORE rows (tuples in COLUMNS order); returns how many were new."""
+        columns = ", ".join(COLUMN_NAMES)
+        if self.name == "duckdb":
+            # a registered batch is inserted in one vectorized statement, executemany goes row by row;
+            # DuckDB scans an Arrow table faster than a DataFrame of object columns
+            if pa is not None:
+                incoming = pa.Table.from_arrays([pa.array(column) for column in zip(*rows)], names=COLUMN_NAMES)
+            else:
+                import pandas as pd
+                incoming = pd.DataFrame.from_records(rows, columns=COLUMN_NAMES)
+            self.connection.register("incoming", incoming)
+            try:
+                return self.connection.execute(f"INSERT OR IGNORE INTO {TABLE} ({columns}) SELECT {columns} FROM incoming").fetchone()[0]
+            finally:
+                self.connection.unregister("incoming")
+        before = self.connection.total_changes
+        self.connection.executemany(
+            f"INSERT OR IGNORE INTO {TABLE} ({columns}) VALUES ({', '.join('?' * len(COLUMN_NAMES))})", rows
+        )
+        self.connection.commit()
+        return self.connection.total_changes - before
+
+    def delete_document(self, document_id: str) -> int:
+        if self.name == "duckdb":
+            return self.connection.execute(f"DELETE FROM {TABLE} WHERE document_id = ?", [document_id]).fetchone()[0]
+        deleted = self.connection.execute(f"DELETE FROM {TABLE} WHERE document_id = ?", [document_id]).rowcount
+        self.connection.commit()
+        return deleted
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> "pd.DataFrame":
+        if self.name == "duckdb":
+            return self.connection.cursor().execute(sql, list(params)).df() # a cursor per call: safe from worker threads
+        import pandas as pd
+        return pd.read_sql_query(sql, self.connection, params=list(params))
+
+    def expense_cells(self, where: str = "", params: Sequence[Any] = ()) -> "pd.DataFrame":
+        """The cells of ExpenseCube computed by one SQL GROUP BY; where is an optional " WHERE ..." clause."""
+        cells = self.query(CUBE_SQL.format(where=where), params)
+        for column in cells.columns.intersection(BOOLEAN_COLUMNS):
+            cells[column] = python_bools(cells[column])
+        return cells
+
+    def close(self):
+        self.connection.close()
+
+class SqlTransactionWriter:
+    """Buffered, idempotent writer for SqlStore with the stats of mongo.TransactionWriter.
+
+    Rows are inserted with INSERT OR IGNORE on their fingerprint every batch_size rows, or on the
+    next write once flush_interval seconds have passed; rows already stored count as matched.
+    """
+
+    def __init__(self, store: SqlStore, batch_size: Optional[int] = None, flush_interval: Optional[float] = None):
+        self.store = store
+        self.batch_size = batch_size or env.DB_INSERT_BATCH_SIZE
+        self.flush_interval = env.DB_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.stats = {"inserted": 0, "matched": 0, "skipped": 0, "failed": 0, "batches": 0, "rollup_updates": 0, "seconds": 0.0}
+        self._buffer: Dict[str, tuple] = {} # fingerprint -> row
+        self._last_flush = time.monotonic()
+
+    def write(self, transaction):
+        transaction = to_document(transaction)
+        fingerprint = transaction.get("fingerprint") or transaction_fingerprint(transaction)
+        if fingerprint in self._buffer:
+            self.stats["skipped"] += 1
+            return
+        self._buffer[fingerprint] = sql_row(transaction, fingerprint)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_many(self, transactions: Iterable[Any]) -> int:
+        count = 0
+        for transaction in transactions:
+            self.write(transaction)
+            count += 1
+        return count
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        rows = list(self._buffer.values())
+        self._buffer = {}
+        self.stats["batches"] += 1
+        started = time.perf_counter()
+        try:
+            inserted = self.store.insert_rows(rows)
+        except Exception:
+            self.stats["failed"] += len(rows)
+            raise
+        finally:
+            self.stats["seconds"] += time.perf_counter() - started
+        self.stats["inserted"] += inserted
+        self.stats["matched"] += len(rows) - inserted
+
+    def discard(self):
+        """Drop the buffered rows without writing them (the statement they belong to failed)."""
+        self._buffer = {}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
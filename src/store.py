@@ -0,0 +1,78 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional
+from src import env, log
+
+logger = log.get_logger("store")
+
+# Where the orchestrator writes transactions. STORE_BACKEND picks the backend: "mongo" (default,
+# src/mongo.py), or an embedded file database for single-machine setups: "duckdb", "sqlite", or
+# "embedded" for DuckDB when it is installed and SQLite otherwise (src/sql_store.py).
+
+def transaction_fingerprint(transaction: Dict[str, Any]) -> str:
+    """Deterministic identity of a statement row: the upsert key of every backend."""
+    amount = (transaction.get("credit") or 0.0) - (transaction.get("debit") or 0.0)
+    key = "|".join([
+        str(transaction.get("document_id")),
+        str(transaction.get("date")),
+        repr(float(amount)),
+        repr(float(transaction.get("balance") or 0.0)),
+        str(transaction.get("row_index")),
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+class TransactionStore:
+    """A transactions sink: a buffered writer, per-statement deletes, and close."""
+
+    name = None
+
+    def writer(self):
+        """Context manager with write/write_many/flush/discard and a stats dict, like mongo.TransactionWriter."""
+        raise NotImplementedError
+
+    def delete_document(self, document_id: str) -> int:
+        """Remove the rows of one statement before it is written again; returns how many were removed."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class MongoStore(TransactionStore):
+    name = "mongo"
+
+    def writer(self):
+        from src import mongo
+        return mongo.TransactionWriter()
+
+    def delete_document(self, document_id: str) -> int:
+        from src import mongo
+        return mongo.delete_transactions_for_document(document_id)
+
+    def close(self):
+        from src import mongo
+        mongo.close_client()
+
+def store_backend(backend: Optional[str] = None) -> str:
+    """The configured backend, with "embedded" resolved to duckdb or sqlite."""
+    backend = (backend or env.STORE_BACKEND or "mongo").strip().lower()
+    if backend not in ("mongo", "duckdb", "sqlite", "embedded"):
+        raise ValueError(f"unknown STORE_BACKEND {backend!r} (mongo, duckdb, sqlite or embedded)")
+    if backend in ("duckdb", "embedded"):
+        from src import sql_store
+        if sql_store.duckdb is None:
+            if backend == "duckdb":
+                logger.warning("STORE_BACKEND=duckdb but duckdb is not installed; using SQLite")
+            return "sqlite"
+        return "duckdb"
+    return backend
+
+def store_path(dialect: str) -> str:
+    extension = "duckdb" if dialect == "duckdb" else "sqlite3"
+    return env.STORE_FILE or os.path.join(env.OUTPUT_JSON_DIR or ".", f"transactions.{extension}")
+
+def open_store(backend: Optional[str] = None, read_only: bool = False) -> TransactionStore:
+    backend = store_backend(backend)
+    if backend == "mongo":
+        return MongoStore()
+    from src import sql_store
+    return sql_store.SqlStore(store_path(backend), backend, read_only=read_only)
@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence
+from src import env, ingestion_ledger
+
+try:
+    import msgpack
+except ImportError:  # optional: fall back to gzipped JSON lines
+    msgpack = None
+
+# Disk cache of the rows pdfplumber extracted from each page of a statement.
+# An entry is keyed by the file's content hash and the extraction settings (table settings,
+# pdfplumber version and, for pages cropped to a bank template's table region, that region);
+# inside it, pages are stored in page-number order, one object per page, so entries are written
+# and read back as a stream.
+
+def settings_key(crop: Optional[Sequence[float]] = None) -> str:
+    import pdfplumber
+    payload = json.dumps({
+        "table_settings": env.TABLE_SETTINGS, "pdfplumber": pdfplumber.__version__,
+        "crop": [round(float(value), 2) for value in crop] if crop is not None else None,
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+def cache_path(pdf_path: Path, crop: Optional[Sequence[float]] = None, file_hash: Optional[str] = None) -> Path:
+    """file_hash: the file's sha256 if the caller has it already (hashing reads the whole file)."""
+    extension = "msgpack" if msgpack is not None else "jsonl.gz"
+    file_hash = file_hash or ingestion_ledger.file_sha256(pdf_path)
+    return Path(env.TABLE_CACHE_DIR) / f"{file_hash}_{settings_key(crop)}.{extension}"
+
+def is_enabled() -> bool:
+    return bool(env.TABLE_CACHE and env.TABLE_CACHE_DIR)
+
+def read_pages(path: Path) -> Iterator[List[List[str]]]:
+    if msgpack is not None:
+        with open(path, "rb") as file:
+            yield from msgpack.Unpacker(file, raw=False)
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                yield json.loads(line)
+
+class PageWriter:
+    """Streams the pages of one statement into a temporary file; commit() publishes the entry."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = Path(f"{path}.tmp{os.getpid()}")
+        self.tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        if msgpack is not None:
+            self.file = open(self.tmp_path, "wb")
+            self.packer = msgpack.Packer()
+        else:
+            self.file = gzip.open(self.tmp_path, "wt", encoding="utf-8")
+
+    def write(self, page_rows: List[List[str]]):
+        if msgpack is not None:
+            self.file.write(self.packer.pack(page_rows))
+        else:
+            self.file.write(json.dumps(page_rows) + "\n")
+
+    def commit(self, path: Optional[Path] = None):
+        """Publish the entry, at path if the key was only known once the pages were extracted."""
+        self.file.close()
+        self.path = path or self.path
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+def lookup(pdf_path: Path, crop: Optional[Sequence[float]] = None, file_hash: Optional[str] = None) -> Optional[Path]:
+    """Path of the cached tables for this statement, or None if it has not been extracted yet.
+
+    With a crop, an entry extracted with that crop is used, else a full-page one (which is what
+    the template check falls back to anyway); an entry cropped to another region never is.
+    """
+    if not is_enabled():
+        return None
+    file_hash = file_hash or ingestion_ledger.file_sha256(pdf_path)
+    for key_crop in ([crop, None] if crop is not None else [None]):
+        path = cache_path(pdf_path, key_crop, file_hash)
+        if path.exists():
+            return path
+    return None
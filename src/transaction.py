@@ -0,0 +1,57 @@
+import sys
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Any, Dict, Optional
+
+# One parsed statement row. Rows stay Transaction objects from enrichment through the worker
+# pool to the writers, and become dicts only at the DB/file boundary (to_dict). Slots keep a
+# row free of a per-row __dict__, and the fields with few distinct values share one interned
+# string per value instead of a fresh copy from strftime/tolist on every row.
+
+@dataclass(slots=True, kw_only=True)
+class Transaction:
+    bank_name: Optional[str] = None
+    document_id: str
+    date: str
+    month_year: str
+    quarter: str
+    day_of_week: str
+    is_weekend: bool
+    description: str
+    debit: float
+    credit: float
+    balance: float
+    payment_method: Optional[str]
+    transaction_category: Optional[str]
+    is_debit: bool
+    is_credit: bool
+    amount_range: str
+    is_recurring: bool
+    recipient_bank_details: Optional[Dict[str, Any]] # may be shared by rows with the same description: read-only
+    row_index: Optional[int] = None
+
+    def __post_init__(self):
+        self.date = _intern(self.date)
+        self.month_year = _intern(self.month_year)
+        self.quarter = _intern(self.quarter)
+        self.day_of_week = _intern(self.day_of_week)
+        self.payment_method = _intern(self.payment_method)
+        self.transaction_category = _intern(self.transaction_category)
+        self.amount_range = _intern(self.amount_range)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The row as a MongoDB document / JSON object, keys in FIELDS order."""
+        document = dict(zip(FIELDS, _values(self)))
+        if self.recipient_bank_details is not None:
+            document["recipient_bank_details"] = dict(self.recipient_bank_details)
+        return document
+
+FIELDS = Transaction.__slots__
+_values = attrgetter(*FIELDS)
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def to_document(transaction) -> Dict[str, Any]:
+    """transaction as a dict; writers take Transaction objects or dicts (e.g. from the benchmarks)."""
+    return transaction.to_dict() if isinstance(transaction, Transaction) else transaction
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # the project root, like python -m
+
+from src import env
+
+@pytest.fixture
+def settings():
+    """env.configure for one test; the settings from before the test are put back after it."""
+    previous = []
+
+    def configure(**values):
+        previous.append(env.configure(**values))
+
+    yield configure
+    if previous:
+        env.configure(previous[0])
+
+@pytest.fixture
+def mongo_client(monkeypatch, settings):
+    """A mongomock client behind src.mongo and query_expense, with DB_NAME=test and COLLECTION_NAME=transactions."""
+    mongomock = pytest.importorskip("mongomock")
+    import query_expense as qe
+    from src import mongo
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(mongo, "_client", client)
+    monkeypatch.setattr(mongo, "_indexed", set())
+    monkeypatch.setattr(qe, "_client", client)
+    settings(DB_NAME="test", COLLECTION_NAME="transactions", ENV=None, EXPLAIN_QUERIES=False)
+    return client
+
+def synthetic_statements(seed: int = 3):
+    """Transaction documents as the orchestrator yields them: two banks, three months, one statement per bank and month."""
+    import datetime
+    import random
+    rng = random.Random(seed)
+    statements = {}
+    for bank in ("AXIS BANK", "KOTAK BANK"):
+        for month in (1, 2, 3):
+            document_id = f"{bank.split()[0]}_2025-{month:02d}"
+            rows = statements[document_id] = []
+            for row_index in range(40):
+                date = datetime.date(2025, month, rng.randint(1, 28))
+                is_debit = rng.random() < 0.8
+                amount = round(rng.uniform(10, 3000), 2)
+                rows.append({
+                    "bank_name": bank, "document_id": document_id, "row_index": row_index,
+                    "date": date.isoformat(), "month_year": date.isoformat()[:7], "day_of_week": date.strftime("%A"),
+                    "is_weekend": date.weekday() >= 5, "description": f"UPI/P2M/{row_index}/SHOP",
+                    "debit": amount if is_debit else 0.0, "credit": 0.0 if is_debit else amount, "balance": 0.0,
+                    "is_debit": is_debit, "is_credit": not is_debit,
+                    "transaction_category": rng.choice(["GROCERY", "RENT", "PERSONAL", "OTHER"]),
+                    "payment_method": rng.choice(["UPI", "CARD"]), "recipient_bank_details": None,
+                })
+    return statements
+
+@pytest.fixture
+def statements():
+    return synthetic_statements()
@@ -0,0 +1,37 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+from src import metrics, pdfDataOrchestrator
+
+COLUMN_MAP = {"date": 0, "description": 1, "debit": 2, "credit": 3, "balance": 4}
+
+ROWS = [
+    ["01-04-2025", "UPI/P2M/123/SHOP", "250.00", "", "9,750.00"],
+    ["05-03-3024", "UPI/P2M/124/SHOP", "10.00", "", "9,740.00"],  # past datetime64[ns]
+    ["05-03-1600", "NEFT/SALARY", "", "1,000.00", "10,740.00"],  # before it
+    ["05-03-0202", "UPI/P2M/125/SHOP", "10.00", "", "10,730.00"], # year not zero-padded by strftime
+    ["02-04-2025", None, "10.00", "", "10,720.00"],
+    ["03-04-2025", "", ""],                                        # short: its credit cell is past the end
+    ["04-04-2025", "UPI/P2M/126/SHOP", "1O.00", "", "10,710.00"],
+    ["06-04-2025", "UPI/P2M/127/SHOP"],                            # amounts past the end of the row
+    [None, "continued description", "", "", ""],
+    ["Date", "Narration", "Debit", "Credit", "Balance"],
+    ["31-02-2025", "UPI/P2M/128/SHOP", "10.00", "", "10,700.00"],
+]
+
+def enrich(settings, vectorized: bool):
+    settings(VECTORIZED_ENRICHMENT=vectorized, DATE_FORMAT_LIST=("%d-%m-%Y",), ENRICHMENT_BATCH_ROWS=1000)
+    statement = metrics.StatementMetrics("statement.pdf")
+    metrics.set_current(statement)
+    transactions = [transaction.to_dict() for transaction in pdfDataOrchestrator._enrich_rows(ROWS, "AXIS_2025-04", COLUMN_MAP)]
+    return transactions, statement.to_dict()
+
+def test_vectorized_rows_match_the_per_row_path(settings):
+    transactions, statement = enrich(settings, vectorized=True)
+    expected_transactions, expected_statement = enrich(settings, vectorized=False)
+
+    assert transactions == expected_transactions
+    assert [transaction["date"] for transaction in transactions] == ["2025-04-01", "3024-03-05", "1600-03-05"]
+    assert statement["errors"] == expected_statement["errors"]
+    assert statement["malformed_rows"] == expected_statement["malformed_rows"] == 6
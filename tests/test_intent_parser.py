@@ -0,0 +1,10 @@
+import datetime
+import json
+
+from benchmarks.bench_intent_parser import CORPUS_FILE, check_corpus
+from src.intent_parser import IntentParser
+
+def test_corpus():
+    corpus = json.loads(CORPUS_FILE.read_text())
+    parser = IntentParser(corpus["banks"], corpus["keywords"])
+    assert check_corpus(parser, corpus, datetime.date.fromisoformat(corpus["today"])) == []
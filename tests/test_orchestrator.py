@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("mongomock")
+pytest.importorskip("pdfplumber")
+
+from benchmarks import synthetic_statements
+from src import bank_structure, ingestion_ledger, mongo, pdfDataOrchestrator
+
+@pytest.fixture
+def ingest_dirs(tmp_path, monkeypatch, mongo_client, settings):
+    settings(INPUT_PDF_DIR=str(tmp_path / "pdfs"), OUTPUT_JSON_DIR=str(tmp_path / "out"), TABLE_CACHE_DIR=str(tmp_path / "tables"),
+             BANK_TEMPLATE_FILE=str(tmp_path / "templates.json"), INGESTION_LEDGER_FILE=str(tmp_path / "ledger.json"),
+             METRICS_SINKS=[], STORE_BACKEND="mongo", INGESTION_LEDGER="file", ROLLUPS=True, PARQUET_EXPORT=False,
+             DB_INSERT_BATCH_SIZE=10)
+    monkeypatch.setattr(bank_structure, "bankTemplates", None)
+    monkeypatch.setattr(mongo, "close_client", lambda: None) # keep the mongomock client for the assertions
+    synthetic_statements.generate(tmp_path / "pdfs", ["AXIS"], 2, 1, 30, datetime.date(2025, 1, 1), 40, 3)
+    return tmp_path
+
+def test_a_statement_that_fails_partway_leaves_no_rows(ingest_dirs, monkeypatch):
+    parse = pdfDataOrchestrator.process_single_statement
+
+    def fail_partway(pdf_file, *args, **kwargs):
+        for row_index, transaction in enumerate(parse(pdf_file, *args, **kwargs)):
+            if pdf_file.name == "axis_statement_002.pdf" and row_index == 15: # after a flushed batch
+                raise RuntimeError("parser broke")
+            yield transaction
+
+    monkeypatch.setattr(pdfDataOrchestrator, "process_single_statement", fail_partway)
+    result = pdfDataOrchestrator.process_all_statements(workers=1)
+
+    collection = mongo.get_transactions_collection()
+    assert [failure["file"] for failure in result["failed"]] == ["axis_statement_002.pdf"]
+    assert collection.distinct("document_id") == ["axis_statement_001"]
+    rollups = mongo.get_rollup_collection(collection)
+    assert sum(rollup["count"] for rollup in rollups.find()) == collection.count_documents({})
+
+def stored(collection):
+    transactions = sorted(document["fingerprint"] for document in collection.find())
+    rollups = sorted(tuple((field, round(value, 2) if isinstance(value, float) else value) for field, value in sorted(rollup.items()))
+                     for rollup in mongo.get_rollup_collection(collection).find({}, {"_id": 0, "by_weekday": 0}))
+    return transactions, rollups
+
+def test_ingesting_a_statement_twice_stores_it_once(ingest_dirs):
+    collection = mongo.get_transactions_collection()
+    pdfDataOrchestrator.process_all_statements(workers=1)
+    first = stored(collection)
+    assert len(first[0]) == len(set(first[0])) > 0
+
+    # unchanged files are skipped by the ledger; forcing one re-ingests it over its stored rows
+    skipped = pdfDataOrchestrator.process_all_statements(workers=1)
+    forced = pdfDataOrchestrator.process_all_statements(workers=1, force_document_ids=["axis_statement_001"])
+    assert skipped["total_transactions"] == 0 and forced["total_transactions"] > 0
+    assert stored(collection) == first
+
+    # rows written again without the delete are matched on their fingerprint, not inserted or counted again
+    rows = list(collection.find({"document_id": "axis_statement_002"}, {"_id": 0}))
+    with mongo.TransactionWriter(collection, rollups=True) as writer:
+        writer.write_many(rows)
+    assert writer.stats["inserted"] == 0 and writer.stats["matched"] == len(rows)
+    assert stored(collection) == first
+
+def test_reenriching_from_the_table_cache_does_not_open_the_pdfs(ingest_dirs, monkeypatch, settings):
+    import pdfplumber
+    settings(TABLE_CACHE=True, BANK_TEMPLATES=False)
+    pdfDataOrchestrator.process_all_statements(workers=1)
+
+    opened = []
+
+    def no_pdf(path, *args, **kwargs):
+        opened.append(path) # template learning logs and swallows errors, so record the call instead
+        raise AssertionError("cached statements must not be opened")
+
+    settings(BANK_TEMPLATES=True)
+    monkeypatch.setattr(pdfplumber, "open", no_pdf)
+    result = pdfDataOrchestrator.process_all_statements(workers=1, reenrich=True)
+    assert result["failed"] == [] and result["total_transactions"] > 0
+    assert opened == []
+    assert bank_structure.get_bank_template("AXIS") is None # learned from the next extracted statement instead
+
+def test_the_mongo_ledger_uses_the_shared_client(ingest_dirs, mongo_client, settings):
+    settings(INGESTION_LEDGER="mongo")
+    pdfDataOrchestrator.process_all_statements(workers=1)
+    ledger = ingestion_ledger.open_ledger()
+    assert ledger.collection.database.client is mongo_client
+    assert sorted(entry["document_id"] for entry in ledger.entries.values()) == ["axis_statement_001", "axis_statement_002"]
+    assert pdfDataOrchestrator.process_all_statements(workers=1)["total_transactions"] == 0
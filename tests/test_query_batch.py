@@ -0,0 +1,55 @@
+import contextlib
+import io
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("mongomock")
+ollama = pytest.importorskip("ollama")
+
+import query_batch
+import query_expense as qe
+from benchmarks import fake_ollama
+from src import store
+
+QUESTIONS = ["Total grocery spend last month", "Top 5 merchants last month", "List all rent payments this year"]
+
+@pytest.fixture
+def server():
+    server = fake_ollama.start(delay=0.05, parallel=2)
+    yield server
+    server.shutdown()
+
+def run(server, questions, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return query_batch.run_batch(questions, llm_client=ollama.AsyncClient(host=server.url), async_driver=False, **options)
+
+def test_questions_are_answered_with_stage_timings(server, mongo_client, statements, settings):
+    settings(INTENT_PARSER=False, QUERY_CACHE=False, EXPENSE_SOURCE="mongo")
+    documents = [document for rows in statements.values() for document in rows]
+    qe.get_collection().insert_many([dict(document) for document in documents])
+
+    report = run(server, QUESTIONS, concurrency=3, llm_concurrency=2)
+
+    assert report["questions"] == len(QUESTIONS) and report["failed"] == 0
+    assert server.requests == 2 * len(QUESTIONS) # one query and one summary per question
+    debits = sum(1 for document in documents if document["is_debit"])
+    for question, answer in zip(QUESTIONS, report["answers"]):
+        assert answer["question"] == question
+        assert answer["query"] == fake_ollama.FAKE_QUERY
+        assert answer["results"] == debits
+        assert answer["answer"].startswith("Fake summary of a ")
+        stages = answer["stages"]
+        assert set(stages) == {"generate", "fetch", "first_token", "summarize"}
+        assert stages["generate"] >= 0.05 and stages["summarize"] >= 0.05 # each waits for one fake LLM call
+        assert stages["first_token"] <= stages["summarize"]
+        assert answer["seconds"] >= stages["generate"] + stages["fetch"] + stages["summarize"] - 0.003 # each is rounded to ms
+
+def test_an_invalid_sql_query_is_reported_as_sql(server, tmp_path, monkeypatch, settings):
+    settings(INTENT_PARSER=False, QUERY_CACHE=False, EXPENSE_SOURCE="sql", STORE_BACKEND="sqlite", STORE_FILE=str(tmp_path / "transactions.sqlite3"))
+    store.open_store("sqlite").close() # creates the table the SQL prompt describes
+    monkeypatch.setattr(qe, "_sql_store", None)
+
+    report = run(server, QUESTIONS[:1], summarize=False) # the fake server only writes MongoDB queries
+
+    assert report["answers"][0]["error"] == "ValueError: the generated query is not a valid read-only SQL query"
@@ -0,0 +1,88 @@
+import contextlib
+import io
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("mongomock")
+
+import query_expense as qe
+from benchmarks.bench_analytics import differences
+from src import mongo
+
+def write(collection, documents):
+    with mongo.TransactionWriter(collection, rollups=True) as writer:
+        writer.write_many(dict(document) for document in documents)
+
+def rollup_mismatches(collection):
+    """Differences between the analyses computed from the rollups and from the stored transactions."""
+    rollups = list(mongo.get_rollup_collection(collection).find({}, {"_id": 0}))
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = qe.pandas_analysis(pd.DataFrame(list(collection.find({}, {"_id": 0}))))
+    pairs = [
+        (expected["temporal_analysis"]["monthly_summary"], qe.monthly_summary_from_rollups(rollups)),
+        (expected["temporal_analysis"]["weekday_analysis"], qe.weekday_analysis_from_rollups(rollups)),
+        (expected["categorical_analysis"]["category_trends"], qe.calculate_category_trends_from_rollups(rollups)),
+    ]
+    return [difference for scanned, rolled_up in pairs for difference in differences(qe.stringify_keys(scanned), qe.stringify_keys(rolled_up))]
+
+def test_rollups_match_the_transactions_after_ingest_reingest_and_rebuild(mongo_client, statements):
+    collection = mongo.get_transactions_collection()
+    for documents in statements.values():
+        write(collection, documents)
+    assert rollup_mismatches(collection) == []
+
+    # a forced re-ingest deletes the statement's rows (rebuilding its rollup keys) and writes them again
+    document_id, documents = next(iter(statements.items()))
+    mongo.delete_transactions_for_document(document_id, collection)
+    assert rollup_mismatches(collection) == []
+    write(collection, documents)
+    assert rollup_mismatches(collection) == []
+
+    mongo.rebuild_rollups(collection=collection)
+    assert rollup_mismatches(collection) == []
+
+@pytest.mark.parametrize("mongo_filter, months", [
+    ({}, (None, None)),
+    ({"month_year": "2025-02"}, ("2025-02", "2025-02")),
+    ({"date": {"$gte": "2025-01-01", "$lte": "2025-02-28"}}, ("2025-01", "2025-02")),
+    ({"date": {"$gte": "2025-01-01", "$lte": "2025-06-31"}}, ("2025-01", "2025-06")),
+    ({"date": {"$gte": "2025-01-01", "$lt": "2025-03-01"}}, ("2025-01", "2025-02")),
+    ({"date": {"$gte": "2025-01-02", "$lte": "2025-01-31"}}, None),
+    ({"date": {"$gte": "2025-01-01", "$lte": "2025-01-30"}}, None),
+    ({"date": {"$gte": "2025-01-01"}, "transaction_category": "GROCERY"}, None),
+])
+def test_rollup_month_range(mongo_filter, months):
+    assert qe.rollup_month_range({"operation": "find", "filter": mongo_filter}) == months
+
+def test_analyze_expenses_reads_whole_months_from_the_rollups(mongo_client, statements, monkeypatch, settings):
+    settings(ROLLUPS=True, EXPENSE_SOURCE="mongo")
+    collection = mongo.get_transactions_collection()
+    for documents in statements.values():
+        write(collection, documents)
+
+    def scan(*args, **kwargs):
+        raise AssertionError("whole months must not load the transactions")
+
+    with monkeypatch.context() as patch, contextlib.redirect_stdout(io.StringIO()):
+        patch.setattr(qe, "expenses_dataframe", scan)
+        analysis = qe.analyze_expenses({"operation": "find", "filter": {"date": {"$gte": "2025-02-01", "$lte": "2025-03-31"}}})
+    assert analysis["time_period"] == {"start": "2025-02", "end": "2025-03"}
+    assert "overview_stats" not in analysis # the rollup analysis, not pandas_analysis
+
+    # stored before rollups existed: no rollup documents for April, so its rows are scanned
+    april = [{**document, "document_id": "AXIS_2025-04", "date": "2025-04" + document["date"][7:], "month_year": "2025-04"}
+             for document in statements["AXIS_2025-01"]]
+    with mongo.TransactionWriter(collection, rollups=False) as writer:
+        writer.write_many(april)
+    with contextlib.redirect_stdout(io.StringIO()):
+        partial = qe.analyze_expenses({"operation": "find", "filter": {"date": {"$gte": "2025-02-10", "$lte": "2025-03-31"}}})
+        missing = qe.analyze_expenses({"operation": "find", "filter": {"month_year": "2025-04"}})
+    assert partial["overview_stats"]["total_transactions"] == sum(
+        1 for documents in statements.values() for document in documents if "2025-02-10" <= document["date"] <= "2025-03-31")
+    assert missing["overview_stats"]["total_transactions"] == len(april)
+
+def test_readers_and_writer_use_the_same_rollup_collection(mongo_client, settings):
+    settings(ENV="dev")
+    assert mongo.get_rollup_collection().name == "transactions_dev_rollups"
+    assert qe.get_rollup_collection().full_name == mongo.get_rollup_collection().full_name
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from src import table_cache
+
+CROP = (10.0, 120.5, 580.0, 842.0)
+
+def cache(pdf_path, crop=None):
+    writer = table_cache.PageWriter(table_cache.cache_path(pdf_path))
+    writer.write([["01-01-2025", "UPI/P2M/1/SHOP", "100.00"]])
+    writer.commit(table_cache.cache_path(pdf_path, crop))
+    return writer.path
+
+@pytest.fixture
+def statements(tmp_path, settings):
+    settings(TABLE_CACHE=True, TABLE_CACHE_DIR=str(tmp_path / "tables"))
+    paths = []
+    for name in ("full.pdf", "cropped.pdf"):
+        path = tmp_path / name
+        path.write_bytes(f"%PDF {name}".encode())
+        paths.append(path)
+    return paths
+
+def test_entries_are_keyed_by_the_template_crop(statements):
+    full, cropped = statements
+    full_entry, cropped_entry = cache(full), cache(cropped, CROP)
+    assert full_entry != table_cache.cache_path(full, CROP)
+
+    assert table_cache.lookup(full) == full_entry
+    assert table_cache.lookup(full, CROP) == full_entry # whole pages fit any template
+    assert table_cache.lookup(cropped, CROP) == cropped_entry
+    assert table_cache.lookup(cropped) is None
+    assert table_cache.lookup(cropped, (*CROP[:3], 700.0)) is None # the template's region has moved
+    assert list(table_cache.read_pages(cropped_entry)) == [[["01-01-2025", "UPI/P2M/1/SHOP", "100.00"]]]